@@ -17,6 +17,11 @@ from .profile_agent import (
     create_profile_agent,
 )
 
+from .combined_agent import (
+    CombinedAnalysisAgent,
+    create_combined_agent,
+)
+
 from .orchestrator import (
     AgentOrchestrator,
     OrchestratorResult,
@@ -57,6 +62,10 @@ __all__ = [
     "BehaviorInsight",
     "BehaviorAnalysisResult",
     "create_behave_agent",
+
+    # Combined Analysis Agent
+    "CombinedAnalysisAgent",
+    "create_combined_agent",
     
     # Orchestrator
     "AgentOrchestrator",
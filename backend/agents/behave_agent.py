@@ -3,19 +3,373 @@ Behave Agent Module
 Analyzes user behavior data to extract insights and profile updates.
 """
 
+import asyncio
 import logging
-from typing import Dict, Any, List, Optional
-from dataclasses import dataclass
+from typing import AsyncIterator, Dict, Any, List, Optional, Tuple
+from dataclasses import dataclass, fields
+from functools import lru_cache
+from itertools import islice
+import hashlib
 import json
+from operator import attrgetter
+import warnings
+
+import numpy as np
 
 from config import settings
-from llm import create_llm_client
+from llm import LLMChatClient, create_llm_client
 from utils.cache import cacheable
+from utils.json_extract import loads_llm_json, reply_text
+from utils.json_stream import ComponentStreamParser
+from utils.sync_loop import run_sync
 
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+@lru_cache(maxsize=8)
+def _shared_llm_client(model: str, provider: str) -> LLMChatClient:
+    """
+    One client per (model, provider) for the whole process.
+
+    Building a client builds an HTTP connection pool; every
+    create_behave_agent() used to get a fresh one, cold TLS included.
+    Shared, the pool stays warm and keep-alive connections are reused
+    across agents. The clients hold no conversational state.
+    """
+    return create_llm_client(model)
+
+
+def _fingerprint(data: Dict[str, Any]) -> str:
+    """
+    Hash of what the analysis actually depends on, not of the raw dict.
+
+    The raw summary carries volatile detail (exact milliseconds, scroll
+    percent, counters that tick every second), so two polls of the same
+    session never hashed alike and the cache never hit. Numbers are
+    bucketed at a resolution the model's answer does not change at; the
+    lists keep only the slices the prompt shows.
+    """
+    canonical = (
+        int(data.get("duration", 0) or 0) // 10_000,
+        int(data.get("clickCount", 0) or 0) // 5,
+        int(data.get("maxScrollDepth", 0) or 0) // 10,
+        int(data.get("pagesVisited", 0) or 0),
+        [(z.get("zone"), z.get("count")) for z in data.get("heatmapZones", [])[:5]],
+        data.get("navigationPath", [])[-10:],
+        [(c.get("target"), c.get("targetId")) for c in data.get("recentClicks", [])[-5:]],
+        [
+            (i.get("interactionType"), i.get("elementType"), i.get("elementId"))
+            for i in data.get("recentInteractions", [])[-10:]
+        ],
+    )
+    encoded = json.dumps(canonical, separators=(",", ":"), default=str).encode()
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+def _analysis_cache_key(
+    agent: "BehaveAgent",
+    behavior_data: Dict[str, Any],
+    user_profile: Optional[Dict[str, Any]] = None,
+) -> str:
+    """Cache key: client + session fingerprint + the profile the prompt shows."""
+    profile = agent._summarize_profile(user_profile) if user_profile else ""
+    profile_hash = hashlib.blake2b(profile.encode(), digest_size=8).hexdigest()
+    # The client's class, model and endpoint (LLMChatClient.__cache_key__),
+    # never its address: ids are reused once a client is collected
+    client = agent.llm.__cache_key__()
+    return f"{__name__}.analysis:{client!r}:{_fingerprint(behavior_data)}:{profile_hash}"
+
+
+USER_TYPES = ("explorer", "focused", "scanner", "deep_reader", "casual")
+INSIGHT_CATEGORIES = (
+    "navigation_preference", "content_interest", "interaction_style",
+    "attention_pattern", "pace_preference", "device_behavior",
+)
+UI_ADJUSTMENT_TYPES = (
+    "layout", "navigation", "content_density", "interaction_feedback",
+    "component_preference",
+)
+
+# Parse-time validation: whatever the model emits, downstream code only
+# ever sees canonical values (schema enums are a request, not a guarantee)
+_VALID_CATEGORIES = frozenset(INSIGHT_CATEGORIES)
+_VALID_USER_TYPES = frozenset(USER_TYPES)
+
+
+def _keep_insight(raw: Dict[str, Any]) -> bool:
+    """An insight survives parsing: confident enough, known category."""
+    return raw.get("confidence", 0) >= 0.5 and raw.get("category") in _VALID_CATEGORIES
+
+
+def _keep_profile_update(raw: Any) -> bool:
+    """A profile update survives parsing: an object, confident enough.
+
+    The only confidence gate for behavior-derived updates; the
+    orchestrator applies what is left without checking again.
+    """
+    return isinstance(raw, dict) and raw.get("confidence", 0.5) >= 0.5
+
+
+# Provider-native structured output for the analysis. Same contract as
+# the zone schema: an optimization that keeps the reply parseable and
+# free of prose, never the guarantee (_parse_response stays defensive for
+# providers that ignore it).
+BEHAVIOR_OUTPUT_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "required": [
+        "insights", "profile_updates", "engagement_score", "user_type",
+        "session_summary", "recommended_ui_adjustments",
+    ],
+    "properties": {
+        "insights": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "required": ["category", "key", "value", "confidence", "evidence"],
+                "properties": {
+                    "category": {"type": "string", "enum": list(INSIGHT_CATEGORIES)},
+                    "key": {"type": "string"},
+                    "value": {},
+                    "confidence": {"type": "number", "minimum": 0, "maximum": 1},
+                    "evidence": {
+                        "type": "string",
+                        "description": "The behavior that led to this insight",
+                    },
+                },
+            },
+        },
+        "profile_updates": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "required": ["field", "value", "confidence"],
+                "properties": {
+                    "field": {"type": "string", "pattern": "^behavior\\."},
+                    "value": {},
+                    "confidence": {"type": "number", "minimum": 0, "maximum": 1},
+                },
+            },
+        },
+        "engagement_score": {"type": "number", "minimum": 0, "maximum": 1},
+        "user_type": {"type": "string", "enum": list(USER_TYPES)},
+        "session_summary": {"type": "string", "description": "Brief summary of this session"},
+        "recommended_ui_adjustments": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "required": ["type", "target", "suggestion"],
+                "properties": {
+                    "type": {"type": "string", "enum": list(UI_ADJUSTMENT_TYPES)},
+                    "target": {"type": "string"},
+                    "suggestion": {"type": "string"},
+                },
+            },
+        },
+    },
+}
+
+# The multi-row variant: {"results": [analysis + "row"]}.
+MARSHALLED_OUTPUT_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "required": ["results"],
+    "properties": {
+        "results": {
+            "type": "array",
+            "items": {
+                **BEHAVIOR_OUTPUT_SCHEMA,
+                "required": [*BEHAVIOR_OUTPUT_SCHEMA["required"], "row"],
+                "properties": {
+                    **BEHAVIOR_OUTPUT_SCHEMA["properties"],
+                    "row": {"type": "integer", "minimum": 0},
+                },
+            },
+        },
+    },
+}
+
+# (key, default) for the fields _format_behavior_data reads, in unpacking order.
+_FORMAT_DEFAULTS = (
+    ("duration", 0),
+    ("clickCount", 0),
+    ("maxScrollDepth", 0),
+    ("pagesVisited", 0),
+    ("heatmapZones", ()),
+    ("navigationPath", ()),
+    ("recentClicks", ()),
+    ("recentInteractions", ()),
+)
+
+def _format_key(data: Dict[str, Any]) -> Tuple:
+    """
+    Hashable projection of exactly what the prompt block shows: the
+    counters, and the list slices with their display defaults applied.
+    """
+    duration, clicks, scroll, pages, heatmap, nav_path, recent_clicks, interactions = (
+        data.get(key, default) for key, default in _FORMAT_DEFAULTS
+    )
+    return (
+        duration,
+        clicks,
+        scroll,
+        pages,
+        tuple((z.get("zone", "unknown"), z.get("count", 0)) for z in heatmap[:5]),
+        tuple(nav_path[-10:]),
+        tuple((c.get("target", "unknown"), c.get("targetId")) for c in recent_clicks[-5:]),
+        tuple(
+            (
+                i.get("interactionType", "unknown"),
+                i.get("elementType", "unknown"),
+                i.get("elementId", "no-id"),
+            )
+            for i in interactions[-10:]
+        ),
+    )
+
+
+@lru_cache(maxsize=1024)
+def _format_behavior_block(key: Tuple) -> str:
+    """
+    The <behavior_data> block for one _format_key projection.
+
+    Memoized: the same session is formatted again by retries, by the
+    cache-miss path after a fingerprint lookup, and by every poll of an
+    unchanged session.
+    """
+    duration, clicks, scroll, pages, heatmap, nav_path, recent_clicks, interactions = key
+    lines = [
+        f"Session Duration: {duration / 1000:.1f} seconds",
+        f"Total Clicks: {clicks}",
+        f"Max Scroll Depth: {scroll}%",
+        f"Pages Visited: {pages}",
+    ]
+    if heatmap:
+        lines.append("\nClick Heatmap Distribution:")
+        lines += [f"  - {zone}: {count} clicks" for zone, count in heatmap]
+    if nav_path:
+        lines.append(f"\nNavigation Path: {' → '.join(nav_path)}")
+    if recent_clicks:
+        lines.append("\nRecent Click Targets:")
+        lines += [
+            f"  - {target}" + (f"#{target_id}" if target_id else "")
+            for target, target_id in recent_clicks
+        ]
+    if interactions:
+        lines.append("\nElement Interactions:")
+        lines += [
+            f"  - {kind} on {element_type} ({element_id})"
+            for kind, element_type, element_id in interactions
+        ]
+    return "\n".join(lines)
+
+
+# quick_analyze user types, indexed by the id _quick_score returns.
+_USER_TYPES = ("casual", "explorer", "deep_reader", "scanner", "focused")
+
+
+def _quick_score(
+    duration: float,
+    clicks: float,
+    scroll_depth: float,
+    pages: float,
+) -> Tuple[float, int]:
+    """
+    The quick_analyze heuristic on plain numbers: (engagement, user type id).
+
+    Kept free of dicts and strings so the hot path is a handful of float
+    comparisons; the dict I/O stays at the quick_analyze boundary.
+    """
+    engagement = 0.0
+    if duration > 30:
+        engagement += 0.2
+    if duration > 120:
+        engagement += 0.2
+    if clicks > 5:
+        engagement += 0.2
+    if scroll_depth > 50:
+        engagement += 0.2
+    if pages > 2:
+        engagement += 0.2
+
+    if pages > 5 and clicks > 10:
+        user_type = 1
+    elif scroll_depth > 80 and duration > 60:
+        user_type = 2
+    elif clicks > 15 and duration < 60:
+        user_type = 3
+    elif pages <= 2 and scroll_depth > 50:
+        user_type = 4
+    else:
+        user_type = 0
+    return min(engagement, 1.0), user_type
+
+
+# Structured dtype of quick_analyze_batch's result, one record per session.
+QUICK_BATCH_DTYPE = np.dtype([
+    ("engagement_score", np.float64),
+    ("user_type", f"U{max(map(len, _USER_TYPES))}"),
+    ("duration_seconds", np.float64),
+    ("click_count", np.float64),
+    ("scroll_depth", np.float64),
+    ("pages_visited", np.float64),
+])
+
+
+def quick_analyze_batch(sessions: List[Dict[str, Any]]) -> np.ndarray:
+    """
+    The quick_analyze heuristic over many sessions at once.
+
+    For analytics jobs scoring thousands of sessions: the four inputs
+    are stacked into an (N, 4) array and the rules run as vectorized
+    comparisons, instead of one Python call per session. Same rules and
+    same numbers as _quick_score, record for record. An empty or missing
+    session scores like quick_analyze's zero session (not its {} early
+    return: a column cannot be absent). No attention pattern: that one
+    reads strings.
+
+    Returns:
+        A structured array of QUICK_BATCH_DTYPE, in input order
+    """
+    metrics = np.array(
+        [
+            (
+                (s or {}).get("duration", 0) / 1000,
+                (s or {}).get("clickCount", 0),
+                (s or {}).get("maxScrollDepth", 0),
+                (s or {}).get("pagesVisited", 0),
+            )
+            for s in sessions
+        ],
+        dtype=np.float64,
+    ).reshape(-1, 4)
+    duration, clicks, scroll, pages = metrics.T
+
+    signals = (
+        (duration > 30).astype(np.int64) + (duration > 120) + (clicks > 5)
+        + (scroll > 50) + (pages > 2)
+    )
+    # Same priority order as the elif chain in _quick_score
+    user_type_ids = np.select(
+        [
+            (pages > 5) & (clicks > 10),
+            (scroll > 80) & (duration > 60),
+            (clicks > 15) & (duration < 60),
+            (pages <= 2) & (scroll > 50),
+        ],
+        [1, 2, 3, 4],
+        default=0,
+    )
+
+    result = np.empty(len(metrics), dtype=QUICK_BATCH_DTYPE)
+    result["engagement_score"] = np.minimum(signals * 0.2, 1.0)
+    result["user_type"] = np.asarray(_USER_TYPES)[user_type_ids]
+    result["duration_seconds"] = duration
+    result["click_count"] = clicks
+    result["scroll_depth"] = scroll
+    result["pages_visited"] = pages
+    return result
+
+
+@dataclass(slots=True)
 class BehaviorInsight:
     """A single insight derived from behavior analysis."""
     category: str  # e.g., "navigation_preference", "content_interest", "interaction_style"
@@ -24,8 +378,29 @@ class BehaviorInsight:
     confidence: float
     evidence: str  # Brief explanation of what behavior led to this insight
 
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(zip(_INSIGHT_FIELDS, _insight_values(self)))
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "BehaviorInsight":
+        """Build from one insight object of the model's reply."""
+        return cls(
+            category=data.get("category", "unknown"),
+            key=data.get("key", ""),
+            value=data.get("value"),
+            confidence=data.get("confidence", 0.5),
+            evidence=data.get("evidence", ""),
+        )
+
+
+# Serializer built once from the dataclass definition: one C-level
+# attrgetter call per insight instead of a hand-written dict literal
+# that has to be kept in sync with the fields.
+_INSIGHT_FIELDS = tuple(f.name for f in fields(BehaviorInsight))
+_insight_values = attrgetter(*_INSIGHT_FIELDS)
+
 
-@dataclass
+@dataclass(slots=True)
 class BehaviorAnalysisResult:
     """Result of behavior analysis."""
     insights: List[BehaviorInsight]
@@ -37,16 +412,7 @@ class BehaviorAnalysisResult:
     
     def to_dict(self) -> Dict[str, Any]:
         return {
-            "insights": [
-                {
-                    "category": i.category,
-                    "key": i.key,
-                    "value": i.value,
-                    "confidence": i.confidence,
-                    "evidence": i.evidence,
-                }
-                for i in self.insights
-            ],
+            "insights": [i.to_dict() for i in self.insights],
             "profile_updates": self.profile_updates,
             "engagement_score": self.engagement_score,
             "user_type": self.user_type,
@@ -63,79 +429,43 @@ class BehaveAgent:
     interaction timing to derive insights about user preferences and needs.
     """
     
+    # Role, vocabulary and judgment only. The field-by-field structure
+    # (types, ranges, enums) lives in BEHAVIOR_OUTPUT_SCHEMA and reaches
+    # schema-capable providers as response_format; the one-line shape
+    # below is what providers that ignore the schema still need.
     SYSTEM_PROMPT = """You are a behavioral analysis expert specializing in user experience patterns.
-Your task is to analyze user behavior data and extract meaningful insights that can improve their experience.
-
-You will receive behavior data including:
-- Click events with positions and targets
-- Scroll patterns and depth
-- Page visit history and duration
-- Hover events on interactive elements
-- Element interactions
-- Heatmap zone distribution
-- Navigation paths
-
-Based on this data, you must output valid JSON with this structure:
-{
-    "insights": [
-        {
-            "category": "category_name",
-            "key": "specific_key",
-            "value": "derived_value",
-            "confidence": 0.0-1.0,
-            "evidence": "Brief explanation of behavior that led to this insight"
-        }
-    ],
-    "profile_updates": [
-        {
-            "field": "behavior.field_name",
-            "value": "value",
-            "confidence": 0.0-1.0
-        }
-    ],
-    "engagement_score": 0.0-1.0,
-    "user_type": "explorer|focused|scanner|deep_reader|casual",
-    "session_summary": "Brief summary of user behavior this session",
-    "recommended_ui_adjustments": [
-        {
-            "type": "adjustment_type",
-            "target": "what_to_adjust",
-            "suggestion": "specific_suggestion"
-        }
-    ]
-}
+Analyze the session's behavior data (clicks, scroll depth, pages and timing, hovers and element interactions, heatmap zones, navigation path) and extract insights that can improve this user's experience.
+
+Output one JSON object: insights [{category, key, value, confidence, evidence}], profile_updates [{field: "behavior.<name>", value, confidence}], engagement_score, user_type, session_summary, recommended_ui_adjustments [{type, target, suggestion}]. Confidences and engagement_score are 0.0-1.0.
+
+Insight categories: navigation_preference (menu, search, direct links), content_interest (topics engaged with most), interaction_style (clicks vs hovers, fast vs deliberate), attention_pattern (where on the page), pace_preference (scan vs thorough reading), device_behavior (device/context cues).
+
+User types: explorer (clicks widely, many pages), focused (straight to target), scanner (quick scrolls, brief hovers), deep_reader (long page times, thorough scrolling), casual (irregular, distracted).
 
-Categories for insights:
-- "navigation_preference": How user prefers to navigate (menu, search, direct links)
-- "content_interest": Topics or content types user engages with most
-- "interaction_style": How user interacts (clicks vs hovers, fast vs deliberate)
-- "attention_pattern": Where user focuses attention on page
-- "pace_preference": Speed of browsing (quick scan vs thorough reading)
-- "device_behavior": Patterns suggesting device/context usage
-
-User types:
-- "explorer": Clicks widely, visits many pages, curious behavior
-- "focused": Goes directly to target, minimal exploration
-- "scanner": Quick scrolls, brief hovers, skims content
-- "deep_reader": Long page times, thorough scrolling, engaged reading
-- "casual": Irregular patterns, distracted behavior
-
-UI adjustment types:
-- "layout": Suggestions for layout changes
-- "navigation": Navigation structure adjustments
-- "content_density": More/less content per view
-- "interaction_feedback": Enhanced or reduced feedback on interactions
-- "component_preference": Preferred component types (cards, lists, etc.)
+UI adjustment types: layout, navigation, content_density, interaction_feedback, component_preference.
 
 Guidelines:
 - Only report insights with confidence >= 0.5
 - Base insights on actual behavior patterns, not assumptions
 - Consider session duration when assessing engagement
 - Look for repeated patterns, not single events
-- Recommend UI adjustments that would improve this user's experience
 - Be conservative with profile updates - only update when confident
+"""
+
+    # Appended to SYSTEM_PROMPT for multi-row calls. JSON mode only
+    # accepts an object at the top level, so the array is wrapped.
+    MARSHALLED_INSTRUCTIONS = """
+Batch mode:
+- The input holds several independent sessions as <row id="N"> elements
+- Analyze each row on its own; never carry evidence from one row to another
+- Output valid JSON of the form {"results": [...]} with exactly one object per row,
+  in row order, each matching the structure above plus "row": N
 """
     
+    # Below either threshold a session is answered by quick_analyze alone
+    HEURISTIC_MIN_CLICKS = 3
+    HEURISTIC_MIN_ENGAGEMENT = 0.4
+
     def __init__(self, model: str = None, llm_client=None):
         """
         Initialize the Behave Agent.
@@ -145,22 +475,112 @@ Guidelines:
             llm_client: LLMChatClient instance (created if not provided)
         """
         self.model = model or settings.profile_model
-        self.llm = llm_client or create_llm_client(self.model)
+        self.llm = llm_client or _shared_llm_client(self.model, settings.llm_provider)
+
+    async def aclose(self) -> None:
+        """
+        Release the connections behind this agent's client.
+
+        Factory-built clients share the process-wide pool (llm.http),
+        which outlives any one agent and is closed at shutdown; for those
+        this is a no-op. A client with its own pool closes it here.
+        """
+        await self.llm.aclose()
+
+    async def __aenter__(self) -> "BehaveAgent":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
     
     def analyze_behavior(
         self,
         behavior_data: Dict[str, Any],
         user_profile: Optional[Dict[str, Any]] = None,
     ) -> BehaviorAnalysisResult:
-        """Synchronous wrapper for backward compatibility."""
-        import asyncio
-        return asyncio.run(self.analyze_behavior_async(behavior_data, user_profile))
+        """
+        Deprecated synchronous wrapper: await analyze_behavior_async.
+
+        Runs on the thread's persistent loop (utils.sync_loop). Only
+        valid where no event loop is running (scripts, CLI); inside one
+        it refuses up front, as blocking there would stall every other
+        request on that loop.
+        """
+        warnings.warn(
+            "BehaveAgent.analyze_behavior() is deprecated; "
+            "await analyze_behavior_async() instead",
+            DeprecationWarning,
+            stacklevel=2,
+        )
+        return run_sync(self.analyze_behavior_async(behavior_data, user_profile))
+
+    async def analyze_behavior_batch_async(
+        self,
+        items: List[Dict[str, Any]],
+        user_profiles: Optional[List[Optional[Dict[str, Any]]]] = None,
+    ) -> List[BehaviorAnalysisResult]:
+        """
+        Analyze many sessions concurrently.
+
+        The work is network-bound on the provider, so the calls overlap
+        instead of queueing one round-trip after the other. At most
+        MAX_CONCURRENT_LLM are in flight at once to stay under the
+        provider's rate limit. Results come back in input order; a failed
+        item yields the empty result, never fails the batch.
+
+        Args:
+            items: Behavior summaries, one per session
+            user_profiles: Optional profiles aligned with items
+
+        Returns:
+            One BehaviorAnalysisResult per item
+
+        Raises:
+            ValueError: user_profiles is given but not one per item
+        """
+        if user_profiles is not None and len(user_profiles) != len(items):
+            raise ValueError(
+                f"got {len(user_profiles)} user profiles for {len(items)} items"
+            )
+        if not items:
+            return []
+        profiles = user_profiles if user_profiles is not None else [None] * len(items)
+        semaphore = asyncio.Semaphore(max(1, settings.max_concurrent_llm))
+
+        async def _bounded(behavior_data, user_profile):
+            async with semaphore:
+                return await self.analyze_behavior_async(behavior_data, user_profile)
+
+        results = await asyncio.gather(
+            *(_bounded(data, profile) for data, profile in zip(items, profiles)),
+            return_exceptions=True,
+        )
+        return [
+            self._empty_result() if isinstance(result, BaseException) else result
+            for result in results
+        ]
     
-    @cacheable()
+    def needs_llm(self, behavior_data: Optional[Dict[str, Any]]) -> bool:
+        """
+        Whether a session carries enough signal to be worth a model call.
+
+        Under HEURISTIC_MIN_CLICKS clicks, or a quick_analyze engagement
+        under HEURISTIC_MIN_ENGAGEMENT, the heuristic already says all
+        the data can support and the round-trip buys nothing. Public so
+        that budget accounting (AgentOrchestrator.planned_generations)
+        counts the same calls this agent actually makes.
+        """
+        if not behavior_data:
+            return False
+        if (behavior_data.get("clickCount", 0) or 0) < self.HEURISTIC_MIN_CLICKS:
+            return False
+        return self.quick_analyze(behavior_data)["engagement_score"] >= self.HEURISTIC_MIN_ENGAGEMENT
+
     async def analyze_behavior_async(
         self,
         behavior_data: Dict[str, Any],
         user_profile: Optional[Dict[str, Any]] = None,
+        force_llm: bool = False,
     ) -> BehaviorAnalysisResult:
         """
         Analyze user behavior data and extract insights asynchronously.
@@ -168,41 +588,163 @@ Guidelines:
         Args:
             behavior_data: Compact behavior summary from frontend
             user_profile: Current user profile for context
+            force_llm: Call the model even when needs_llm() says the
+                heuristic is enough
             
         Returns:
             BehaviorAnalysisResult with insights and profile updates
         """
         if not behavior_data:
             return self._empty_result()
-        
-        prompt = self._build_analysis_prompt(behavior_data, user_profile)
+        if not force_llm and not self.needs_llm(behavior_data):
+            return self._heuristic_result(behavior_data)
         
         try:
-            response_text = await self.llm.complete_json(self.SYSTEM_PROMPT, prompt)
-            parsed = self._parse_response(response_text)
-            
-            return BehaviorAnalysisResult(
-                insights=[
-                    BehaviorInsight(
-                        category=i.get("category", "unknown"),
-                        key=i.get("key", ""),
-                        value=i.get("value"),
-                        confidence=i.get("confidence", 0.5),
-                        evidence=i.get("evidence", ""),
-                    )
-                    for i in parsed.get("insights", [])
-                    if i.get("confidence", 0) >= 0.5
-                ],
-                profile_updates=parsed.get("profile_updates", []),
-                engagement_score=parsed.get("engagement_score", 0.5),
-                user_type=parsed.get("user_type", "casual"),
-                session_summary=parsed.get("session_summary", ""),
-                recommended_ui_adjustments=parsed.get("recommended_ui_adjustments", []),
-            )
-            
+            return await self._analyze_with_llm(behavior_data, user_profile)
         except Exception as e:
             logger.error(f"Behavior analysis failed: {e}")
             return self._empty_result()
+
+    @cacheable(key_func=_analysis_cache_key)
+    async def _analyze_with_llm(
+        self,
+        behavior_data: Dict[str, Any],
+        user_profile: Optional[Dict[str, Any]] = None,
+    ) -> BehaviorAnalysisResult:
+        """
+        The LLM call behind analyze_behavior_async, cached by fingerprint.
+
+        Raises instead of returning the empty result, so a provider error
+        or an unparseable reply is never written to the cache: only
+        successful analyses are.
+        """
+        prompt = self._build_analysis_prompt(behavior_data, user_profile)
+        response_text = await self.llm.complete_json(
+            self.SYSTEM_PROMPT, prompt, json_schema=BEHAVIOR_OUTPUT_SCHEMA
+        )
+        parsed = self._parse_response(response_text)
+        if not parsed:
+            raise ValueError("unparseable behavior analysis response")
+        return self._build_result(parsed)
+
+    async def analyze_behavior_stream_async(
+        self,
+        behavior_data: Dict[str, Any],
+        user_profile: Optional[Dict[str, Any]] = None,
+        force_llm: bool = False,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Analyze behavior over the streaming API. Yields events:
+
+            {"type": "insight", "insight": BehaviorInsight}
+                one per insight (confidence >= 0.5), as soon as its
+                closing brace arrives
+            {"type": "complete", "result": BehaviorAnalysisResult}
+                the final result; its insights are the ones already
+                yielded, so nothing is parsed twice
+
+        Decoding overlaps the network instead of starting after the last
+        token. Any failure, an unparseable reply included, ends the stream
+        with the empty result, as analyze_behavior_async returns it. Not cached: this is the latency path, the cached
+        one is analyze_behavior_async.
+        """
+        if not behavior_data:
+            yield {"type": "complete", "result": self._empty_result()}
+            return
+        if not force_llm and not self.needs_llm(behavior_data):
+            yield {"type": "complete", "result": self._heuristic_result(behavior_data)}
+            return
+
+        try:
+            prompt = self._build_analysis_prompt(behavior_data, user_profile)
+            parser = ComponentStreamParser(array_key="insights")
+            insights: List[BehaviorInsight] = []
+
+            async for delta in self.llm.stream_json(self.SYSTEM_PROMPT, prompt):
+                for raw in parser.feed(delta):
+                    if not _keep_insight(raw):
+                        continue
+                    insight = BehaviorInsight.from_dict(raw)
+                    insights.append(insight)
+                    yield {"type": "insight", "insight": insight}
+
+            parsed = self._parse_response(parser.text)
+            if not parsed:
+                # As in _analyze_with_llm: no populated default analysis
+                raise ValueError("unparseable behavior analysis response")
+            result = self._build_result(dict(parsed, insights=[]))
+            result.insights = insights
+        except Exception as e:
+            logger.error(f"Streaming behavior analysis failed: {e}")
+            result = self._empty_result()
+
+        yield {"type": "complete", "result": result}
+
+    async def analyze_behavior_marshalled(
+        self,
+        items: List[Dict[str, Any]],
+        batch_size: int = 8,
+    ) -> List[BehaviorAnalysisResult]:
+        """
+        Analyze many sessions with one LLM call per batch_size rows.
+
+        For bulk/offline analytics: the system prompt, the request
+        overhead and the queueing are paid once per batch instead of once
+        per session, at the price of a slower call per row. Past 4-8 rows
+        the saving flattens and a single bad answer costs more rows, hence
+        the default.
+
+        Rows are independent (no profile context). A row the model drops
+        or garbles yields the empty result; a failed call empties its
+        whole batch, never the others.
+
+        Returns:
+            One BehaviorAnalysisResult per item, in input order
+        """
+        batch_size = max(1, batch_size)
+        system = self.SYSTEM_PROMPT + self.MARSHALLED_INSTRUCTIONS
+        results: List[BehaviorAnalysisResult] = []
+        for start in range(0, len(items), batch_size):
+            batch = items[start:start + batch_size]
+            try:
+                response_text = await self.llm.complete_json(
+                    system,
+                    self._build_marshalled_prompt(batch),
+                    json_schema=MARSHALLED_OUTPUT_SCHEMA,
+                )
+                rows = self._parse_rows(response_text, len(batch))
+            except Exception as e:
+                logger.error(f"Marshalled behavior analysis failed: {e}")
+                rows = [None] * len(batch)
+            for row, data in zip(rows, batch):
+                if not (row and data):
+                    results.append(self._empty_result())
+                    continue
+                # A garbled row empties itself, not the rest of the batch
+                try:
+                    results.append(self._build_result(row))
+                except Exception as e:
+                    logger.warning(f"Unusable marshalled behavior row: {e}")
+                    results.append(self._empty_result())
+        return results
+
+    def _build_result(self, parsed: Dict[str, Any]) -> BehaviorAnalysisResult:
+        """Build a result from one parsed analysis object."""
+        user_type = parsed.get("user_type")
+        return BehaviorAnalysisResult(
+            insights=[
+                BehaviorInsight.from_dict(i)
+                for i in parsed.get("insights", [])
+                if _keep_insight(i)
+            ],
+            profile_updates=[
+                u for u in parsed.get("profile_updates", []) if _keep_profile_update(u)
+            ],
+            engagement_score=parsed.get("engagement_score", 0.5),
+            user_type=user_type if user_type in _VALID_USER_TYPES else "casual",
+            session_summary=parsed.get("session_summary", ""),
+            recommended_ui_adjustments=parsed.get("recommended_ui_adjustments", []),
+        )
     
     def _build_analysis_prompt(
         self,
@@ -224,47 +766,27 @@ Guidelines:
         parts.append("\nAnalyze this behavior data and respond with valid JSON matching the specified structure.")
         
         return "\n\n".join(parts)
+
+    def _build_marshalled_prompt(self, items: List[Dict[str, Any]]) -> str:
+        """Build one prompt holding several sessions as numbered rows."""
+        rows = "\n".join(
+            f'<row id="{n}">\n{self._format_behavior_data(data or {})}\n</row>'
+            for n, data in enumerate(items)
+        )
+        return (
+            f"<rows>\n{rows}\n</rows>\n\n"
+            f"Analyze each of the {len(items)} rows independently and respond "
+            "with valid JSON: {\"results\": [...]}, one object per row, in order."
+        )
     
     def _format_behavior_data(self, data: Dict[str, Any]) -> str:
-        """Format behavior data for the prompt."""
-        lines = []
-        
-        # Session info
-        duration_sec = data.get("duration", 0) / 1000
-        lines.append(f"Session Duration: {duration_sec:.1f} seconds")
-        lines.append(f"Total Clicks: {data.get('clickCount', 0)}")
-        lines.append(f"Max Scroll Depth: {data.get('maxScrollDepth', 0)}%")
-        lines.append(f"Pages Visited: {data.get('pagesVisited', 0)}")
-        
-        # Heatmap zones
-        heatmap = data.get("heatmapZones", [])
-        if heatmap:
-            lines.append("\nClick Heatmap Distribution:")
-            for zone in heatmap[:5]:  # Top 5 zones
-                lines.append(f"  - {zone.get('zone', 'unknown')}: {zone.get('count', 0)} clicks")
-        
-        # Navigation path
-        nav_path = data.get("navigationPath", [])
-        if nav_path:
-            lines.append(f"\nNavigation Path: {' → '.join(nav_path[-10:])}")
-        
-        # Recent clicks
-        recent_clicks = data.get("recentClicks", [])
-        if recent_clicks:
-            lines.append("\nRecent Click Targets:")
-            for click in recent_clicks[-5:]:
-                target = click.get("target", "unknown")
-                target_id = click.get("targetId", "")
-                lines.append(f"  - {target}" + (f"#{target_id}" if target_id else ""))
-        
-        # Recent interactions
-        interactions = data.get("recentInteractions", [])
-        if interactions:
-            lines.append("\nElement Interactions:")
-            for inter in interactions[-10:]:
-                lines.append(f"  - {inter.get('interactionType', 'unknown')} on {inter.get('elementType', 'unknown')} ({inter.get('elementId', 'no-id')})")
-        
-        return "\n".join(lines)
+        """Format behavior data for the prompt (memoized per projection)."""
+        key = _format_key(data)
+        try:
+            return _format_behavior_block(key)
+        except TypeError:
+            # An unhashable value in a malformed summary: format uncached
+            return _format_behavior_block.__wrapped__(key)
     
     def _summarize_profile(self, profile: Dict[str, Any]) -> str:
         """Create a brief summary of existing profile."""
@@ -273,41 +795,69 @@ Guidelines:
         if profile.get("preferences"):
             prefs = profile["preferences"]
             if isinstance(prefs, dict):
-                pref_items = [f"{k}: {v}" for k, v in list(prefs.items())[:5]]
+                pref_items = [f"{k}: {v}" for k, v in islice(prefs.items(), 5)]
                 parts.append(f"Known Preferences: {', '.join(pref_items)}")
         
         if profile.get("behavior"):
             behavior = profile["behavior"]
             if isinstance(behavior, dict):
-                behav_items = [f"{k}: {v}" for k, v in list(behavior.items())[:5]]
+                behav_items = [f"{k}: {v}" for k, v in islice(behavior.items(), 5)]
                 parts.append(f"Known Behaviors: {', '.join(behav_items)}")
         
         return "\n".join(parts) if parts else "No existing profile data."
     
     def _parse_response(self, response_text: str) -> Dict[str, Any]:
         """Parse the JSON response from the agent."""
+        if isinstance(response_text, dict):
+            return response_text
         try:
-            if isinstance(response_text, dict):
-                return response_text
-            if isinstance(response_text, list):
-                return {}
-            
-            # Handle markdown code blocks
-            if "```json" in response_text:
-                start = response_text.find("```json") + 7
-                end = response_text.find("```", start)
-                response_text = response_text[start:end].strip()
-            elif "```" in response_text:
-                start = response_text.find("```") + 3
-                end = response_text.find("```", start)
-                response_text = response_text[start:end].strip()
-            
-            return json.loads(response_text)
-            
+            parsed = loads_llm_json(reply_text(response_text))
         except (json.JSONDecodeError, TypeError) as e:
             logger.warning(f"Failed to parse behavior analysis response: {e}")
             return {}
+        return parsed if isinstance(parsed, dict) else {}
+
+    def _parse_rows(self, response_text: str, expected: int) -> List[Optional[Dict[str, Any]]]:
+        """
+        Fan a multi-row response out to one parsed object per row.
+
+        Accepts {"results": [...]} or a bare array. Rows are placed by
+        their "row" index when the model gives one, by position otherwise;
+        missing rows come back as None.
+        """
+        parsed: Any = response_text
+        if not isinstance(parsed, (dict, list)):
+            try:
+                parsed = loads_llm_json(reply_text(parsed))
+            except json.JSONDecodeError as e:
+                logger.warning(f"Failed to parse marshalled behavior response: {e}")
+                return [None] * expected
+        if isinstance(parsed, dict):
+            parsed = parsed.get("results", [])
+        if not isinstance(parsed, list):
+            return [None] * expected
+
+        rows: List[Optional[Dict[str, Any]]] = [None] * expected
+        for position, item in enumerate(parsed):
+            if not isinstance(item, dict):
+                continue
+            index = item.get("row", position)
+            if isinstance(index, int) and 0 <= index < expected and rows[index] is None:
+                rows[index] = item
+        return rows
     
+    def _heuristic_result(self, behavior_data: Dict[str, Any]) -> BehaviorAnalysisResult:
+        """Result synthesized from quick_analyze, for sessions too thin for the LLM."""
+        quick = self.quick_analyze(behavior_data)
+        return BehaviorAnalysisResult(
+            insights=[],
+            profile_updates=[],
+            engagement_score=quick["engagement_score"],
+            user_type=quick["user_type"],
+            session_summary="Heuristic (insufficient data for LLM).",
+            recommended_ui_adjustments=[],
+        )
+
     def _empty_result(self) -> BehaviorAnalysisResult:
         """Return an empty result when analysis cannot be performed."""
         return BehaviorAnalysisResult(
@@ -334,29 +884,7 @@ Guidelines:
         scroll_depth = behavior_data.get("maxScrollDepth", 0)
         pages = behavior_data.get("pagesVisited", 0)
         
-        # Calculate engagement score
-        engagement = 0.0
-        if duration > 30:
-            engagement += 0.2
-        if duration > 120:
-            engagement += 0.2
-        if clicks > 5:
-            engagement += 0.2
-        if scroll_depth > 50:
-            engagement += 0.2
-        if pages > 2:
-            engagement += 0.2
-        
-        # Determine user type
-        user_type = "casual"
-        if pages > 5 and clicks > 10:
-            user_type = "explorer"
-        elif scroll_depth > 80 and duration > 60:
-            user_type = "deep_reader"
-        elif clicks > 15 and duration < 60:
-            user_type = "scanner"
-        elif pages <= 2 and scroll_depth > 50:
-            user_type = "focused"
+        engagement, user_type_id = _quick_score(duration, clicks, scroll_depth, pages)
         
         # Determine attention pattern from heatmap
         heatmap = behavior_data.get("heatmapZones", [])
@@ -371,8 +899,8 @@ Guidelines:
                 attention_pattern = "bottom-focused"
         
         return {
-            "engagement_score": min(engagement, 1.0),
-            "user_type": user_type,
+            "engagement_score": engagement,
+            "user_type": _USER_TYPES[user_type_id],
             "attention_pattern": attention_pattern,
             "metrics": {
                 "duration_seconds": duration,
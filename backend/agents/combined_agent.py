@@ -0,0 +1,134 @@
+"""
+Combined Analysis Agent Module
+Runs the profile and behavior analyses of one chat turn as a single LLM call.
+
+Both analyses read the same turn and, by default, go to the same model.
+Asked together they cost one round-trip and one system prompt instead of
+two; the answer is split back into the two agents' own result types, so
+nothing downstream can tell which path produced them.
+"""
+
+import logging
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from config import settings
+from utils.json_extract import loads_llm_json, reply_text
+
+from .behave_agent import BEHAVIOR_OUTPUT_SCHEMA, BehaveAgent, BehaviorAnalysisResult
+from .profile_agent import ProfileAgent, ProfileAnalysisResult
+
+logger = logging.getLogger(__name__)
+
+
+COMBINED_OUTPUT_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "required": ["profile", "behavior"],
+    "properties": {
+        "profile": {"type": "object"},
+        "behavior": BEHAVIOR_OUTPUT_SCHEMA,
+    },
+}
+
+
+class CombinedAnalysisAgent:
+    """
+    One model call answering both the ProfileAgent and the BehaveAgent.
+
+    Used by the orchestrator only when settings.combined_analysis is on
+    and both agents would call the model, and the same model, for this
+    turn (see applies). Results are not cached: the separate paths cache
+    per agent, and a combined entry would only hit on a repeat of both
+    the message and the session.
+    """
+
+    SYSTEM_PROMPT = (
+        "You run two independent analyses of the same chat turn and answer "
+        "both in ONE JSON object:\n"
+        '{"profile": <task 1 object>, "behavior": <task 2 object>}\n'
+        "Each task's instructions below describe its own object; where they "
+        "say to respond with JSON, they mean that object.\n\n"
+        "## Task 1: profile analysis (input in <profile_task>)\n\n"
+        + ProfileAgent.SYSTEM_PROMPT
+        + "\n## Task 2: behavior analysis (input in <behavior_task>)\n\n"
+        + BehaveAgent.SYSTEM_PROMPT
+    )
+
+    def __init__(self, profile_agent: ProfileAgent, behave_agent: BehaveAgent):
+        self.profile_agent = profile_agent
+        self.behave_agent = behave_agent
+
+    def applies(
+        self,
+        message: Optional[str],
+        behavior_data: Optional[Dict[str, Any]],
+    ) -> bool:
+        """Whether this turn's two analyses go out as one call."""
+        if not settings.combined_analysis or message is None:
+            return False
+        model = getattr(self.profile_agent, "model", None)
+        return (
+            model is not None
+            and model == getattr(self.behave_agent, "model", None)
+            and self.profile_agent.needs_llm(message)
+            and self.behave_agent.needs_llm(behavior_data)
+        )
+
+    async def analyze_async(
+        self,
+        message: str,
+        conversation_context: Optional[Iterable[Dict]],
+        behavior_data: Dict[str, Any],
+        user_profile: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[ProfileAnalysisResult, BehaviorAnalysisResult]:
+        """
+        Both analyses from one call. Failures degrade each half to its
+        agent's empty result, as the separate calls do.
+        """
+        profile_prompt = self.profile_agent._build_prompt(message, conversation_context)
+        behavior_prompt = self.behave_agent._build_analysis_prompt(behavior_data, user_profile)
+        prompt = (
+            f"<profile_task>\n{profile_prompt}\n</profile_task>\n\n"
+            f"<behavior_task>\n{behavior_prompt}\n</behavior_task>\n\n"
+            'Respond with valid JSON: {"profile": {...}, "behavior": {...}}.'
+        )
+        try:
+            reply = await self.profile_agent.llm.complete_json(
+                self.SYSTEM_PROMPT, prompt, json_schema=COMBINED_OUTPUT_SCHEMA
+            )
+            parsed = reply if isinstance(reply, dict) else loads_llm_json(reply_text(reply))
+            if not isinstance(parsed, dict):
+                raise ValueError("combined analysis reply is not an object")
+        except Exception as e:
+            logger.error(f"Combined analysis failed: {e}")
+            parsed = {}
+
+        # Each half is built on its own: a garbled one (an update without
+        # "field", "insights": null) must not take the other half, or the
+        # response agent running beside this call, down with it
+        profile = parsed.get("profile")
+        try:
+            profile_result = (
+                self.profile_agent._build_result(profile, message)
+                if isinstance(profile, dict) else self.profile_agent._empty_result()
+            )
+        except Exception as e:
+            logger.warning(f"Combined analysis: unusable profile half: {e}")
+            profile_result = self.profile_agent._empty_result()
+
+        behavior = parsed.get("behavior")
+        try:
+            behavior_result = (
+                self.behave_agent._build_result(behavior)
+                if isinstance(behavior, dict) and behavior else self.behave_agent._empty_result()
+            )
+        except Exception as e:
+            logger.warning(f"Combined analysis: unusable behavior half: {e}")
+            behavior_result = self.behave_agent._empty_result()
+
+        return profile_result, behavior_result
+
+
+# Factory function
+def create_combined_agent(profile_agent: ProfileAgent, behave_agent: BehaveAgent) -> CombinedAnalysisAgent:
+    """Create a CombinedAnalysisAgent over existing agents."""
+    return CombinedAnalysisAgent(profile_agent, behave_agent)
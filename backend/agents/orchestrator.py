@@ -5,23 +5,51 @@ Coordinates the Response Agent, Profile Agent, and Behave Agent for unified quer
 
 import logging
 import asyncio
-from typing import Dict, Any, List, Optional
-from dataclasses import dataclass
+import sys
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
+from dataclasses import dataclass, field
 
 from .response_agent import ResponseAgent, AgentResponse, create_response_agent
 from .profile_agent import ProfileAgent, ProfileAnalysisResult, create_profile_agent
 from .behave_agent import BehaveAgent, BehaviorAnalysisResult, create_behave_agent
+from .combined_agent import CombinedAnalysisAgent, create_combined_agent
+from utils.sync_loop import run_sync
 
 logger = logging.getLogger(__name__)
 
+# asyncio.TaskGroup (3.11+) cancels the sibling agents when one fails;
+# 3.10 keeps gather, where they run to completion regardless
+_HAVE_TASK_GROUP = sys.version_info >= (3, 11)
 
-@dataclass
+
+async def _run_agents(*coros):
+    """
+    Await the agent calls concurrently and return their results in order.
+
+    With a TaskGroup, the first failure cancels the calls still in flight
+    instead of letting them finish (and bill) an answer nobody will read,
+    and it is re-raised as itself rather than wrapped in an ExceptionGroup,
+    so callers see the same error gather gave them.
+    """
+    if not _HAVE_TASK_GROUP:
+        return await asyncio.gather(*coros)
+    try:
+        async with asyncio.TaskGroup() as tg:
+            tasks = [tg.create_task(coro) for coro in coros]
+    except BaseExceptionGroup as group:  # noqa: F821 (3.11+ only)
+        raise group.exceptions[0]
+    return [task.result() for task in tasks]
+
+
+@dataclass(slots=True)
 class OrchestratorResult:
     """Combined result from all agents."""
     response: AgentResponse
     profile_analysis: ProfileAnalysisResult
     behavior_analysis: Optional[BehaviorAnalysisResult]
     updated_profile: Optional[Dict[str, Any]]
+    # to_frontend_response, built on first call (a slot: no cached_property)
+    _frontend: Optional[Dict[str, Any]] = field(default=None, init=False, repr=False, compare=False)
     
     def to_dict(self) -> Dict[str, Any]:
         result = {
@@ -37,22 +65,29 @@ class OrchestratorResult:
         """
         Format for frontend consumption.
         Includes only what the frontend needs.
+
+        Built once per result: the endpoint, the audit log and the profile
+        store all read it, so later calls return the same dict. Treat it as
+        read-only.
         """
-        # Combine profile updates from both Profile Agent and Behave Agent
+        if self._frontend is None:
+            self._frontend = self._build_frontend_response()
+        return self._frontend
+
+    def _build_frontend_response(self) -> Dict[str, Any]:
+        # Combine profile updates from both Profile Agent and Behave Agent.
+        # Behavior updates are copied with the "behavior." prefix, never
+        # renamed in place: behavior_analysis stays as the agent returned it.
         all_updates = [u.to_dict() for u in self.profile_analysis.updates]
+        should_update = self.profile_analysis.has_profile_info
         
         if self.behavior_analysis:
-            # Add behavior-derived updates with "behavior." prefix
             for update in self.behavior_analysis.profile_updates:
-                # Ensure behavior updates have proper field naming
                 field = update.get("field", "")
                 if not field.startswith("behavior."):
-                    update["field"] = f"behavior.{field}"
+                    update = {**update, "field": f"behavior.{field}"}
                 all_updates.append(update)
-        
-        should_update = self.profile_analysis.has_profile_info or (
-            self.behavior_analysis and len(self.behavior_analysis.profile_updates) > 0
-        )
+                should_update = True
         
         response = {
             # Main response content
@@ -102,6 +137,11 @@ class AgentOrchestrator:
     
     All agents run in parallel for efficiency.
     """
+
+    __slots__ = (
+        "response_agent", "profile_agent", "behave_agent", "combined_agent",
+        "parallel_execution",
+    )
     
     def __init__(
         self,
@@ -122,14 +162,27 @@ class AgentOrchestrator:
         self.response_agent = response_agent or create_response_agent()
         self.profile_agent = profile_agent or create_profile_agent()
         self.behave_agent = behave_agent or create_behave_agent()
+        # Profile + behavior in one call, when settings.combined_analysis is on
+        self.combined_agent: CombinedAnalysisAgent = create_combined_agent(
+            self.profile_agent, self.behave_agent,
+        )
         self.parallel_execution = parallel_execution
     
-    def planned_generations(self, behavior_data: Optional[Dict[str, Any]] = None) -> int:
+    def planned_generations(
+        self,
+        behavior_data: Optional[Dict[str, Any]] = None,
+        query: Optional[str] = None,
+    ) -> int:
         """
         Model calls one process() will make: one per agent that runs.
 
-        Response and profile agents run on every turn; the behave agent
-        only when the request carries behavior data. Callers charging
+        The response agent runs on every turn; the profile agent only when
+        the query could carry profile information (plain short questions
+        skip it; without a query it is counted), and the behave agent only
+        when the request carries behavior data with enough signal for a
+        model call (thin sessions get its heuristic). With
+        settings.combined_analysis, a turn needing both analyses makes one
+        call for the two (CombinedAnalysisAgent.applies). Callers charging
         the LLM budget need this BEFORE spending, so it lives next to
         the fan-out it counts: an agent added below without a number
         here would go on being spent and never be charged.
@@ -139,7 +192,10 @@ class AgentOrchestrator:
         as a floor on purpose: the alternative is charging for rounds
         that usually do not happen.
         """
-        return 3 if behavior_data else 2
+        if self.combined_agent.applies(query, behavior_data):
+            return 2  # the answer, and one call for both analyses
+        profile = query is None or self.profile_agent.needs_llm(query)
+        return 1 + int(profile) + int(self.behave_agent.needs_llm(behavior_data))
 
     async def process(
         self,
@@ -174,7 +230,7 @@ class AgentOrchestrator:
         behavior_data: Optional[Dict[str, Any]] = None,
     ) -> OrchestratorResult:
         """Synchronous wrapper for backwards compatibility."""
-        return asyncio.run(self.process(query, user_profile, conversation_history, behavior_data))
+        return run_sync(self.process(query, user_profile, conversation_history, behavior_data))
     
     async def _process_parallel_async(
         self,
@@ -184,38 +240,17 @@ class AgentOrchestrator:
         behavior_data: Optional[Dict[str, Any]],
         tenant: Optional[str] = None,
     ) -> OrchestratorResult:
-        """Run all agents in parallel using asyncio.gather for true async concurrency."""
+        """Run all agents in parallel on the event loop (see _run_agents)."""
         
-        # Create coroutines for each agent
-        response_task = self.response_agent.process_query_async(
-            query,
-            user_profile,
-            conversation_history,
-            tenant,
-        )
-        
-        profile_task = self.profile_agent.analyze_message_async(
-            query,
-            conversation_history,
-        )
-        
-        # Gather all tasks to run in parallel
-        if behavior_data:
-            behavior_task = self.behave_agent.analyze_behavior_async(
-                behavior_data,
+        response_result, (profile_result, behavior_result) = await _run_agents(
+            self.response_agent.process_query_async(
+                query,
                 user_profile,
-            )
-            response_result, profile_result, behavior_result = await asyncio.gather(
-                response_task,
-                profile_task,
-                behavior_task,
-            )
-        else:
-            response_result, profile_result = await asyncio.gather(
-                response_task,
-                profile_task,
-            )
-            behavior_result = None
+                conversation_history,
+                tenant,
+            ),
+            self._analyze_async(query, user_profile, conversation_history, behavior_data),
+        )
         
         # Merge all profile updates
         updated_profile = self._merge_all_updates(
@@ -231,6 +266,92 @@ class AgentOrchestrator:
             updated_profile=updated_profile,
         )
     
+    async def process_stream(
+        self,
+        query: str,
+        user_profile: Optional[Dict[str, Any]] = None,
+        conversation_history: Optional[List[Dict]] = None,
+        behavior_data: Optional[Dict[str, Any]] = None,
+        tenant: Optional[str] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process a query with the answer streamed. Yields events:
+
+            {"type": "component", "component": {...}}
+                as ResponseAgent.process_query_stream_async yields them
+            {"type": "complete", "result": OrchestratorResult}
+                the same result process() would have returned
+
+        The profile and behavior analyses run while the answer streams
+        (after it, with parallel_execution off); they only feed the
+        complete event, so the first component never waits for them.
+        An analysis failure is raised, as in process(); closing the
+        stream early cancels the analyses still running.
+        """
+        analyses = None
+        if self.parallel_execution:
+            analyses = asyncio.ensure_future(
+                self._analyze_async(query, user_profile, conversation_history, behavior_data)
+            )
+        try:
+            async for event in self.response_agent.process_query_stream_async(
+                query, user_profile, conversation_history, tenant,
+            ):
+                if event["type"] == "component":
+                    yield event
+                    continue
+
+                if analyses is None:
+                    profile_result, behavior_result = await self._analyze_async(
+                        query, user_profile, conversation_history, behavior_data,
+                    )
+                else:
+                    profile_result, behavior_result = await analyses
+                yield {"type": "complete", "result": OrchestratorResult(
+                    response=event["response"],
+                    profile_analysis=profile_result,
+                    behavior_analysis=behavior_result,
+                    updated_profile=self._merge_all_updates(
+                        user_profile, profile_result, behavior_result,
+                    ),
+                )}
+        finally:
+            if analyses is not None and not analyses.done():
+                analyses.cancel()
+
+    async def _analyze_async(
+        self,
+        query: str,
+        user_profile: Optional[Dict[str, Any]],
+        conversation_history: Optional[List[Dict]],
+        behavior_data: Optional[Dict[str, Any]],
+    ) -> Tuple[ProfileAnalysisResult, Optional[BehaviorAnalysisResult]]:
+        """The profile and behavior analyses of one turn, concurrently."""
+        if behavior_data and self.combined_agent.applies(query, behavior_data):
+            return await self.combined_agent.analyze_async(
+                query,
+                conversation_history,
+                behavior_data,
+                user_profile,
+            )
+        if behavior_data:
+            profile_result, behavior_result = await _run_agents(
+                self.profile_agent.analyze_message_async(
+                    query,
+                    conversation_history,
+                ),
+                self.behave_agent.analyze_behavior_async(
+                    behavior_data,
+                    user_profile,
+                ),
+            )
+            return profile_result, behavior_result
+        profile_result = await self.profile_agent.analyze_message_async(
+            query,
+            conversation_history,
+        )
+        return profile_result, None
+
     async def _process_sequential_async(
         self,
         query: str,
@@ -249,19 +370,28 @@ class AgentOrchestrator:
             tenant,
         )
         
-        # Then profile agent
-        profile_result = await self.profile_agent.analyze_message_async(
-            query,
-            conversation_history,
-        )
-        
-        # Then behavior agent if we have data
         behavior_result = None
-        if behavior_data:
-            behavior_result = await self.behave_agent.analyze_behavior_async(
+        if behavior_data and self.combined_agent.applies(query, behavior_data):
+            # Then both analyses in one call
+            profile_result, behavior_result = await self.combined_agent.analyze_async(
+                query,
+                conversation_history,
                 behavior_data,
                 user_profile,
             )
+        else:
+            # Then profile agent
+            profile_result = await self.profile_agent.analyze_message_async(
+                query,
+                conversation_history,
+            )
+            
+            # Then behavior agent if we have data
+            if behavior_data:
+                behavior_result = await self.behave_agent.analyze_behavior_async(
+                    behavior_data,
+                    user_profile,
+                )
         
         # Merge all profile updates
         updated_profile = self._merge_all_updates(
@@ -294,13 +424,15 @@ class AgentOrchestrator:
         if not has_updates:
             return None
         
-        # Start with profile agent updates
-        updated_profile = user_profile.copy()
+        # One shallow copy, owned from here on: the merges below write into
+        # it and copy only the category dicts they touch
+        updated_profile = dict(user_profile)
         
         if profile_result.has_profile_info:
             updated_profile = self.profile_agent.merge_profile_updates(
                 updated_profile,
                 profile_result.updates,
+                copy=False,
             )
         
         # Add behavior agent updates
@@ -317,32 +449,30 @@ class AgentOrchestrator:
         profile: Dict[str, Any],
         behavior_result: BehaviorAnalysisResult,
     ) -> Dict[str, Any]:
-        """Apply behavior-derived updates to profile."""
-        if "behavior" not in profile:
-            profile["behavior"] = {}
+        """Apply behavior-derived updates to profile (in place, see _merge_all_updates)."""
+        # The nested dict may still be the caller's: copy before writing
+        behavior = profile["behavior"] = dict(profile.get("behavior", {}))
         
         # Apply individual updates
         for update in behavior_result.profile_updates:
-            field = update.get("field", "")
+            # Remove "behavior." prefix if present
+            field = update.get("field", "").removeprefix("behavior.")
             value = update.get("value")
             confidence = update.get("confidence", 0.5)
-            
-            # Remove "behavior." prefix if present
-            if field.startswith("behavior."):
-                field = field[9:]
-            
-            # Only apply if confidence is high enough
-            if confidence >= 0.5 and field and value is not None:
-                profile["behavior"][field] = {
+            # Low-confidence updates never get here: every behavior result,
+            # combined and streamed ones included, is built by
+            # BehaveAgent._build_result, which drops them
+            if field and value is not None:
+                behavior[field] = {
                     "value": value,
                     "confidence": confidence,
                     "updated_at": None,  # Will be set by frontend
                 }
         
         # Store aggregated behavior metrics
-        profile["behavior"]["_engagement_score"] = behavior_result.engagement_score
-        profile["behavior"]["_user_type"] = behavior_result.user_type
-        profile["behavior"]["_last_analysis"] = behavior_result.session_summary
+        behavior["_engagement_score"] = behavior_result.engagement_score
+        behavior["_user_type"] = behavior_result.user_type
+        behavior["_last_analysis"] = behavior_result.session_summary
         
         return profile
     
@@ -5,26 +5,77 @@ Determines what user data should be stored in IndexedDB.
 """
 
 import logging
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterable, List, Optional, Tuple, Union
+from collections import deque
 from dataclasses import dataclass, field
+from functools import lru_cache
 from datetime import datetime, timezone
+import hashlib
+import io
 import json
+import re
+
+import numpy as np
 
 from config import settings
 from llm import create_llm_client
 from utils.cache import cacheable
+from utils.json_extract import loads_llm_json, reply_text
+from utils.json_stream import JsonDocumentBuffer
+from utils.sync_loop import run_sync
 
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+def _utc_now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+@lru_cache(maxsize=1024)
+def _split_field(path: str) -> Optional[Tuple[str, str]]:
+    """
+    "category.key" -> (category, key); None unless there is exactly one dot.
+
+    Field paths come from a small vocabulary (preference.*, interest.*,
+    ...), so every merge after the first finds its split here.
+    """
+    category, sep, key = path.partition(".")
+    if not sep or "." in key:
+        return None
+    return category, key
+
+# First-person and style cues that a message may carry profile information.
+# A short message with none of them is answered without the model (see needs_llm).
+_PROFILE_HINT_RE = re.compile(
+    r"\b(i['’]?m|i am|i work|i prefer|i (?:like|love|need|want|use)|my\b|"
+    r"i (?:have|live|just)|as an?\s+\w+|call me|please\s+(?:avoid|use)|"
+    # Style feedback without a first person ("explain this more simply")
+    r"simpl\w*|jargon|short\w*|brief\w*|detail\w*)\b",
+    re.IGNORECASE,
+)
+
+
+def _analysis_cache_key(agent: "ProfileAgent", prompt: str, message: str) -> str:
+    """Cache key: client + the exact prompt the model would see."""
+    digest = hashlib.blake2b(prompt.encode(), digest_size=16).hexdigest()
+    # Keyed on the client as in the behave agent (LLMChatClient.__cache_key__)
+    return f"{__name__}.analysis:{agent.llm.__cache_key__()!r}:{digest}"
+
+
+@dataclass(slots=True)
 class ProfileUpdate:
-    """Represents a suggested update to the user profile."""
+    """
+    Represents a suggested update to the user profile.
+
+    ProfileAgent only builds updates with confidence >= 0.5 (see
+    _build_result); merging trusts that and compares confidences only
+    against what the profile already stores.
+    """
     field: str
     value: Any
     confidence: float
     source: str  # The query/statement that led to this insight
-    timestamp: str = field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+    timestamp: str = field(default_factory=_utc_now_iso)
     
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -36,7 +87,95 @@ class ProfileUpdate:
         }
 
 
-@dataclass
+class ProfileUpdateBatch:
+    """
+    Many ProfileUpdates as columns (bulk merges: replays, offline rebuilds).
+
+    Field paths are split once and interned: categories and keys become
+    int ids into category_names/key_names, and confidences one contiguous
+    float64 array (float64, not float32: stored confidences are Python
+    floats and 0.7 in float32 does not compare equal to 0.7). The object
+    API stays the one for a single chat turn; merge_profile_updates
+    accepts either.
+    """
+
+    __slots__ = (
+        "categories", "keys", "confidences", "values", "sources", "timestamps",
+        "category_names", "key_names",
+    )
+
+    def __init__(
+        self,
+        categories: np.ndarray,
+        keys: np.ndarray,
+        confidences: np.ndarray,
+        values: List[Any],
+        sources: List[str],
+        timestamps: List[str],
+        category_names: List[str],
+        key_names: List[str],
+    ):
+        self.categories = categories
+        self.keys = keys
+        self.confidences = confidences
+        self.values = values
+        self.sources = sources
+        self.timestamps = timestamps
+        self.category_names = category_names
+        self.key_names = key_names
+
+    def __len__(self) -> int:
+        return len(self.confidences)
+
+    @classmethod
+    def from_updates(cls, updates: List[ProfileUpdate]) -> "ProfileUpdateBatch":
+        """Columns from update objects; malformed field paths are skipped."""
+        category_ids: Dict[str, int] = {}
+        key_ids: Dict[str, int] = {}
+        categories, keys, confidences = [], [], []
+        values, sources, timestamps = [], [], []
+        for update in updates:
+            parts = _split_field(update.field)
+            if parts is None:
+                logger.warning(f"Invalid field format: {update.field}")
+                continue
+            category, key = parts
+            categories.append(category_ids.setdefault(category, len(category_ids)))
+            keys.append(key_ids.setdefault(key, len(key_ids)))
+            confidences.append(update.confidence)
+            values.append(update.value)
+            sources.append(update.source)
+            timestamps.append(update.timestamp)
+        return cls(
+            np.asarray(categories, dtype=np.intp),
+            np.asarray(keys, dtype=np.intp),
+            np.asarray(confidences, dtype=np.float64),
+            values,
+            sources,
+            timestamps,
+            list(category_ids),
+            list(key_ids),
+        )
+
+    def field_at(self, row: int) -> Tuple[str, str]:
+        """(category, key) of one row."""
+        return self.category_names[self.categories[row]], self.key_names[self.keys[row]]
+
+    def to_updates(self) -> List[ProfileUpdate]:
+        """Back to update objects, in row order."""
+        return [
+            ProfileUpdate(
+                field=".".join(self.field_at(row)),
+                value=self.values[row],
+                confidence=self.confidences[row].item(),
+                source=self.sources[row],
+                timestamp=self.timestamps[row],
+            )
+            for row in range(len(self))
+        ]
+
+
+@dataclass(slots=True)
 class ProfileAnalysisResult:
     """Result of profile analysis on a user message."""
     has_profile_info: bool
@@ -120,6 +259,12 @@ User: "Can you explain this more simply? The technical jargon is confusing."
     {"field": "preference.technical_jargon", "value": "avoid", "confidence": 0.8}
 ]
 """
+
+    # Messages at least this long always go to the model (see needs_llm)
+    PREFILTER_MAX_CHARS = 120
+    # Merges of at least this many updates (replays, offline rebuilds) take
+    # the vectorized path; a chat turn's handful stays on the plain loop
+    BULK_MERGE_MIN = 64
     
     def __init__(self, model: str = None, llm_client=None):
         """
@@ -131,100 +276,160 @@ User: "Can you explain this more simply? The technical jargon is confusing."
         """
         self.model = model or settings.profile_model
         self.llm = llm_client or create_llm_client(self.model)
+
+    def needs_llm(self, message: str) -> bool:
+        """
+        Whether a message could carry profile information worth a model call.
+
+        Most chat messages are plain questions ("What's the weather?") and
+        the model's answer for them is always "no profile info". Messages
+        under PREFILTER_MAX_CHARS with no first-person cue skip the call;
+        longer ones always go to the model, since the cue list cannot be
+        exhaustive. Public so that budget accounting
+        (AgentOrchestrator.planned_generations) counts the same calls this
+        agent actually makes.
+        """
+        return len(message) >= self.PREFILTER_MAX_CHARS or _PROFILE_HINT_RE.search(message) is not None
     
     def analyze_message(
         self,
         message: str,
-        conversation_context: Optional[List[Dict]] = None,
+        conversation_context: Optional[Iterable[Dict]] = None,
     ) -> ProfileAnalysisResult:
         """Synchronous wrapper for backward compatibility."""
-        import asyncio
-        return asyncio.run(self.analyze_message_async(message, conversation_context))
+        return run_sync(self.analyze_message_async(message, conversation_context))
     
-    @cacheable()
     async def analyze_message_async(
         self,
         message: str,
-        conversation_context: Optional[List[Dict]] = None,
+        conversation_context: Optional[Iterable[Dict]] = None,
     ) -> ProfileAnalysisResult:
         """
         Analyze a user message for profile-relevant information asynchronously.
         
         Args:
             message: The user's message to analyze
-            conversation_context: Recent conversation for context
+            conversation_context: Recent conversation for context (a list,
+                or any iterable such as a deque(maxlen=3) kept by the caller)
             
         Returns:
             ProfileAnalysisResult with extracted profile updates
         """
-        # Build the analysis prompt
-        prompt_parts = []
-        
-        if conversation_context:
-            context_text = "\n".join([
-                f"{msg['role']}: {msg['content'][:200]}"  # Truncate long messages
-                for msg in conversation_context[-3:]  # Last 3 messages
-            ])
-            prompt_parts.append(f"<conversation_context>\n{context_text}\n</conversation_context>")
-        
-        prompt_parts.append(f"<message_to_analyze>\n{message}\n</message_to_analyze>")
-        prompt_parts.append("\nAnalyze this message and respond with valid JSON.")
-        
-        full_prompt = "\n\n".join(prompt_parts)
-        
+        if not self.needs_llm(message):
+            return self._empty_result()
+        prompt = self._build_prompt(message, conversation_context)
         try:
-            response_text = await self.llm.complete_json(self.SYSTEM_PROMPT, full_prompt)
-            parsed = self._parse_response(response_text)
-            
-            # Convert to ProfileAnalysisResult
-            updates = [
-                ProfileUpdate(
-                    field=u["field"],
-                    value=u["value"],
-                    confidence=u.get("confidence", 0.5),
-                    source=message[:100],  # Truncate source
-                )
-                for u in parsed.get("updates", [])
-                if u.get("confidence", 0) >= 0.5  # Filter low-confidence updates
-            ]
-            
-            return ProfileAnalysisResult(
-                has_profile_info=parsed.get("has_profile_info", False) and len(updates) > 0,
-                updates=updates,
-                interaction_type=parsed.get("interaction_type", "question"),
-                topics=parsed.get("topics", []),
-                sentiment=parsed.get("sentiment", "neutral"),
-            )
-            
+            return await self._analyze_prompt(prompt, message)
         except Exception as e:
             logger.error(f"Profile analysis failed: {e}")
-            return ProfileAnalysisResult(
-                has_profile_info=False,
-                updates=[],
-                interaction_type="question",
-                topics=[],
-                sentiment="neutral",
+            return self._empty_result()
+
+    @staticmethod
+    def _empty_result() -> ProfileAnalysisResult:
+        return ProfileAnalysisResult(
+            has_profile_info=False,
+            updates=[],
+            interaction_type="question",
+            topics=[],
+            sentiment="neutral",
+        )
+
+    @staticmethod
+    def _build_prompt(message: str, conversation_context: Optional[Iterable[Dict]]) -> str:
+        """User prompt: the last 3 turns (truncated) and the message."""
+        buf = io.StringIO()
+        if conversation_context:
+            # A list is sliced (3 items, whatever its length); any other
+            # iterable, a caller's deque or a generator, is drained through
+            # a bounded deque without materializing the history
+            if isinstance(conversation_context, (list, tuple)):
+                tail = conversation_context[-3:]
+            else:
+                tail = deque(conversation_context, maxlen=3)
+            if tail:
+                buf.write("<conversation_context>\n")
+                for i, msg in enumerate(tail):
+                    if i:
+                        buf.write("\n")
+                    buf.write(msg["role"])
+                    buf.write(": ")
+                    buf.write(msg["content"][:200])  # Truncate long messages
+                buf.write("\n</conversation_context>\n\n")
+        buf.write("<message_to_analyze>\n")
+        buf.write(message)
+        buf.write("\n</message_to_analyze>\n\n\nAnalyze this message and respond with valid JSON.")
+        return buf.getvalue()
+
+    # Keyed on the prompt, not on the raw arguments: turns older than the
+    # last three do not reach the model, so they must not split entries.
+    # The system prompt is a byte-identical class constant sent first, which
+    # is what OpenAI's automatic prefix caching needs; the Anthropic client
+    # marks it for caching explicitly. Provider errors raise through the
+    # cache, so an outage is never remembered as "no profile info".
+    @cacheable(key_func=_analysis_cache_key)
+    async def _analyze_prompt(self, full_prompt: str, message: str) -> ProfileAnalysisResult:
+        """One model call for a built prompt."""
+        if settings.stream_profile_agent:
+            response_text = await self._stream_document(full_prompt)
+        else:
+            response_text = await self.llm.complete_json(self.SYSTEM_PROMPT, full_prompt)
+        return self._build_result(self._parse_response(response_text), message)
+
+    async def _stream_document(self, full_prompt: str) -> str:
+        """
+        The analysis over the streaming API, read up to the closing brace.
+
+        The stream is closed as soon as the JSON object is complete, so
+        the parse starts without waiting for the provider's end-of-stream
+        (and a closing fence or trailing prose is never downloaded).
+        """
+        buffer = JsonDocumentBuffer()
+        stream = self.llm.stream_json(self.SYSTEM_PROMPT, full_prompt)
+        try:
+            async for delta in stream:
+                if buffer.feed(delta):
+                    break
+        finally:
+            aclose = getattr(stream, "aclose", None)
+            if aclose is not None:
+                await aclose()
+        return buffer.text
+
+    def _build_result(self, parsed: Dict[str, Any], message: str) -> ProfileAnalysisResult:
+        """Build a result from one parsed analysis object."""
+        # Convert to ProfileAnalysisResult. One analysis, one moment: the
+        # updates share a timestamp formatted once, not once per update.
+        source = message[:100]  # Truncate source
+        now = _utc_now_iso()
+        updates = [
+            ProfileUpdate(
+                field=u["field"],
+                value=u["value"],
+                confidence=u.get("confidence", 0.5),
+                source=source,
+                timestamp=now,
             )
+            for u in parsed.get("updates", [])
+            if u.get("confidence", 0) >= 0.5  # Filter low-confidence updates
+        ]
+        
+        return ProfileAnalysisResult(
+            has_profile_info=parsed.get("has_profile_info", False) and len(updates) > 0,
+            updates=updates,
+            interaction_type=parsed.get("interaction_type", "question"),
+            topics=parsed.get("topics", []),
+            sentiment=parsed.get("sentiment", "neutral"),
+        )
     
     def _parse_response(self, response_text: str) -> Dict[str, Any]:
-        """Parse JSON response from the agent."""
+        """Parse JSON response from the agent (bare, fenced or in prose)."""
         try:
             if isinstance(response_text, dict):
                 return response_text
-            if isinstance(response_text, list):
-                return {"has_profile_info": False, "updates": []}
-            
-            # Handle markdown code blocks
-            if "```json" in response_text:
-                start = response_text.find("```json") + 7
-                end = response_text.find("```", start)
-                response_text = response_text[start:end].strip()
-            elif "```" in response_text:
-                start = response_text.find("```") + 3
-                end = response_text.find("```", start)
-                response_text = response_text[start:end].strip()
-            
-            return json.loads(response_text)
+            # Bare documents parse on the first try; fences and surrounding
+            # prose take one precompiled-regex pass each
+            parsed = loads_llm_json(reply_text(response_text))
+            return parsed if isinstance(parsed, dict) else {"has_profile_info": False, "updates": []}
             
         except (json.JSONDecodeError, TypeError) as e:
             logger.warning(f"Failed to parse profile analysis JSON: {e}")
@@ -233,7 +438,8 @@ User: "Can you explain this more simply? The technical jargon is confusing."
     def merge_profile_updates(
         self,
         existing_profile: Dict[str, Any],
-        new_updates: List[ProfileUpdate],
+        new_updates: Union[List[ProfileUpdate], "ProfileUpdateBatch"],
+        copy: bool = True,
     ) -> Dict[str, Any]:
         """
         Merge new profile updates with existing profile data.
@@ -242,26 +448,37 @@ User: "Can you explain this more simply? The technical jargon is confusing."
         
         Args:
             existing_profile: Current user profile
-            new_updates: New updates to merge
+            new_updates: New updates to merge, or a ProfileUpdateBatch
+            copy: Copy the top-level dict first. Pass False when the caller
+                already owns a copy (the orchestrator does). Category dicts
+                are copied on first write either way, so the caller's nested
+                dicts are never mutated.
             
         Returns:
             Updated profile dictionary
         """
-        profile = existing_profile.copy()
+        profile = dict(existing_profile) if copy else existing_profile
+        copied = set()
+
+        if isinstance(new_updates, ProfileUpdateBatch):
+            return self._merge_bulk(profile, new_updates, copied)
+        if len(new_updates) >= self.BULK_MERGE_MIN:
+            return self._merge_bulk(profile, ProfileUpdateBatch.from_updates(new_updates), copied)
         
         for update in new_updates:
             # Parse the field path (e.g., "preference.detail_level")
-            parts = update.field.split(".")
+            parts = _split_field(update.field)
             
-            if len(parts) != 2:
+            if parts is None:
                 logger.warning(f"Invalid field format: {update.field}")
                 continue
             
             category, key = parts
             
-            # Ensure category exists
-            if category not in profile:
-                profile[category] = {}
+            # Own the category before writing to it (creating it if missing)
+            if category not in copied:
+                profile[category] = dict(profile.get(category, {}))
+                copied.add(category)
             
             # Check if we should update (higher confidence wins)
             existing_entry = profile[category].get(key)
@@ -291,6 +508,64 @@ User: "Can you explain this more simply? The technical jargon is confusing."
         
         return profile
 
+    def _merge_bulk(
+        self,
+        profile: Dict[str, Any],
+        batch: "ProfileUpdateBatch",
+        copied: set,
+    ) -> Dict[str, Any]:
+        """
+        merge_profile_updates for large batches, same result as the loop.
+
+        The loop's rule (strictly higher confidence wins, so on ties the
+        first update stays) reduces to: per field, the first update with
+        the highest confidence, applied if it beats what is stored. The
+        per-field winner and the comparison run as array operations over
+        the batch's columns; Python only touches the fields that change.
+        """
+        if not len(batch):
+            return profile
+
+        ids = batch.categories * len(batch.key_names) + batch.keys
+        # Sort by field, then confidence descending, then arrival: the first
+        # row of each field group is its winner
+        order = np.lexsort((np.arange(len(ids)), -batch.confidences, ids))
+        _, first = np.unique(ids[order], return_index=True)
+        winners = order[first]  # one row per distinct field
+
+        stored = np.fromiter(
+            (
+                self._stored_confidence(profile, *batch.field_at(row))
+                for row in winners
+            ),
+            dtype=np.float64,
+            count=len(winners),
+        )
+        for row in winners[_winning_mask(batch.confidences[winners], stored)]:
+            category, key = batch.field_at(row)
+            if category not in copied:
+                profile[category] = dict(profile.get(category, {}))
+                copied.add(category)
+            profile[category][key] = {
+                "value": batch.values[row],
+                "confidence": batch.confidences[row].item(),
+                "updated_at": batch.timestamps[row],
+            }
+        return profile
+
+    @staticmethod
+    def _stored_confidence(profile: Dict[str, Any], category: str, key: str) -> float:
+        """Confidence to beat: -inf when nothing (or a legacy value) is stored."""
+        entry = profile.get(category, {}).get(key)
+        if not isinstance(entry, dict):
+            return -np.inf
+        return entry.get("confidence", 0)
+
+
+def _winning_mask(new_confidences: np.ndarray, stored_confidences: np.ndarray) -> np.ndarray:
+    """Which candidate updates beat the stored entries (strictly higher wins)."""
+    return new_confidences > stored_confidences
+
 
 # Factory function
 def create_profile_agent(**kwargs) -> ProfileAgent:
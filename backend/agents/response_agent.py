@@ -6,31 +6,40 @@ Generates structured responses suitable for GenUI rendering.
 Isolation invariant: the agent instance holds NO conversational state.
 Everything the model sees (profile, history, retrieved context, tenant)
 lives in the single request; two sequential queries can never share
-context, across users or tenants.
+context, across users or tenants. The one thing it remembers, the
+optional semantic answer cache, is partitioned by all of those inputs.
 """
 
 import logging
-from typing import Dict, Any, List, Optional
-from dataclasses import dataclass
+from typing import AsyncIterator, Dict, Any, Iterator, List, Optional, Tuple
+from dataclasses import dataclass, field
+import hashlib
 import json
 
 from config import settings
 from llm import create_llm_client
 from rag import get_vector_store, build_context_from_results
 from schemas import builtin_catalog, component_to_dict, validate_components
+from utils.cache import caching_enabled
 from utils.content_policy_store import effective_policy
 from utils.disclosure import (
     PROVENANCE_NONE,
     content_provenance,
     disclosure_block,
 )
+from utils.json_extract import loads_llm_json, reply_text
+from utils.json_stream import ComponentStreamParser
 from utils.numeric_guard import NumericGuard
+from utils.semantic_cache import ProximityCache
+from utils.sync_loop import run_sync
 from utils.url_guard import UrlGuard
 
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+# slots: one instance per request, and responses carry dozens of
+# components; no per-instance __dict__ to allocate for any of them
+@dataclass(slots=True)
 class UserProfile:
     """User profile data from IndexedDB."""
     user_id: str
@@ -40,7 +49,8 @@ class UserProfile:
     behavior: Dict[str, Any]
     history_summary: str
     interaction_patterns: Dict[str, Any]
-    
+    _context_str: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "UserProfile":
         return cls(
@@ -53,72 +63,59 @@ class UserProfile:
             interaction_patterns=data.get("interaction_patterns", {}),
         )
     
-    def to_context(self) -> str:
-        """Convert profile to context string for LLM."""
-        parts = []
-        
-        # Demographic information (name, role, etc.)
-        if self.demographic:
-            demo_items = []
-            for key, value in self.demographic.items():
-                # Handle nested value/confidence structure
-                if isinstance(value, dict) and 'value' in value:
-                    actual_value = value['value']
-                    confidence = value.get('confidence', 1.0)
-                    if confidence > 0.7:  # Only include high-confidence demographic data
-                        demo_items.append(f"{key}: {actual_value}")
-                else:
-                    demo_items.append(f"{key}: {value}")
-            
-            if demo_items:
-                parts.append("User Demographics:\n- " + "\n- ".join(demo_items))
-        
-        # Interests
-        if self.interests:
-            interest_items = []
-            for key, value in self.interests.items():
-                if isinstance(value, dict) and 'value' in value:
-                    actual_value = value['value']
-                    interest_items.append(f"{key}: {actual_value}")
-                else:
-                    interest_items.append(f"{key}: {value}")
-            
-            if interest_items:
-                parts.append("User Interests:\n- " + "\n- ".join(interest_items))
-        
-        # Preferences
-        if self.preferences:
-            pref_items = []
-            for key, value in self.preferences.items():
-                if isinstance(value, dict) and 'value' in value:
-                    actual_value = value['value']
-                    pref_items.append(f"{key}: {actual_value}")
-                else:
-                    pref_items.append(f"{key}: {value}")
-            
-            if pref_items:
-                parts.append("User Preferences:\n- " + "\n- ".join(pref_items))
-        
-        # Behavior patterns
-        if self.behavior:
-            behavior_items = []
-            for key, value in self.behavior.items():
-                if isinstance(value, dict) and 'value' in value:
-                    actual_value = value['value']
-                    behavior_items.append(f"{key}: {actual_value}")
-                else:
-                    behavior_items.append(f"{key}: {value}")
-            
-            if behavior_items:
-                parts.append("Observed Behavior:\n- " + "\n- ".join(behavior_items))
-        
+    @property
+    def context_str(self) -> str:
+        """
+        The profile as context for the LLM. Built once per instance: the
+        prompt and the semantic cache scope both read it.
+        """
+        if self._context_str is None:
+            self._context_str = self._build_context()
+        return self._context_str
+
+    def _build_context(self) -> str:
+        parts = [
+            section for section in (
+                # Only high-confidence demographic data (name, role, etc.)
+                _format_section("User Demographics", self.demographic, min_confidence=0.7),
+                _format_section("User Interests", self.interests),
+                _format_section("User Preferences", self.preferences),
+                _format_section("Observed Behavior", self.behavior),
+            )
+            if section
+        ]
         if self.history_summary:
             parts.append(f"Interaction History: {self.history_summary}")
         
         return "\n\n".join(parts) if parts else "No user profile available."
 
+    def to_context(self) -> str:
+        """Convert profile to context string for LLM."""
+        return self.context_str
+
+
+def _format_section(
+    title: str,
+    mapping: Dict[str, Any],
+    min_confidence: Optional[float] = None,
+) -> Optional[str]:
+    """
+    One profile category as a titled bullet list, or None when empty.
+
+    Entries are plain values or {"value", "confidence"} records; with
+    min_confidence, records at or below it are left out.
+    """
+    lines = []
+    for key, value in mapping.items():
+        if isinstance(value, dict) and 'value' in value:
+            if min_confidence is not None and value.get('confidence', 1.0) <= min_confidence:
+                continue
+            value = value['value']
+        lines.append(f"- {key}: {value}")
+    return f"{title}:\n" + "\n".join(lines) if lines else None
+
 
-@dataclass 
+@dataclass(slots=True)
 class GenUIComponent:
     """Structured component for frontend rendering."""
     type: str  # "bento", "chart", "text", "buttons", etc.
@@ -132,7 +129,7 @@ class GenUIComponent:
         return result
 
 
-@dataclass
+@dataclass(slots=True)
 class AgentResponse:
     """Structured response from the Response Agent."""
     text_response: str
@@ -161,6 +158,28 @@ class AgentResponse:
         }
 
 
+@dataclass(slots=True)
+class _AnswerInputs:
+    """What a request gives the model besides the prompt instructions.
+
+    The guards and the provenance check learn from the same texts: a
+    URL or a number in the answer is grounded if it appears here.
+    """
+    query: str
+    retrieved_context: str
+    search_results: List[Any]
+    conversation_history: List[Dict]
+    # Contexts returned by model-invoked searches, appended as they run
+    tool_contexts: List[str] = field(default_factory=list)
+
+    def texts(self) -> Iterator[str]:
+        yield self.query
+        yield self.retrieved_context or ""
+        yield from self.tool_contexts
+        for message in self.conversation_history:
+            yield str(message.get("content") or "")
+
+
 class ResponseAgent:
     """
     Agent responsible for answering user queries.
@@ -301,6 +320,9 @@ security regulations. The implementation is handled by your technical team..."
         self.model = model or settings.response_model
         self.vector_store = vector_store or get_vector_store()
         self.llm = llm_client or create_llm_client(self.model)
+        self.answer_cache = ProximityCache(
+            settings.response_cache_size, quantize=settings.response_cache_int8
+        )
 
     def _build_query_prompt(
         self,
@@ -314,7 +336,7 @@ security regulations. The implementation is handled by your technical team..."
         
         # User profile context
         if user_profile:
-            parts.append(f"<user_profile>\n{user_profile.to_context()}\n</user_profile>")
+            parts.append(f"<user_profile>\n{user_profile.context_str}\n</user_profile>")
         
         # Conversation history
         if conversation_history:
@@ -343,14 +365,15 @@ security regulations. The implementation is handled by your technical team..."
         tenant: Optional[str] = None,
     ) -> AgentResponse:
         """Synchronous wrapper for backward compatibility."""
-        import asyncio
-        return asyncio.run(
+        return run_sync(
             self.process_query_async(query, user_profile, conversation_history, tenant)
         )
     
-    # Deliberately NOT cached: responses depend on profile + conversation
-    # history (near-zero hit rate) and caching them would replay stale
-    # personalization. The expensive sub-step (vector search) is cached.
+    # Not cached by exact text: responses depend on profile + conversation
+    # history, and replaying them across those would serve stale
+    # personalization. The opt-in semantic cache (RESPONSE_CACHE_SIMILARITY)
+    # only matches within one (tenant, profile, history) scope. The
+    # expensive sub-step (vector search) is cached.
     async def process_query_async(
         self,
         query: str,
@@ -373,24 +396,29 @@ security regulations. The implementation is handled by your technical team..."
         # Parse user profile
         profile = UserProfile.from_dict(user_profile) if user_profile else None
 
-        # Retrieve relevant documents asynchronously with caching
-        logger.info(f"Retrieving context for query: {query[:100]}...")
-        search_results = await self.vector_store.search_async(query=query, tenant=tenant)
-        retrieved_context = build_context_from_results(search_results)
+        cache_key = await self._answer_cache_key(query, profile, conversation_history, tenant)
+        if cache_key is not None:
+            cached = self.answer_cache.get(*cache_key, settings.response_cache_similarity)
+            if cached is not None:
+                logger.info("Semantic cache hit for query: %s", query[:100])
+                return cached
+
+        inputs = await self._retrieve(
+            query, conversation_history, tenant,
+            query_vector=cache_key[1] if cache_key is not None else None,
+        )
 
         # Build the full prompt
         full_prompt = self._build_query_prompt(
             query=query,
             user_profile=profile,
             conversation_history=conversation_history,
-            retrieved_context=retrieved_context,
+            retrieved_context=inputs.retrieved_context,
         )
 
         # Model-invoked searches: tenant is captured from THIS request,
         # never from shared state. Results are kept so the URL whitelist
         # also learns the URLs the tool surfaced.
-        tool_contexts: List[str] = []
-
         async def _run_search_tool(name: str, arguments: Dict[str, Any]) -> str:
             results = await self.vector_store.search_async(
                 query=str(arguments.get("query", "")),
@@ -398,7 +426,7 @@ security regulations. The implementation is handled by your technical team..."
                 tenant=tenant,
             )
             context = build_context_from_results(results, include_metadata=True)
-            tool_contexts.append(context)
+            inputs.tool_contexts.append(context)
             return context
 
         try:
@@ -412,173 +440,341 @@ security regulations. The implementation is handled by your technical team..."
 
             parsed = self._parse_response(response_text)
 
-            # Extract sources from retrieval results
-            sources = [
-                {"title": r.metadata.get("source_document", "Unknown"), "url": r.metadata.get("url", "")}
-                for r in search_results
-            ]
-
             # Validate components against schemas; invalid ones are dropped
             valid_models, dropped = validate_components(parsed.get("components", []))
             component_dicts = [component_to_dict(c) for c in valid_models]
 
-            # URL whitelist: only URLs that existed in the input survive
-            guard = UrlGuard(enforce_whitelist=settings.url_whitelist_enabled)
-            guard.allow_from_text(query)
-            guard.allow_from_text(retrieved_context)
-            for tool_context in tool_contexts:
-                guard.allow_from_text(tool_context)
-            for msg in conversation_history or []:
-                guard.allow_from_text(msg.get("content"))
-            for r in search_results:
-                metadata = r.metadata or {}
-                guard.allow(metadata.get("url"), metadata.get("image"))
-
-            component_dicts, removed_urls = guard.sanitize_components(component_dicts)
+            guard, numeric_guard = self._input_guards(inputs)
+            policy = await effective_policy(tenant, settings.content_policy)
+            component_dicts, removed_urls, removed_numbers, policy_violations = self._sanitize(
+                component_dicts, guard, numeric_guard, policy
+            )
 
-            # Numeric grounding: displayed numbers (stats, prices, chart
-            # points) must trace to the same input corpus as the URLs
-            numeric_guard = NumericGuard(enforce=settings.numeric_grounding_enabled)
-            numeric_guard.allow_from_text(query)
-            numeric_guard.allow_from_text(retrieved_context)
-            for tool_context in tool_contexts:
-                numeric_guard.allow_from_text(tool_context)
-            for msg in conversation_history or []:
-                numeric_guard.allow_from_text(msg.get("content"))
-            component_dicts, removed_numbers = numeric_guard.sanitize_components(
-                component_dicts
+            response = self._assemble_response(
+                parsed, response_text, inputs, component_dicts,
+                guard, policy, dropped, removed_urls, removed_numbers, policy_violations,
             )
+            if cache_key is not None:
+                self.answer_cache.put(*cache_key, response)
+            return response
 
-            # Per-tenant content policy: banned terms drop the component
-            policy = await effective_policy(tenant, settings.content_policy)
-            component_dicts, policy_violations = policy.sanitize_components(
-                component_dicts
+        except Exception as e:
+            logger.error(f"Agent processing failed: {e}")
+            return self._fallback_response()
+
+    async def process_query_stream_async(
+        self,
+        query: str,
+        user_profile: Optional[Dict[str, Any]] = None,
+        conversation_history: Optional[List[Dict]] = None,
+        tenant: Optional[str] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Answer a query progressively over the streaming API. Yields events:
+
+            {"type": "component", "component": {...}}
+                one per generated component, as soon as its closing brace
+                  arrives, already validated, whitelisted, grounded and
+                  policy-checked exactly like process_query_async's
+            {"type": "complete", "response": AgentResponse}
+                the authoritative final answer: callers replace the
+                  streamed state with it. Its components are the ones
+                  already yielded, except after a failure
+
+        The answer text is only sent with the complete event: it is
+        sanitized as a whole (markdown links, redaction), so streaming it
+        raw would show the reader what the guards then take back.
+
+        The model answers from the pre-retrieved documents only (the
+        search tool needs the non-streaming tool loop). Any failure
+        ends the stream with the fallback answer, which carries none of
+        the components already yielded; process_query_async stays the
+        path for callers that want one value.
+        """
+        profile = UserProfile.from_dict(user_profile) if user_profile else None
+        try:
+            cache_key = await self._answer_cache_key(query, profile, conversation_history, tenant)
+            if cache_key is not None:
+                cached = self.answer_cache.get(*cache_key, settings.response_cache_similarity)
+                if cached is not None:
+                    for component in cached.components:
+                        yield {"type": "component", "component": component.to_dict()}
+                    yield {"type": "complete", "response": cached}
+                    return
+
+            inputs = await self._retrieve(
+                query, conversation_history, tenant,
+                query_vector=cache_key[1] if cache_key is not None else None,
             )
+            full_prompt = self._build_query_prompt(
+                query=query,
+                user_profile=profile,
+                conversation_history=conversation_history,
+                retrieved_context=inputs.retrieved_context,
+            )
+            # Every input is known before the first token: the guards can
+            # check each component as it arrives
+            guard, numeric_guard = self._input_guards(inputs)
+            policy = await effective_policy(tenant, settings.content_policy)
 
-            # The chat prose gets the same treatment as text components:
-            # invented markdown links collapse, banned terms are redacted
-            text_response = parsed.get("text_response", response_text)
-            text_response = guard.strip_markdown_links(text_response)
-            removed_urls = list(guard.removed_urls)
-            text_response, text_violations = policy.redact(text_response)
-            policy_violations.extend(
-                t for t in text_violations if t not in policy_violations
+            parser = ComponentStreamParser()
+            emitted: List[Dict[str, Any]] = []
+            dropped: List[str] = []
+            removed_urls: List[str] = []
+            removed_numbers: List[str] = []
+            policy_violations: List[str] = []
+
+            async for delta in self.llm.stream_json(self.SYSTEM_PROMPT, full_prompt):
+                for raw_component in parser.feed(delta):
+                    valid, errors = validate_components([raw_component])
+                    dropped.extend(errors)
+                    if not valid:
+                        continue
+                    sanitized, urls, numbers, violations = self._sanitize(
+                        [component_to_dict(valid[0])], guard, numeric_guard, policy
+                    )
+                    removed_urls.extend(urls)
+                    removed_numbers.extend(numbers)
+                    policy_violations.extend(violations)
+                    if sanitized:
+                        emitted.append(sanitized[0])
+                        yield {"type": "component", "component": sanitized[0]}
+
+            response = self._assemble_response(
+                self._parse_response(parser.text), parser.text, inputs,
+                emitted, guard, policy, dropped, removed_urls, removed_numbers, policy_violations,
             )
+            if cache_key is not None:
+                self.answer_cache.put(*cache_key, response)
+        except Exception as e:
+            logger.error(f"Streaming agent processing failed: {e}")
+            response = self._fallback_response()
 
-            if dropped or removed_urls or removed_numbers or policy_violations:
-                logger.info(
-                    "Response sanitization: dropped_components=%s removed_urls=%s "
-                    "removed_numbers=%s policy_violations=%s",
-                    dropped, removed_urls, removed_numbers, policy_violations,
-                )
+        yield {"type": "complete", "response": response}
 
-            # Model-claimed sources must pass the same URL rules
-            raw_sources = parsed.get("sources", sources)
-            safe_sources = [
-                s for s in raw_sources
-                if isinstance(s, dict) and (not s.get("url") or guard.is_allowed(s["url"]))
-            ]
+    async def _retrieve(
+        self,
+        query: str,
+        conversation_history: Optional[List[Dict]],
+        tenant: Optional[str],
+        query_vector: Optional[List[float]] = None,
+    ) -> "_AnswerInputs":
+        """
+        Pre-fetch the knowledge-base context for a query. `query_vector`
+        is its embedding when the semantic cache already computed it:
+        the search reuses it instead of embedding the query again.
+        """
+        # Retrieve relevant documents asynchronously with caching
+        logger.info(f"Retrieving context for query: {query[:100]}...")
+        if query_vector is not None:
+            search_results = await self.vector_store.search_async(
+                query=query, tenant=tenant, query_vector=query_vector
+            )
+        else:
+            search_results = await self.vector_store.search_async(query=query, tenant=tenant)
+        return _AnswerInputs(
+            query=query,
+            retrieved_context=build_context_from_results(search_results),
+            search_results=search_results,
+            conversation_history=conversation_history or [],
+        )
 
-            # The answer is marked with what actually produced it. The
-            # prose is checked alongside the components: in a chat it is
-            # the main thing the person reads, and it is the part a
-            # model almost always writes from scratch.
-            corpus = "\n".join(
-                [query, retrieved_context or ""]
-                + tool_contexts
-                + [str(m.get("content") or "") for m in (conversation_history or [])]
+    @staticmethod
+    def _input_guards(inputs: "_AnswerInputs") -> Tuple[UrlGuard, NumericGuard]:
+        """
+        The URL whitelist and the numeric grounding, both learned from the
+        request's inputs: only URLs and numbers that existed there survive.
+        """
+        guard = UrlGuard(enforce_whitelist=settings.url_whitelist_enabled)
+        numeric_guard = NumericGuard(enforce=settings.numeric_grounding_enabled)
+        for text in inputs.texts():
+            guard.allow_from_text(text)
+            # Numeric grounding: displayed numbers (stats, prices, chart
+            # points) must trace to the same input corpus as the URLs
+            numeric_guard.allow_from_text(text)
+        for r in inputs.search_results:
+            metadata = r.metadata or {}
+            guard.allow(metadata.get("url"), metadata.get("image"))
+        return guard, numeric_guard
+
+    @staticmethod
+    def _sanitize(
+        component_dicts: List[Dict[str, Any]],
+        guard: UrlGuard,
+        numeric_guard: NumericGuard,
+        policy,
+    ) -> Tuple[List[Dict[str, Any]], List[str], List[str], List[str]]:
+        """URL whitelist, numeric grounding, then the tenant's content policy."""
+        component_dicts, removed_urls = guard.sanitize_components(component_dicts)
+        component_dicts, removed_numbers = numeric_guard.sanitize_components(component_dicts)
+        # Per-tenant content policy: banned terms drop the component
+        component_dicts, policy_violations = policy.sanitize_components(component_dicts)
+        return component_dicts, removed_urls, removed_numbers, policy_violations
+
+    def _assemble_response(
+        self,
+        parsed: Dict[str, Any],
+        response_text: str,
+        inputs: "_AnswerInputs",
+        component_dicts: List[Dict[str, Any]],
+        guard: UrlGuard,
+        policy,
+        dropped: List[str],
+        removed_urls: List[str],
+        removed_numbers: List[str],
+        policy_violations: List[str],
+    ) -> AgentResponse:
+        """The answer from sanitized components and the parsed envelope."""
+        # The chat prose gets the same treatment as text components:
+        # invented markdown links collapse, banned terms are redacted
+        text_response = parsed.get("text_response", response_text)
+        guard.removed_urls = []
+        text_response = guard.strip_markdown_links(text_response)
+        removed_urls = removed_urls + guard.removed_urls
+        text_response, text_violations = policy.redact(text_response)
+        policy_violations = policy_violations + [
+            t for t in text_violations if t not in policy_violations
+        ]
+
+        if dropped or removed_urls or removed_numbers or policy_violations:
+            logger.info(
+                "Response sanitization: dropped_components=%s removed_urls=%s "
+                "removed_numbers=%s policy_violations=%s",
+                dropped, removed_urls, removed_numbers, policy_violations,
             )
 
-            return AgentResponse(
-                text_response=text_response,
-                components=[
-                    GenUIComponent(
-                        type=c["type"],
-                        data=c["data"],
-                        layout=c.get("layout")
-                    )
-                    for c in component_dicts
-                ],
-                sources=safe_sources,
-                confidence=parsed.get("confidence", 0.5),
-                suggested_actions=parsed.get("suggested_actions", []),
-                sanitization={
-                    "removed_urls": removed_urls,
-                    "dropped_components": dropped,
-                    "removed_numbers": removed_numbers,
-                    "policy_violations": policy_violations,
-                },
-                disclosure=disclosure_block(
-                    ai_generated=True,
-                    provenance=content_provenance(
-                        component_dicts + [{"data": {"content": text_response}}],
-                        corpus,
-                    ),
-                    model=self.model,
-                    enabled=not settings.genui_disclosure_off,
-                    expose_model=settings.disclosure_expose_model,
+        # Model-claimed sources must pass the same URL rules; the
+        # retrieval results are the default, built only when the model
+        # gave none (usually it does)
+        raw_sources = parsed.get("sources")
+        if raw_sources is None:
+            raw_sources = [
+                {"title": r.metadata.get("source_document", "Unknown"), "url": r.metadata.get("url", "")}
+                for r in inputs.search_results
+            ]
+        safe_sources = [
+            s for s in raw_sources
+            if isinstance(s, dict) and (not s.get("url") or guard.is_allowed(s["url"]))
+        ]
+
+        # The answer is marked with what actually produced it. The
+        # prose is checked alongside the components: in a chat it is
+        # the main thing the person reads, and it is the part a
+        # model almost always writes from scratch.
+        corpus = "\n".join(inputs.texts())
+
+        return AgentResponse(
+            text_response=text_response,
+            components=[
+                GenUIComponent(
+                    type=c["type"],
+                    data=c["data"],
+                    layout=c.get("layout")
+                )
+                for c in component_dicts
+            ],
+            sources=safe_sources,
+            confidence=parsed.get("confidence", 0.5),
+            suggested_actions=parsed.get("suggested_actions", []),
+            sanitization={
+                "removed_urls": removed_urls,
+                "dropped_components": dropped,
+                "removed_numbers": removed_numbers,
+                "policy_violations": policy_violations,
+            },
+            disclosure=disclosure_block(
+                ai_generated=True,
+                provenance=content_provenance(
+                    component_dicts + [{"data": {"content": text_response}}],
+                    corpus,
                 ),
-            )
+                model=self.model,
+                enabled=not settings.genui_disclosure_off,
+                expose_model=settings.disclosure_expose_model,
+            ),
+        )
+
+    @staticmethod
+    def _fallback_response() -> AgentResponse:
+        # Return a fallback response (the error stays in the logs).
+        # No model output reaches the user here: these two strings
+        # are written in this file, and the marking says so.
+        return AgentResponse(
+            text_response="I couldn't process your request right now.",
+            components=[
+                GenUIComponent(type="text", data={"content": "Please try rephrasing your question.", "style": "note"})
+            ],
+            sources=[],
+            confidence=0.0,
+            suggested_actions=["Rephrase question", "Contact support"],
+            disclosure=disclosure_block(
+                ai_generated=False,
+                provenance=PROVENANCE_NONE,
+                enabled=not settings.genui_disclosure_off,
+            ),
+        )
+
+    async def _answer_cache_key(
+        self,
+        query: str,
+        profile: Optional[UserProfile],
+        conversation_history: Optional[List[Dict]],
+        tenant: Optional[str],
+    ) -> Optional[Tuple[str, List[float]]]:
+        """
+        (scope, query embedding) for the semantic answer cache, or None
+        when it is off or the embedding is unavailable.
 
+        The scope digests everything besides the query that reaches the
+        model or the guards, so a hit can only replay an answer built
+        from the same inputs. On a miss the embedding is handed to the
+        search, so an uncached query is embedded exactly once.
+        """
+        if settings.response_cache_similarity <= 0 or not caching_enabled():
+            return None
+        embed = getattr(self.vector_store, "embed_query_async", None)
+        if embed is None:
+            return None
+        try:
+            embedding = await embed(query)
         except Exception as e:
-            logger.error(f"Agent processing failed: {e}")
-            # Return a fallback response (the error stays in the logs).
-            # No model output reaches the user here: these two strings
-            # are written in this file, and the marking says so.
-            return AgentResponse(
-                text_response="I couldn't process your request right now.",
-                components=[
-                    GenUIComponent(type="text", data={"content": "Please try rephrasing your question.", "style": "note"})
-                ],
-                sources=[],
-                confidence=0.0,
-                suggested_actions=["Rephrase question", "Contact support"],
-                disclosure=disclosure_block(
-                    ai_generated=False,
-                    provenance=PROVENANCE_NONE,
-                    enabled=not settings.genui_disclosure_off,
-                ),
-            )
-    
+            logger.warning(f"Semantic cache skipped, query embedding failed: {e}")
+            return None
+        scope = json.dumps(
+            [
+                tenant,
+                profile.context_str if profile else None,
+                [[m.get("role"), m.get("content")] for m in conversation_history or []],
+            ],
+            default=str,
+        )
+        return hashlib.blake2b(scope.encode(), digest_size=16).hexdigest(), embedding
+
     def _parse_response(self, response_text: str) -> Dict[str, Any]:
-        """Parse the JSON response from the agent."""
-        try:
-            if isinstance(response_text, (dict, list)):
-                if isinstance(response_text, list):
-                    return {"components": response_text, "text_response": "", "confidence": 0.5}
-                return response_text
-            
-            # Handle case where response might have markdown code blocks
-            if "```json" in response_text:
-                start = response_text.find("```json") + 7
-                end = response_text.find("```", start)
-                response_text = response_text[start:end].strip()
-            elif "```" in response_text:
-                start = response_text.find("```") + 3
-                end = response_text.find("```", start)
-                response_text = response_text[start:end].strip()
-            
-            return json.loads(response_text)
-            
-        except json.JSONDecodeError as e:
-            logger.warning(f"Failed to parse JSON response: {e}")
-            # Return a basic structure with the raw text
-            return {
-                "text_response": response_text,
-                "components": [],
-                "confidence": 0.5,
-                "suggested_actions": [],
-            }
-        except TypeError as e:
-            logger.warning(f"Type error parsing response: {e}, type: {type(response_text)}")
-            if isinstance(response_text, (dict, list)):
-                return response_text if isinstance(response_text, dict) else {"components": response_text}
-            return {
-                "text_response": str(response_text),
-                "components": [],
-                "confidence": 0.5,
-                "suggested_actions": [],
-            }
+        """Parse the JSON response from the agent (bare, fenced or in prose)."""
+        if isinstance(response_text, (dict, list)):
+            parsed = response_text
+        else:
+            # Bare documents parse on the first try; fences and surrounding
+            # prose take one precompiled-regex pass each
+            try:
+                parsed = loads_llm_json(reply_text(response_text))
+            except json.JSONDecodeError as e:
+                logger.warning(f"Failed to parse JSON response: {e}")
+                parsed = None
+
+        if isinstance(parsed, dict):
+            return parsed
+        if isinstance(parsed, list) and all(isinstance(item, dict) for item in parsed):
+            return {"components": parsed, "text_response": "", "confidence": 0.5}
+        # Not a JSON object or a component list (a citation like "[1]" in
+        # prose): keep the raw text as the answer
+        return {
+            "text_response": reply_text(response_text),
+            "components": [],
+            "confidence": 0.5,
+            "suggested_actions": [],
+        }
 
 
 # Factory function
@@ -32,6 +32,7 @@ import logging
 import json
 from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
 from dataclasses import dataclass, field
+from itertools import islice
 
 from config import settings
 from llm import create_llm_client
@@ -46,22 +47,24 @@ from schemas import (
     validate_components,
     zone_output_json_schema,
 )
-from utils.content_policy import policy_for
+from utils.content_policy import ContentPolicy, policy_for
 from utils.content_policy_store import effective_policy
 from utils.disclosure import (
     PROVENANCE_NONE,
     content_provenance,
     disclosure_block,
 )
+from utils.json_extract import loads_llm_json
 from utils.json_stream import ComponentStreamParser
 from utils.numeric_guard import NumericGuard
 from utils.redundancy_guard import RedundancyGuard
+from utils.sync_loop import run_sync
 from utils.url_guard import UrlGuard, is_image_field, is_url_field, normalize_url
 
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+@dataclass(slots=True)
 class ZoneRenderRequest:
     """Request data for zone rendering."""
     zone_id: str
@@ -86,7 +89,7 @@ class ZoneRenderRequest:
     max_components: Optional[int] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class ZoneRenderResult:
     """Result of zone rendering."""
     components: List[Dict[str, Any]]
@@ -129,6 +132,44 @@ _SHOWN_TITLE_FIELDS = (
 )
 
 
+# Retrieval scales with the zone: a 3-card hero needs a handful of
+# candidates and a short context, not the 10 chunks and 1500 tokens a
+# full grid gets. The context never drops below one chunk.
+_MAX_RETRIEVED = 10
+_MAX_CONTEXT_TOKENS = 1500
+_CONTEXT_TOKENS_PER_ITEM = 200
+
+
+def _retrieval_top_k(max_items: int) -> int:
+    """Chunks to retrieve for a zone of max_items: two per item, 4 to 10."""
+    return min(_MAX_RETRIEVED, max(max_items * 2, 4))
+
+
+def _context_tokens(max_items: int) -> int:
+    """Token budget of the retrieved context for a zone of max_items."""
+    return min(_MAX_CONTEXT_TOKENS, max(settings.chunk_size, max_items * _CONTEXT_TOKENS_PER_ITEM))
+
+
+# A page metadata value longer than this (breadcrumb trails, analytics
+# tag lists) is left out of the prompt: billed input the model does not
+# need to place a zone. Short values, whatever their key, stay.
+_MAX_PAGE_VALUE_CHARS = 200
+
+
+def _page_context(page_metadata: Dict[str, Any]) -> str:
+    """
+    The page metadata as it goes into the prompt: compact JSON, sorted
+    (the same metadata in another key order is the same prefix), long
+    values left out.
+    """
+    kept = {}
+    for key, value in page_metadata.items():
+        encoded = json.dumps(value, default=str, ensure_ascii=False, separators=(",", ":"))
+        if len(encoded) <= _MAX_PAGE_VALUE_CHARS:
+            kept[key] = value
+    return json.dumps(kept, default=str, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
+
 def _is_material(item: Dict[str, Any]) -> bool:
     """
     True for a pinned item that is raw material rather than content to show.
@@ -321,13 +362,12 @@ CRITICAL RULES:
         """
         try:
             custom_types = merge_custom_types(request.custom_components)
-            retrieved = await self._retrieve_results(request)
+            retrieved, policy = await self._gather_inputs(request)
             prompt = self._build_zone_prompt(request, retrieved, custom_types)
 
             response_text = await self._call_llm(prompt, custom_types)
             parsed = self._parse_response(response_text)
 
-            policy = await effective_policy(request.tenant, settings.content_policy)
             return self._validate_and_sanitize(request, retrieved, parsed, custom_types, policy)
 
         except Exception as e:
@@ -336,7 +376,7 @@ CRITICAL RULES:
 
     def render_zone(self, request: ZoneRenderRequest) -> ZoneRenderResult:
         """Synchronous wrapper for backwards compatibility."""
-        return asyncio.run(self.render_zone_async(request))
+        return run_sync(self.render_zone_async(request))
 
     async def render_zone_stream_async(
         self,
@@ -357,11 +397,10 @@ CRITICAL RULES:
         """
         try:
             custom_types = merge_custom_types(request.custom_components)
-            retrieved = await self._retrieve_results(request)
+            retrieved, policy = await self._gather_inputs(request)
             prompt = self._build_zone_prompt(request, retrieved, custom_types)
             guard = self._build_url_guard(request, retrieved)
             numeric_guard = self._build_numeric_guard(request, retrieved)
-            policy = await effective_policy(request.tenant, settings.content_policy)
             redundancy = RedundancyGuard(enforce=settings.dedup_components_enabled)
 
             parser = ComponentStreamParser()
@@ -702,6 +741,18 @@ Pinned images are the exception, for the reason given on
 
 
     # Retrieval and prompt building
+    async def _gather_inputs(self, request: ZoneRenderRequest) -> Tuple[List[Any], ContentPolicy]:
+        """
+        The retrieved content and the tenant's content policy, fetched
+        concurrently: both are I/O (vector search, policy store) and
+        neither depends on the other, so the render waits for the slower
+        one only.
+        """
+        return await asyncio.gather(
+            self._retrieve_results(request),
+            effective_policy(request.tenant, settings.content_policy),
+        )
+
     async def _retrieve_results(self, request: ZoneRenderRequest) -> List[Any]:
         """Retrieve knowledge-base content relevant to the zone."""
         search_query = self._build_search_query(request)
@@ -710,7 +761,7 @@ Pinned images are the exception, for the reason given on
         try:
             return await self.vector_store.search_async(
                 query=search_query,
-                top_k=10,
+                top_k=_retrieval_top_k(request.max_items),
                 tenant=request.tenant,
             )
         except EmbeddingConfigError:
@@ -745,7 +796,7 @@ Pinned images are the exception, for the reason given on
         parts.append(f"Zone ID: {request.zone_id}")
         parts.append(f"Page: {request.current_page or 'unknown'}")
         if request.page_metadata:
-            parts.append(f"Page Context: {json.dumps(request.page_metadata)}")
+            parts.append(f"Page Context: {_page_context(request.page_metadata)}")
         parts.append("</zone_info>")
 
         # Developer prompts (combined)
@@ -783,6 +834,16 @@ Pinned images are the exception, for the reason given on
         if request.archetype:
             parts.append(f"<audience_archetype>\n{self._summarize_archetype(request.archetype)}\n</audience_archetype>")
 
+        # Retrieved content from knowledge base. Ahead of the per-user
+        # sections: everything above is stable across renders of a zone
+        # (and this block across most of a user's renders), so provider
+        # prompt caches reuse the longest prefix; behavior changes most
+        if retrieved:
+            context = build_context_from_results(
+                retrieved, max_tokens=_context_tokens(request.max_items)
+            )
+            parts.append(f"<available_content>\n{context}\n</available_content>")
+
         # User profile (individual, non-shared renders only)
         if request.user_profile:
             profile_summary = self._summarize_profile(request.user_profile)
@@ -793,11 +854,6 @@ Pinned images are the exception, for the reason given on
             behavior_summary = self._summarize_behavior(request.behavior_data)
             parts.append(f"<user_behavior>\n{behavior_summary}\n</user_behavior>")
 
-        # Retrieved content from knowledge base
-        if retrieved:
-            context = build_context_from_results(retrieved, max_tokens=1500)
-            parts.append(f"<available_content>\n{context}\n</available_content>")
-
         parts.append("\nGenerate the zone content as valid JSON matching the specified structure.")
         parts.append("Remember: ALL pinned content MUST be included, respect the component type constraint, and use ONLY URLs present in the input above. Every visible string is live page copy: never describe the audience, the layout or your strategy in it; explanations go only in 'reasoning'.")
 
@@ -819,7 +875,7 @@ Pinned images are the exception, for the reason given on
         elif request.user_profile:
             interests = request.user_profile.get("interests", {})
             if isinstance(interests, dict):
-                for key, val in list(interests.items())[:3]:
+                for key, val in islice(interests.items(), 3):
                     if isinstance(val, dict) and "value" in val:
                         query_parts.append(str(val["value"]))
                     else:
@@ -865,7 +921,7 @@ Pinned images are the exception, for the reason given on
         preferences = profile.get("preferences", {})
         if isinstance(preferences, dict) and preferences:
             pref_items = []
-            for k, v in list(preferences.items())[:5]:
+            for k, v in islice(preferences.items(), 5):
                 if isinstance(v, dict) and "value" in v:
                     pref_items.append(f"{k}: {v['value']}")
                 else:
@@ -876,7 +932,7 @@ Pinned images are the exception, for the reason given on
         interests = profile.get("interests", {})
         if isinstance(interests, dict) and interests:
             interest_items = []
-            for k, v in list(interests.items())[:5]:
+            for k, v in islice(interests.items(), 5):
                 if isinstance(v, dict) and "value" in v:
                     interest_items.append(str(v["value"]))
                 else:
@@ -887,7 +943,7 @@ Pinned images are the exception, for the reason given on
         demographic = profile.get("demographic", {})
         if isinstance(demographic, dict) and demographic:
             demo_items = []
-            for k, v in list(demographic.items())[:3]:
+            for k, v in islice(demographic.items(), 3):
                 if isinstance(v, dict) and "value" in v:
                     demo_items.append(f"{k}: {v['value']}")
                 else:
@@ -930,20 +986,20 @@ Pinned images are the exception, for the reason given on
 
     def _parse_response(self, response_text: str) -> Dict[str, Any]:
         """
-        Parse JSON response. With response_format enforced the content is
-        already pure JSON; code-fence stripping is kept as a defensive net.
+        Parse the JSON reply. With response_format enforced the content
+        is already pure JSON and the first json.loads takes it; fenced or
+        prose-wrapped replies go through the same extraction as the
+        other agents. A bare array is read as the components; anything
+        unparseable is an empty reply (the fallback render).
         """
         try:
-            text = response_text.strip()
-            if text.startswith("```"):
-                first_newline = text.find("\n")
-                text = text[first_newline + 1:]
-                if text.rstrip().endswith("```"):
-                    text = text.rstrip()[:-3]
-            return json.loads(text)
+            parsed = loads_llm_json(response_text)
         except (json.JSONDecodeError, TypeError) as e:
             logger.warning(f"Failed to parse zone response: {e}")
             return {}
+        if isinstance(parsed, list):
+            return {"components": parsed}
+        return parsed if isinstance(parsed, dict) else {}
 
     def _fallback_render(self, request: ZoneRenderRequest) -> ZoneRenderResult:
         """
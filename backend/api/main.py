@@ -12,11 +12,12 @@ from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends, File, Form, Query, Request, Security, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, PlainTextResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from api.deps import budget_tenant, charge_llm_budget, get_profile_store
 from api.audit_router import router as audit_router
 from api.content_policy_router import router as content_policy_router
 from api.events_router import router as events_router
+from api.sse import SSE_HEADERS, sse_event
 from api.theme_router import router as theme_router
 from api.zone_config_router import router as zone_config_router
 from api.zone_router import router as zone_router
@@ -196,6 +197,10 @@ async def lifespan(app: FastAPI):
             "provided elsewhere in your product."
         )
 
+    # Cached query embeddings are shared by all workers through Redis
+    from utils.cache import use_shared_cache
+    use_shared_cache(settings.redis_url)
+
     # Initialize orchestrator (warms up connections)
     try:
         get_orchestrator()
@@ -208,6 +213,10 @@ async def lifespan(app: FastAPI):
     # Shutdown
     logger.info("Shutting down GenUI Backend...")
 
+    # Release the LLM clients' shared connection pool now, not at GC
+    from llm.http import close_shared_http_client
+    await close_shared_http_client()
+
 
 # Create FastAPI app
 app = FastAPI(
@@ -376,6 +385,99 @@ async def whoami(auth: AuthContext = Depends(require_admin)):
     return {"tenant": auth.tenant, "is_admin": auth.is_admin}
 
 
+async def _resolve_query_profile(request: QueryRequest, auth: AuthContext, profile_store) -> None:
+    """
+    The server-side profile is authoritative, the client copy seeds it.
+    Replaces request.user_profile in place; a store failure is logged and
+    leaves the client copy.
+    """
+    if not request.user_id:
+        return
+    try:
+        server_profile = await profile_store.get(auth.tenant, request.user_id)
+        if server_profile:
+            request.user_profile = server_profile
+        elif request.user_profile:
+            request.user_profile = await profile_store.sync_client_profile(
+                auth.tenant, request.user_id, request.user_profile
+            )
+    except Exception as e:
+        logger.warning(f"Profile resolution failed for {request.user_id}: {e}")
+
+
+def _query_history(request: QueryRequest) -> Optional[List[Dict[str, str]]]:
+    """Conversation history in the dict format the agents take."""
+    if not request.conversation_history:
+        return None
+    return [{"role": m.role, "content": m.content} for m in request.conversation_history]
+
+
+async def _query_response(
+    request: QueryRequest,
+    auth: AuthContext,
+    profile_store,
+    result: OrchestratorResult,
+) -> QueryResponse:
+    """
+    Everything after the agents, shared by /query and /query/stream:
+    persist the profile updates, audit the answer, build the response.
+    """
+    # Format response for frontend
+    frontend_response = result.to_frontend_response()
+
+    # Persist agent-derived profile updates server-side
+    profile_updates = frontend_response.get("profile_updates", {})
+    if request.user_id and profile_updates.get("updates"):
+        try:
+            await profile_store.apply_updates(
+                auth.tenant, request.user_id, profile_updates["updates"]
+            )
+        except Exception as e:
+            logger.warning(f"Profile update persistence failed: {e}")
+
+    # Audit: what was answered/shown to whom
+    get_audit_logger().log(
+        "query",
+        tenant=auth.tenant,
+        user_id=request.user_id,
+        key=auth.key_fingerprint,
+        query=request.query[:200],
+        confidence=frontend_response["meta"].get("confidence"),
+        component_count=len(frontend_response["components"]),
+        profile_updates_applied=len(profile_updates.get("updates", [])),
+    )
+    
+    # Build meta info with optional behavior data
+    meta_data = frontend_response["meta"]
+    behavior_meta = None
+    if "behavior" in meta_data and meta_data["behavior"]:
+        behavior_meta = BehaviorMeta(**meta_data["behavior"])
+    
+    # Safely extract profile_updates, ensuring should_update is always a boolean
+    raw_profile_updates = frontend_response.get("profile_updates", {})
+    profile_updates = ProfileUpdateInstruction(
+        should_update=bool(raw_profile_updates.get("should_update", False)),
+        updates=raw_profile_updates.get("updates", [])
+    )
+    
+    return QueryResponse(
+        text=frontend_response["text"],
+        components=[ComponentData(**c) for c in frontend_response["components"]],
+        sources=frontend_response["sources"],
+        suggested_actions=frontend_response["suggested_actions"],
+        profile_updates=profile_updates,
+        meta=MetaInfo(
+            confidence=meta_data["confidence"],
+            interaction_type=meta_data["interaction_type"],
+            topics=meta_data["topics"],
+            sentiment=meta_data["sentiment"],
+            behavior=behavior_meta,
+            sanitization=meta_data.get("sanitization"),
+            disclosure=meta_data.get("disclosure"),
+        ),
+    )
+
+
 @app.post("/api/v1/query", response_model=QueryResponse)
 async def process_query(
     request: QueryRequest,
@@ -404,29 +506,12 @@ async def process_query(
 
     await charge_llm_budget(
         budget_tenant(auth),
-        cost=orchestrator.planned_generations(request.behavior_data),
+        cost=orchestrator.planned_generations(request.behavior_data, request.query),
     )
 
     try:
         profile_store = get_profile_store()
-
-        # Server-side profile is authoritative, the client copy seeds it
-        if request.user_id:
-            try:
-                server_profile = await profile_store.get(auth.tenant, request.user_id)
-                if server_profile:
-                    request.user_profile = server_profile
-                elif request.user_profile:
-                    request.user_profile = await profile_store.sync_client_profile(
-                        auth.tenant, request.user_id, request.user_profile
-                    )
-            except Exception as e:
-                logger.warning(f"Profile resolution failed for {request.user_id}: {e}")
-
-        # Convert conversation history to dict format
-        history = None
-        if request.conversation_history:
-            history = [{"role": m.role, "content": m.content} for m in request.conversation_history]
+        await _resolve_query_profile(request, auth, profile_store)
 
         # Process through orchestrator with async. 
         # The span ties the genui.llm.* client spans to this query,
@@ -438,7 +523,7 @@ async def process_query(
                 result: OrchestratorResult = await orchestrator.process(
                     query=request.query,
                     user_profile=request.user_profile,
-                    conversation_history=history,
+                    conversation_history=_query_history(request),
                     behavior_data=request.behavior_data,
                     tenant=auth.tenant,
                 )
@@ -447,66 +532,82 @@ async def process_query(
             raise
         ops.observe_generation(auth.tenant, "query", time.perf_counter() - started)
 
-        # Format response for frontend
-        frontend_response = result.to_frontend_response()
-
-        # Persist agent-derived profile updates server-side
-        profile_updates = frontend_response.get("profile_updates", {})
-        if request.user_id and profile_updates.get("updates"):
-            try:
-                await profile_store.apply_updates(
-                    auth.tenant, request.user_id, profile_updates["updates"]
-                )
-            except Exception as e:
-                logger.warning(f"Profile update persistence failed: {e}")
-
-        # Audit: what was answered/shown to whom
-        get_audit_logger().log(
-            "query",
-            tenant=auth.tenant,
-            user_id=request.user_id,
-            key=auth.key_fingerprint,
-            query=request.query[:200],
-            confidence=frontend_response["meta"].get("confidence"),
-            component_count=len(frontend_response["components"]),
-            profile_updates_applied=len(profile_updates.get("updates", [])),
-        )
-        
-        # Build meta info with optional behavior data
-        meta_data = frontend_response["meta"]
-        behavior_meta = None
-        if "behavior" in meta_data and meta_data["behavior"]:
-            behavior_meta = BehaviorMeta(**meta_data["behavior"])
-        
-        # Safely extract profile_updates, ensuring should_update is always a boolean
-        raw_profile_updates = frontend_response.get("profile_updates", {})
-        profile_updates = ProfileUpdateInstruction(
-            should_update=bool(raw_profile_updates.get("should_update", False)),
-            updates=raw_profile_updates.get("updates", [])
-        )
-        
-        return QueryResponse(
-            text=frontend_response["text"],
-            components=[ComponentData(**c) for c in frontend_response["components"]],
-            sources=frontend_response["sources"],
-            suggested_actions=frontend_response["suggested_actions"],
-            profile_updates=profile_updates,
-            meta=MetaInfo(
-                confidence=meta_data["confidence"],
-                interaction_type=meta_data["interaction_type"],
-                topics=meta_data["topics"],
-                sentiment=meta_data["sentiment"],
-                behavior=behavior_meta,
-                sanitization=meta_data.get("sanitization"),
-                disclosure=meta_data.get("disclosure"),
-            ),
-        )
+        return await _query_response(request, auth, profile_store, result)
         
     except Exception as e:
         logger.error(f"Query processing failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/v1/query/stream")
+async def process_query_stream(
+    request: QueryRequest,
+    auth: AuthContext = Depends(require_client),
+    user_token: Optional[str] = Security(USER_TOKEN_HEADER),
+):
+    """
+    Process a user query as a Server-Sent Events stream.
+
+    Events:
+    - `component`: one answer component, validated and sanitized, as soon
+      as the model finishes generating it
+    - `complete`: the authoritative final response (same shape as /query);
+      clients should replace streamed state with it
+    - `error`: terminal failure
+
+    The answer text only arrives with `complete`: it is sanitized as a
+    whole. Profile resolution, the LLM budget, profile persistence and
+    the audit log behave exactly like /query, which stays as it is.
+    """
+    if not is_identified(request.user_id):
+        request.user_id = None
+
+    check_user_access(auth, request.user_id, user_token)
+
+    orchestrator = get_orchestrator()
+
+    # Raises 429 before the stream starts
+    await charge_llm_budget(
+        budget_tenant(auth),
+        cost=orchestrator.planned_generations(request.behavior_data, request.query),
+    )
+
+    profile_store = get_profile_store()
+    await _resolve_query_profile(request, auth, profile_store)
+
+    async def event_stream():
+        ops = get_ops_metrics()
+        started = time.perf_counter()
+        generation_done = False
+        try:
+            async for event in orchestrator.process_stream(
+                query=request.query,
+                user_profile=request.user_profile,
+                conversation_history=_query_history(request),
+                behavior_data=request.behavior_data,
+                tenant=auth.tenant,
+            ):
+                if event["type"] == "component":
+                    yield sse_event("component", event["component"])
+                    continue
+
+                generation_done = True
+                ops.observe_generation(auth.tenant, "query", time.perf_counter() - started)
+                response = await _query_response(request, auth, profile_store, event["result"])
+                yield sse_event("complete", response.model_dump())
+        except Exception as e:
+            if not generation_done:
+                ops.observe_generation(auth.tenant, "query", outcome="error")
+            logger.error(f"Query stream failed: {e}")
+            yield sse_event("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+
 def _chunk_and_index(
     text: str,
     metadata: Dict[str, Any],
@@ -519,12 +620,15 @@ def _chunk_and_index(
     way. Returns (chunks created, chunks indexed).
     """
     metadata.setdefault("indexed_at", datetime.now(timezone.utc).isoformat())
-    chunks = create_chunker().chunk_text(
+    vector_store = get_vector_store()
+    # The chunker embeds with the store's client: same configured model,
+    # and no fresh SDK client (and connection pool) per upload
+    chunks = create_chunker(embed_model=vector_store.embed_model).chunk_text(
         text=text,
         metadata=metadata,
         source_name=source_name,
     )
-    return len(chunks), get_vector_store().index_chunks(chunks, tenant=tenant)
+    return len(chunks), vector_store.index_chunks(chunks, tenant=tenant)
 
 
 # Document routes talk to Qdrant with the synchronous client, so the
@@ -0,0 +1,18 @@
+"""
+Server-Sent Events helpers shared by the streaming endpoints.
+"""
+
+import json
+from typing import Any, Dict
+
+# Keep proxies (nginx: X-Accel-Buffering) from buffering the stream
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",
+}
+
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Format a Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
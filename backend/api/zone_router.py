@@ -51,12 +51,12 @@ Transparency:
 """
 
 import asyncio
-import json
 import logging
 import time
 import uuid
 from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime, timezone
+from functools import lru_cache
 
 from fastapi import APIRouter, Depends, HTTPException, Security
 from fastapi.responses import StreamingResponse
@@ -70,6 +70,7 @@ from api.deps import (
     get_profile_store,
     get_zone_config_store,
 )
+from api.sse import SSE_HEADERS, sse_event
 from auth import AuthContext
 from auth.dependencies import (
     USER_TOKEN_HEADER,
@@ -245,6 +246,20 @@ class ZoneRenderResponse(BaseModel):
     rendered_at: str
 
 
+class ZoneBatchItem(BaseModel):
+    """One zone of a batch render: its response, or why it failed."""
+    zone_id: str
+    success: bool
+    data: Optional[ZoneRenderResponse] = None
+    error: Optional[str] = None
+
+
+class ZoneBatchResponse(BaseModel):
+    """Response from batch zone rendering."""
+    results: List[ZoneBatchItem]
+    rendered_at: str
+
+
 class ZoneWarmupRequest(BaseModel):
     """
     Request to pre-compute zone renders for known segments.
@@ -261,16 +276,13 @@ class ZoneWarmupRequest(BaseModel):
 
 
 # Singletons
-_zone_agent: Optional[ZoneAgent] = None
 _zone_cache: Optional[ZoneRenderCache] = None
 
 
+@lru_cache(maxsize=1)
 def get_zone_agent() -> ZoneAgent:
     """Get or create the zone agent singleton."""
-    global _zone_agent
-    if _zone_agent is None:
-        _zone_agent = create_zone_agent()
-    return _zone_agent
+    return create_zone_agent()
 
 
 def get_zone_cache() -> ZoneRenderCache:
@@ -611,7 +623,7 @@ def _build_response(
         pinned_content_included=payload.get("pinned_content_included", []),
         personalization_applied=payload.get("personalization_applied", False),
         meta=meta,
-        rendered_at=payload.get("rendered_at", _utc_now()),
+        rendered_at=payload.get("rendered_at") or _utc_now(),
     )
 
 
@@ -776,11 +788,6 @@ async def render_zone(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-def _sse(event: str, data: Dict[str, Any]) -> str:
-    """Format a Server-Sent Event."""
-    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
-
-
 @router.post("/render/stream")
 async def render_zone_stream(
     request: ZoneRenderRequest,
@@ -843,7 +850,7 @@ async def render_zone_stream(
                         _schedule_refresh(request, cache_key, auth.tenant, segment)
 
                     for component in lookup.payload.get("components", []):
-                        yield _sse("component", component)
+                        yield sse_event("component", component)
 
                     cache_meta = {
                         "status": hit_status,
@@ -853,7 +860,7 @@ async def render_zone_stream(
                     }
                     _audit_render(auth, request, lookup.payload, cache_meta, arm)
                     response = _build_response(request.zone_id, lookup.payload, cache_meta, arm)
-                    yield _sse("complete", response.model_dump())
+                    yield sse_event("complete", response.model_dump())
                     return
 
             # Live streaming render (cold-start winner or bypass). 
@@ -861,7 +868,7 @@ async def render_zone_stream(
             try:
                 await charge_llm_budget(budget_tenant(auth))
             except HTTPException as e:
-                yield _sse("error", {
+                yield sse_event("error", {
                     "detail": e.detail,
                     "status": e.status_code,
                     "zone_id": request.zone_id,
@@ -874,7 +881,7 @@ async def render_zone_stream(
 
             async for event in zone_agent.render_zone_stream_async(agent_request):
                 if event["type"] == "component":
-                    yield _sse("component", event["component"])
+                    yield sse_event("component", event["component"])
                     continue
 
                 # complete
@@ -896,7 +903,7 @@ async def render_zone_stream(
 
                 _audit_render(auth, request, payload, cache_meta, arm)
                 response = _build_response(request.zone_id, payload, cache_meta, arm)
-                yield _sse("complete", response.model_dump())
+                yield sse_event("complete", response.model_dump())
 
         except Exception as e:
             if generation_started is not None and not generation_done:
@@ -904,7 +911,7 @@ async def render_zone_stream(
                     auth.tenant, "zone", outcome="error"
                 )
             logger.error(f"Zone stream failed for {request.zone_id}: {e}")
-            yield _sse("error", {"detail": str(e), "zone_id": request.zone_id})
+            yield sse_event("error", {"detail": str(e), "zone_id": request.zone_id})
         finally:
             if locked:
                 await cache.release_refresh_lock(cache_key)
@@ -912,29 +919,12 @@ async def render_zone_stream(
     return StreamingResponse(
         event_stream(),
         media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "X-Accel-Buffering": "no",
-        },
+        headers=SSE_HEADERS,
     )
 
 
-@router.post("/batch-render")
-async def batch_render_zones(
-    requests: List[ZoneRenderRequest],
-    auth: AuthContext = Depends(require_client),
-    user_token: Optional[str] = Security(USER_TOKEN_HEADER),
-):
-    """
-    Render multiple zones concurrently in a single request.
-
-    Useful for pages with multiple GenUIZone components to reduce
-    network round-trips. Capped at ZONE_BATCH_MAX zones, and each zone
-    counts against the per-key rate limit individually: N renders must
-    cost N slots, not 1, or a single batch amplifies into unlimited
-    LLM calls.
-    """
+async def _admit_batch(requests: List[ZoneRenderRequest], auth: AuthContext) -> None:
+    """Size cap and proportional rate-limit charge, for both batch endpoints."""
     if len(requests) > settings.zone_batch_max:
         raise HTTPException(
             status_code=413,
@@ -950,26 +940,94 @@ async def batch_render_zones(
         ):
             raise HTTPException(status_code=429, detail="Rate limit exceeded")
 
-    async def _safe_render(request: ZoneRenderRequest) -> Dict[str, Any]:
-        try:
-            result = await _handle_render(request, auth, user_token)
-            return {
-                "zone_id": request.zone_id,
-                "success": True,
-                "data": result.model_dump(),
-            }
-        except Exception as e:
-            return {
-                "zone_id": request.zone_id,
-                "success": False,
-                "error": str(e),
-            }
 
-    results = await asyncio.gather(*[_safe_render(r) for r in requests])
+async def _batch_item(
+    request: ZoneRenderRequest, auth: AuthContext, user_token: Optional[str]
+) -> Dict[str, Any]:
+    """One zone of a batch; a failure is this zone's result, not the batch's."""
+    try:
+        result = await _handle_render(request, auth, user_token)
+        return {
+            "zone_id": request.zone_id,
+            "success": True,
+            "data": result.model_dump(),
+        }
+    except Exception as e:
+        return {
+            "zone_id": request.zone_id,
+            "success": False,
+            "error": str(e),
+        }
+
+
+# A declared model, not a bare dict: FastAPI then encodes the batch in
+# pydantic-core (~0.4ms for 20 zones) instead of walking every component
+# through jsonable_encoder and json.dumps (~7ms). exclude_unset keeps
+# each item's shape: data on success, error on failure
+@router.post(
+    "/batch-render", response_model=ZoneBatchResponse, response_model_exclude_unset=True
+)
+async def batch_render_zones(
+    requests: List[ZoneRenderRequest],
+    auth: AuthContext = Depends(require_client),
+    user_token: Optional[str] = Security(USER_TOKEN_HEADER),
+):
+    """
+    Render multiple zones concurrently in a single request.
+
+    Useful for pages with multiple GenUIZone components to reduce
+    network round-trips. Capped at ZONE_BATCH_MAX zones, and each zone
+    counts against the per-key rate limit individually: N renders must
+    cost N slots, not 1, or a single batch amplifies into unlimited
+    LLM calls.
+    """
+    await _admit_batch(requests, auth)
+
+    results = await asyncio.gather(*[_batch_item(r, auth, user_token) for r in requests])
 
     return {"results": list(results), "rendered_at": _utc_now()}
 
 
+@router.post("/batch-render/stream")
+async def batch_render_zones_stream(
+    requests: List[ZoneRenderRequest],
+    auth: AuthContext = Depends(require_client),
+    user_token: Optional[str] = Security(USER_TOKEN_HEADER),
+):
+    """
+    Render multiple zones concurrently, each sent as soon as it is done.
+
+    /batch-render answers when its slowest zone does: a cached hero
+    waits for a cold grid next to it. Here every zone is its own
+    Server-Sent Event, in completion order.
+
+    Events:
+    - `zone`: one zone's result, the same item /batch-render lists
+      ({zone_id, success, data | error})
+    - `complete`: every zone was sent ({rendered_at})
+
+    Same cap and rate-limit charge as /batch-render, applied before the
+    stream starts. Closing the stream cancels the renders still running.
+    """
+    await _admit_batch(requests, auth)
+
+    async def event_stream():
+        tasks = [asyncio.ensure_future(_batch_item(r, auth, user_token)) for r in requests]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield sse_event("zone", await finished)
+            yield sse_event("complete", {"rendered_at": _utc_now()})
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+
 @router.post("/warmup")
 async def warmup_zones(
     request: ZoneWarmupRequest,
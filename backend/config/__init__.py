@@ -1,3 +1,14 @@
-from .settings import settings, get_settings
+from .settings import get_settings
+
+# Importing the submodule bound the package attribute `settings` to it;
+# drop that so `config.settings` resolves through __getattr__ below
+del settings
 
 __all__ = ["settings", "get_settings"]
+
+
+def __getattr__(name: str):
+    # `from config import settings` builds the cached instance on first use
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
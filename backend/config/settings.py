@@ -57,6 +57,13 @@ class Settings(BaseSettings):
                     "the model (known models, or a one-time probe). Replaces "
                     "the old QDRANT_VECTOR_SIZE constant"
     )
+    embedding_batch_window_ms: float = Field(
+        default=5.0,
+        description="Query embeddings that arrive within this many ms share "
+                    "one provider call (up to 64 texts): concurrent chats "
+                    "pay one round-trip instead of one each. 0 = every query "
+                    "embeds on its own"
+    )
 
     # Qdrant Configuration
     qdrant_host: str = "localhost"
@@ -70,6 +77,35 @@ class Settings(BaseSettings):
                     "bulk-indexing into a remote Qdrant (the upload response "
                     "reports chunks_indexed, so a too-tight cap is visible)"
     )
+    qdrant_prefer_grpc: bool = Field(
+        default=False,
+        description="Talk to Qdrant over gRPC (port 6334) instead of REST: "
+                    "binary frames instead of JSON-encoded vectors. Needs "
+                    "the gRPC port reachable from the backend"
+    )
+    qdrant_grpc_port: int = Field(
+        default=6334,
+        description="Qdrant's gRPC port (QDRANT_PREFER_GRPC)"
+    )
+    qdrant_vector_datatype: Optional[str] = Field(
+        default=None,
+        description="Vector storage type of a newly created collection: "
+                    "'float16' halves its vector memory (Qdrant >= 1.9). "
+                    "Unset = float32. Existing collections keep theirs"
+    )
+    qdrant_quantization: Optional[str] = Field(
+        default=None,
+        description="'int8' = scalar-quantize a newly created collection: "
+                    "searches scan a 4x smaller int8 copy kept in RAM and "
+                    "rescore with the originals, which move to disk. "
+                    "Unset = no quantization"
+    )
+    qdrant_hnsw_ef: Optional[int] = Field(
+        default=None,
+        description="HNSW candidate list size per search. Lower = faster "
+                    "single queries at some recall, higher = better recall. "
+                    "Unset = Qdrant's default (the index's ef_construct)"
+    )
     
     # RAG Configuration
     chunk_size: int = 512
@@ -98,6 +134,23 @@ class Settings(BaseSettings):
     use_semantic_chunking: bool = True
     breakpoint_percentile_threshold: int = 95
     buffer_size: int = 1
+    chunk_cache_dir: Optional[str] = Field(
+        default=None,
+        description="Directory for chunk_document's per-file cache (JSON, "
+                    "keyed by file content, path and chunking settings): "
+                    "re-chunking an unchanged file skips the splitter's "
+                    "embedding calls. Unset = no cache"
+    )
+    chunk_concurrency: int = Field(
+        default=4,
+        description="Files chunk_directory chunks at once (their splitter "
+                    "embedding round-trips overlap); 1 = one after another"
+    )
+    upsert_concurrency: int = Field(
+        default=4,
+        description="Qdrant upserts index_chunks keeps in flight while it "
+                    "embeds the next batch; 1 = one batch after another"
+    )
 
     # Zone Render Cache (segment-based, stale-while-revalidate)
     zone_cache_enabled: bool = Field(
@@ -116,9 +169,44 @@ class Settings(BaseSettings):
         default=60,
         description="Seconds a single-flight refresh lock is held"
     )
+    response_cache_similarity: float = Field(
+        default=0.0,
+        description="Semantic cache for chat answers: a query whose embedding "
+                    "has at least this cosine similarity to an answered one "
+                    "(same tenant, profile and conversation) gets the earlier "
+                    "answer, without the search or the model call. 0 = "
+                    "disabled. Around 0.95 catches rewordings; lower values "
+                    "start answering questions that only look alike"
+    )
+    response_cache_size: int = Field(
+        default=512,
+        description="Answers the semantic cache keeps per worker (LRU)"
+    )
+    response_cache_int8: bool = Field(
+        default=False,
+        description="Store the semantic cache's query embeddings as int8 "
+                    "(one scale per row) instead of float32: a quarter of "
+                    "the memory, scores within ~1e-3 of exact, lookups "
+                    "somewhat slower. Worth it for large RESPONSE_CACHE_SIZE"
+    )
+    retrieval_cache_similarity: float = Field(
+        default=0.0,
+        description="Semantic cache for knowledge-base searches: a query "
+                    "whose embedding has at least this cosine similarity to "
+                    "an earlier one (same tenant, top_k, threshold and "
+                    "filters) gets its results without the Qdrant search. "
+                    "0 = disabled (exact repeats are still cached). Around "
+                    "0.95 catches rewordings"
+    )
+    retrieval_cache_size: int = Field(
+        default=1024,
+        description="Searches the semantic retrieval cache keeps per worker (LRU)"
+    )
     redis_url: Optional[str] = Field(
         default=None,
-        description="Redis URL (e.g. redis://localhost:6379/0). Empty = in-memory cache"
+        description="Redis URL (e.g. redis://localhost:6379/0): caches and "
+                    "stores shared by all workers, query embeddings included. "
+                    "Empty = in-memory cache"
     )
 
     # Profile Segmentation
@@ -207,6 +295,38 @@ class Settings(BaseSettings):
                     "are exempt. Shares the rate-limit Redis store, so the cap "
                     "is consistent across workers. 0 = disabled"
     )
+    llm_http_max_connections: int = Field(
+        default=100,
+        description="Size of the HTTP connection pool shared by every LLM "
+                    "client in the process (half of it kept alive). One "
+                    "warm pool instead of one per agent: no handshake per "
+                    "cold client, no idle pools piling up under bursts"
+    )
+    max_concurrent_llm: int = Field(
+        default=8,
+        description="Max LLM calls one batch analysis keeps in flight at "
+                    "once. Batching overlaps the network waits; the cap "
+                    "keeps a burst of N users under the provider's "
+                    "requests-per-minute limit instead of tripping 429s"
+    )
+    combined_analysis: bool = Field(
+        default=False,
+        description="Answer the profile and behavior analyses of a chat turn "
+                    "with ONE model call when both would call the same "
+                    "model: one round-trip and one prompt prefix instead of "
+                    "two, charged as one generation. Off by default: the "
+                    "model then reads both tasks in one prompt, so enable it "
+                    "after checking the analyses on your own traffic"
+    )
+    stream_profile_agent: bool = Field(
+        default=False,
+        description="Run the profile analysis over the provider's streaming "
+                    "API and stop reading at the reply's closing brace: the "
+                    "parse starts as the last token lands instead of after "
+                    "end-of-stream. Same prompt and result; off by default "
+                    "because some gateways buffer streams, which only adds "
+                    "overhead"
+    )
     zone_batch_max: int = Field(
         default=10,
         description="Max zones per /zone/batch-render request (413 above). "
@@ -320,5 +440,10 @@ def get_settings() -> Settings:
     return Settings()
 
 
-# Convenience access
-settings = get_settings()
+def __getattr__(name: str):
+    # Convenience access: `settings` is built on first use, not at import,
+    # so importing this module (or a dataclass next to a settings user)
+    # does not parse the environment
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
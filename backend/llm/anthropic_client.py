@@ -30,6 +30,7 @@ class AnthropicChatClient(LLMChatClient):
         model: str,
         max_tokens: int = _DEFAULT_MAX_TOKENS,
         timeout: Optional[float] = None,
+        http_client: Any = None,
     ):
         try:
             from anthropic import AsyncAnthropic
@@ -44,7 +45,20 @@ class AnthropicChatClient(LLMChatClient):
         client_kwargs: Dict[str, Any] = {"api_key": api_key}
         if timeout is not None:
             client_kwargs["timeout"] = timeout
+        if http_client is not None:
+            # Shared pool (llm.http): keep-alive reused across clients
+            client_kwargs["http_client"] = http_client
         self._client = AsyncAnthropic(**client_kwargs)
+        # A shared pool is not ours to close (the SDK's close() would)
+        self._owns_http_client = http_client is None
+
+    @staticmethod
+    def _cached_system(system: str) -> list:
+        # The agents' system prompts are static class constants, so the
+        # prefix is identical on every call: mark it for Anthropic's
+        # prompt cache. Prompts under the model's minimum cacheable
+        # length are simply not cached; the hint is never an error.
+        return [{"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}]
 
     @staticmethod
     def _json_messages(user: str) -> list:
@@ -65,7 +79,7 @@ class AnthropicChatClient(LLMChatClient):
             response = await self._client.messages.create(
                 model=self.model,
                 max_tokens=self.max_tokens,
-                system=system,
+                system=self._cached_system(system),
                 messages=self._json_messages(user),
             )
 
@@ -75,6 +89,10 @@ class AnthropicChatClient(LLMChatClient):
             )
             return "{" + text
 
+    async def aclose(self) -> None:
+        if self._owns_http_client:
+            await self._client.close()
+
     async def stream_json(
         self,
         system: str,
@@ -87,7 +105,7 @@ class AnthropicChatClient(LLMChatClient):
             async with self._client.messages.stream(
                 model=self.model,
                 max_tokens=self.max_tokens,
-                system=system,
+                system=self._cached_system(system),
                 messages=self._json_messages(user),
             ) as stream:
                 async for delta in stream.text_stream:
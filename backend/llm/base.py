@@ -63,6 +63,26 @@ class LLMChatClient(ABC):
         """
         return await self.complete_json(system, user)
 
+    def __cache_key__(self):
+        """
+        What cached analyses key this client on: the same provider class,
+        model and endpoint answer the same prompt alike, whichever
+        instance asks.
+        """
+        return (
+            f"{type(self).__module__}.{type(self).__qualname__}",
+            getattr(self, "model", None),
+            getattr(self, "base_url", None),
+        )
+
+    async def aclose(self) -> None:
+        """
+        Release connections this client owns. Default: nothing to release.
+
+        Clients riding on the shared pool (llm.http) own none: that pool
+        is closed once, at process shutdown, by close_shared_http_client.
+        """
+
     @abstractmethod
     def stream_json(
         self,
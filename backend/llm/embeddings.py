@@ -15,11 +15,13 @@ Two rules with no exceptions:
   EMBEDDING_DIMENSIONS, or a one-time probe), never from a constant.
 """
 
+import asyncio
 import logging
+import weakref
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from functools import lru_cache
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Set
 
 from utils.tracing import span
 
@@ -51,6 +53,10 @@ class EmbeddingClient(ABC):
     def embed(self, texts: List[str]) -> List[List[float]]:
         """Embed a batch of texts, preserving input order."""
 
+    async def aembed(self, texts: List[str]) -> List[List[float]]:
+        """embed() for coroutines; by default on the loop's thread pool."""
+        return await asyncio.get_running_loop().run_in_executor(None, self.embed, texts)
+
     def dimension_if_known(self) -> Optional[int]:
         """Vector size without network I/O; None if only a probe can tell."""
         if self.declared_dimensions:
@@ -96,27 +102,136 @@ class OpenAIEmbeddingClient(EmbeddingClient):
         client_kwargs = {"api_key": api_key or "sk-no-key-required", "base_url": base_url}
         if timeout is not None:
             client_kwargs["timeout"] = timeout
+        self._client_kwargs = client_kwargs
         self._client = OpenAI(**client_kwargs)
+        self._async_client = None  # built on the first aembed
 
     def embed(self, texts: List[str]) -> List[List[float]]:
         if not texts:
             return []
-        kwargs = {}
+        with self._span(texts):
+            response = self._client.embeddings.create(**self._request(texts))
+        return self._vectors(response)
+
+    async def aembed(self, texts: List[str]) -> List[List[float]]:
+        """
+        Native async call: no thread-pool hop, and the request rides the
+        chat clients' shared HTTP pool (llm.http), so concurrent query
+        embeddings reuse its keep-alive (or HTTP/2) connections.
+        """
+        if not texts:
+            return []
+        if self._async_client is None:
+            from openai import AsyncOpenAI
+
+            from .http import shared_http_client
+
+            self._async_client = AsyncOpenAI(
+                **self._client_kwargs, http_client=shared_http_client()
+            )
+        with self._span(texts):
+            response = await self._async_client.embeddings.create(**self._request(texts))
+        return self._vectors(response)
+
+    def _request(self, texts: List[str]) -> Dict[str, Any]:
+        kwargs: Dict[str, Any] = {"model": self.model, "input": list(texts)}
         if self.declared_dimensions and self._base_url is None:
             kwargs["dimensions"] = self.declared_dimensions
-        with span(
+        return kwargs
+
+    def _span(self, texts: List[str]):
+        return span(
             "genui.embedding",
             provider=self.provider_name,
             model=self.model,
             batch_size=len(texts),
-        ):
-            response = self._client.embeddings.create(
-                model=self.model, input=list(texts), **kwargs
-            )
+        )
+
+    @staticmethod
+    def _vectors(response) -> List[List[float]]:
         data = sorted(response.data, key=lambda item: item.index)
         return [list(item.embedding) for item in data]
 
 
+@dataclass
+class _PendingBatch:
+    """Texts waiting for the next flush on one event loop."""
+    waiters: Dict[str, List[asyncio.Future]] = field(default_factory=dict)
+    timer: Optional[asyncio.TimerHandle] = None
+    tasks: Set[asyncio.Task] = field(default_factory=set)
+
+
+class EmbeddingBatcher:
+    """
+    Coalesces single-text embeddings into one provider call.
+
+    Concurrent requests each embed one query; sent one by one they pay
+    one HTTPS round-trip each. embed() queues the text and a flush,
+    window seconds after the first queued text or as soon as max_batch
+    distinct texts wait, sends them as one embed() call. Identical texts
+    in a batch are embedded once and share the vector.
+
+    window <= 0 disables batching: every call goes straight to the client.
+    A failed call fails every text of its batch with the same error, which
+    is what each would have seen alone.
+    """
+
+    def __init__(self, client: EmbeddingClient, window: float = 0.005, max_batch: int = 64):
+        self.client = client
+        self.window = window
+        self.max_batch = max(1, max_batch)
+        # Futures belong to one loop: the API's and run_sync's never share a batch
+        self._pending: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _PendingBatch]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    async def embed(self, text: str) -> List[float]:
+        if self.window <= 0:
+            return (await self.client.aembed([text]))[0]
+
+        loop = asyncio.get_running_loop()
+
+        pending = self._pending.get(loop)
+        if pending is None:
+            pending = self._pending[loop] = _PendingBatch()
+        future = loop.create_future()
+        pending.waiters.setdefault(text, []).append(future)
+        if len(pending.waiters) >= self.max_batch:
+            self._flush(loop, pending)
+        elif pending.timer is None:
+            pending.timer = loop.call_later(self.window, self._flush, loop, pending)
+        return await future
+
+    def _flush(self, loop: asyncio.AbstractEventLoop, pending: _PendingBatch) -> None:
+        if pending.timer is not None:
+            pending.timer.cancel()
+            pending.timer = None
+        waiters, pending.waiters = pending.waiters, {}
+        if waiters:
+            task = loop.create_task(self._embed_batch(waiters))
+            pending.tasks.add(task)
+            task.add_done_callback(pending.tasks.discard)
+
+    async def _embed_batch(self, waiters: Dict[str, List[asyncio.Future]]) -> None:
+        texts = list(waiters)
+        try:
+            vectors = await self.client.aembed(texts)
+            if len(vectors) != len(texts):
+                raise RuntimeError(
+                    f"embedding provider returned {len(vectors)} vectors for {len(texts)} texts"
+                )
+        except Exception as e:
+            for futures in waiters.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+        for vector, futures in zip(vectors, waiters.values()):
+            for future in futures:
+                if not future.done():
+                    future.set_result(vector)
+
+
 @dataclass(frozen=True)
 class EmbeddingProviderConfig:
     """Resolved embedding configuration (pure, testable)."""
@@ -92,12 +92,15 @@ def create_llm_client(model: str) -> LLMChatClient:
         openai_base_url=settings.openai_base_url,
     )
 
+    from .http import shared_http_client
+
     if config.provider == "anthropic":
         from .anthropic_client import AnthropicChatClient
         return AnthropicChatClient(
             api_key=config.api_key,
             model=model,
             timeout=settings.llm_timeout_seconds,
+            http_client=shared_http_client(),
         )
 
     from .openai_client import OpenAIChatClient
@@ -107,4 +110,5 @@ def create_llm_client(model: str) -> LLMChatClient:
         base_url=config.base_url,
         provider_name=config.provider,
         timeout=settings.llm_timeout_seconds,
+        http_client=shared_http_client(),
     )
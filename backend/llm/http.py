@@ -0,0 +1,47 @@
+"""
+Shared HTTP connection pool for the LLM provider clients.
+
+Each provider SDK client builds its own httpx pool unless given one.
+With one client per agent and model, a burst of concurrent calls paid
+a TCP/TLS handshake per cold pool and kept several idle pools open per
+process. Every chat client created by the factory now rides on this one
+pool: keep-alive connections are reused across agents and models, and
+HTTP/2 (when the optional `h2` package is installed) multiplexes
+concurrent calls to the same provider over a single connection.
+
+Timeouts stay per client (LLM_TIMEOUT_SECONDS is passed to the SDK,
+which applies it per request); the pool only owns connections, and is
+closed once at shutdown (close_shared_http_client).
+"""
+
+import importlib.util
+from functools import lru_cache
+
+import httpx
+
+
+@lru_cache(maxsize=1)
+def shared_http_client() -> httpx.AsyncClient:
+    """The process-wide async HTTP client for LLM provider calls."""
+    from config import settings
+
+    max_connections = max(1, settings.llm_http_max_connections)
+    return httpx.AsyncClient(
+        http2=importlib.util.find_spec("h2") is not None,
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max(1, max_connections // 2),
+        ),
+    )
+
+
+async def close_shared_http_client() -> None:
+    """
+    Close the shared pool, if one was built. Called at process shutdown
+    (api.main lifespan) so sockets are released deterministically
+    instead of whenever the garbage collector gets to them.
+    """
+    if shared_http_client.cache_info().currsize:
+        client = shared_http_client()
+        shared_http_client.cache_clear()
+        await client.aclose()
@@ -6,8 +6,10 @@ API works via `base_url`: Google Gemini (OpenAI-compatible endpoint),
 Azure OpenAI, Mistral, vLLM, Ollama, OpenRouter, ...
 """
 
+import hashlib
 import json
 import logging
+from functools import lru_cache
 from typing import Any, AsyncIterator, Dict, List, Optional
 
 from utils.tracing import span
@@ -20,6 +22,8 @@ logger = logging.getLogger(__name__)
 class OpenAIChatClient(LLMChatClient):
     """LLMChatClient over the OpenAI (compatible) chat completions API."""
 
+    _send_prompt_cache_key = False
+
     def __init__(
         self,
         api_key: str,
@@ -27,18 +31,41 @@ class OpenAIChatClient(LLMChatClient):
         base_url: Optional[str] = None,
         provider_name: str = "openai",
         timeout: Optional[float] = None,
+        http_client: Any = None,
     ):
         # Imported lazily so the module can be imported and tested without the SDK installed
         from openai import AsyncOpenAI
 
         self.model = model
+        self.base_url = base_url
         self.provider_name = provider_name
         client_kwargs: Dict[str, Any] = {"api_key": api_key, "base_url": base_url}
         if timeout is not None:
             client_kwargs["timeout"] = timeout
+        if http_client is not None:
+            # Shared pool (llm.http): keep-alive reused across clients
+            client_kwargs["http_client"] = http_client
         self._client = AsyncOpenAI(**client_kwargs)
+        # A shared pool is not ours to close (the SDK's close() would)
+        self._owns_http_client = http_client is None
         # Downgraded at runtime if the endpoint rejects json_schema
         self._supports_json_schema = True
+        # prompt_cache_key is an OpenAI parameter: compatible endpoints
+        # (custom base_url, Gemini) may reject unknown fields
+        self._send_prompt_cache_key = provider_name == "openai" and base_url is None
+
+    def _cache_kwargs(self, system: str) -> Dict[str, Any]:
+        """
+        Prompt-cache routing hint for a request opening with `system`.
+
+        OpenAI caches the prompt prefix automatically; requests carrying
+        the same prompt_cache_key are routed to the same cache, so the
+        agents' static system prompts keep hitting it under load instead
+        of being prefilled again on whichever machine a request lands.
+        """
+        if not self._send_prompt_cache_key:
+            return {}
+        return {"prompt_cache_key": _prompt_cache_key(system)}
 
     async def complete_json(
         self,
@@ -65,6 +92,7 @@ class OpenAIChatClient(LLMChatClient):
                             "type": "json_schema",
                             "json_schema": {"name": "genui_output", "schema": json_schema},
                         },
+                        **self._cache_kwargs(system),
                     )
                     return response.choices[0].message.content or ""
                 except Exception as e:
@@ -78,6 +106,7 @@ class OpenAIChatClient(LLMChatClient):
                 model=self.model,
                 messages=messages,
                 response_format={"type": "json_object"},
+                **self._cache_kwargs(system),
             )
             return response.choices[0].message.content or ""
 
@@ -116,6 +145,7 @@ class OpenAIChatClient(LLMChatClient):
                     messages=messages,
                     tools=openai_tools,
                     response_format={"type": "json_object"},
+                    **self._cache_kwargs(system),
                 )
                 message = response.choices[0].message
                 if not message.tool_calls:
@@ -157,9 +187,14 @@ class OpenAIChatClient(LLMChatClient):
                 model=self.model,
                 messages=messages,
                 response_format={"type": "json_object"},
+                **self._cache_kwargs(system),
             )
             return response.choices[0].message.content or ""
 
+    async def aclose(self) -> None:
+        if self._owns_http_client:
+            await self._client.close()
+
     async def stream_json(
         self,
         system: str,
@@ -178,6 +213,7 @@ class OpenAIChatClient(LLMChatClient):
                 ],
                 response_format={"type": "json_object"},
                 stream=True,
+                **self._cache_kwargs(system),
             )
 
             async for chunk in stream:
@@ -186,3 +222,10 @@ class OpenAIChatClient(LLMChatClient):
                 delta = chunk.choices[0].delta.content
                 if delta:
                     yield delta
+
+
+@lru_cache(maxsize=64)
+def _prompt_cache_key(system: str) -> str:
+    # Stable across processes and restarts (unlike hash()), so every
+    # replica routes the same prompt to the same cache
+    return "genui-" + hashlib.blake2b(system.encode("utf-8"), digest_size=8).hexdigest()
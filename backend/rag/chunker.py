@@ -4,11 +4,19 @@ Implements content-aware document splitting based on semantic similarity
 rather than fixed character counts.
 """
 
+import hashlib
+import json
 import logging
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from pathlib import Path
-from typing import List, Optional, Dict, Any
-from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Optional, Dict, Any
+from dataclasses import asdict, dataclass
 
+import numpy as np
 from llama_index.core import Document, SimpleDirectoryReader
 from llama_index.core.node_parser import (
     SemanticSplitterNodeParser,
@@ -17,11 +25,16 @@ from llama_index.core.node_parser import (
 from llama_index.core.embeddings import BaseEmbedding
 from pydantic import PrivateAttr
 
-from config import settings
+from config import get_settings
 from llm.embeddings import EmbeddingClient, create_embedding_client
 
 logger = logging.getLogger(__name__)
 
+_EMBED_BATCH_SIZE = 100
+
+# Extensions chunk_directory picks up when none are given
+_DEFAULT_EXTENSIONS = frozenset({".pdf", ".docx", ".txt", ".md", ".html"})
+
 
 class _ClientEmbedding(BaseEmbedding):
     """
@@ -33,6 +46,11 @@ class _ClientEmbedding(BaseEmbedding):
     _client: EmbeddingClient = PrivateAttr()
 
     def __init__(self, client: EmbeddingClient, **kwargs):
+        # The splitter embeds every sentence group of a document: in
+        # LlamaIndex's default batches of 10, a long document cost one
+        # round-trip per 10 sentences. Same batch as index_chunks, which
+        # the embedding endpoint already has to accept.
+        kwargs.setdefault("embed_batch_size", _EMBED_BATCH_SIZE)
         super().__init__(model_name=client.model, **kwargs)
         self._client = client
 
@@ -52,6 +70,45 @@ class _ClientEmbedding(BaseEmbedding):
         return self._get_text_embedding(text)
 
 
+class _SemanticSplitter(SemanticSplitterNodeParser):
+    """
+    SemanticSplitterNodeParser with the adjacent-group distances computed
+    in one NumPy pass. The stock loop converts both embedding lists to
+    arrays for every pair (~0.2ms per pair at 1536 dimensions), which a
+    long document pays once per sentence. Same cosine distances, and the
+    breakpoints (a percentile over them) stay LlamaIndex's.
+    """
+
+    def _calculate_distances_between_sentence_groups(self, sentences) -> List[float]:
+        if len(sentences) < 2:
+            return []
+        vectors = np.asarray(
+            [s["combined_sentence_embedding"] for s in sentences], dtype=np.float64
+        )
+        norms = np.linalg.norm(vectors, axis=1)
+        norms[norms == 0] = 1.0  # an all-zero embedding is simply dissimilar
+        vectors /= norms[:, None]
+        return (1.0 - np.einsum("ij,ij->i", vectors[:-1], vectors[1:])).tolist()
+
+
+def _matching_files(root: Path, recursive: bool, extensions: frozenset) -> Iterator[Path]:
+    """
+    Files under root whose lowercased suffix is in extensions.
+
+    os.scandir hands back the entry type with the listing, so a directory
+    entry costs no stat of its own (Path.glob + is_file stat every one).
+    Symlinked files are included; symlinked directories are not entered,
+    so a link cycle cannot loop the walk.
+    """
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if recursive:
+                    yield from _matching_files(Path(entry.path), recursive, extensions)
+            elif os.path.splitext(entry.name)[1].lower() in extensions and entry.is_file():
+                yield Path(entry.path)
+
+
 @dataclass
 class SemanticChunk:
     """Represents a semantically coherent chunk of text with metadata."""
@@ -63,6 +120,28 @@ class SemanticChunk:
     end_char: Optional[int] = None
 
 
+def _read_cached_chunks(cache_file: Path) -> Optional[List[SemanticChunk]]:
+    """A cached chunk list, or None when absent or unreadable (then re-chunked)."""
+    try:
+        return [SemanticChunk(**c) for c in json.loads(cache_file.read_text(encoding="utf-8"))]
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, TypeError) as e:
+        logger.warning(f"Ignoring unreadable chunk cache {cache_file}: {e}")
+        return None
+
+
+def _write_cached_chunks(cache_file: Path, chunks: List[SemanticChunk]) -> None:
+    """Write atomically (a concurrent reader sees the old file or the new one); never raises."""
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cache_file.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps([asdict(c) for c in chunks], default=str), encoding="utf-8")
+        os.replace(tmp, cache_file)
+    except OSError as e:
+        logger.warning(f"Could not write chunk cache {cache_file}: {e}")
+
+
 class SemanticChunker:
     """
     LlamaIndex-based semantic chunker that splits documents
@@ -88,6 +167,7 @@ class SemanticChunker:
             breakpoint_percentile: Percentile threshold for detecting breakpoints Higher = fewer, larger chunks
             buffer_size: Number of sentences to include around breakpoints
         """
+        settings = get_settings()
         self.embed_model = _ClientEmbedding(embed_model or create_embedding_client())
 
         self.breakpoint_percentile = (
@@ -96,7 +176,7 @@ class SemanticChunker:
         self.buffer_size = buffer_size or settings.buffer_size
         
         # Initialize the semantic splitter
-        self.semantic_splitter = SemanticSplitterNodeParser(
+        self.semantic_splitter = _SemanticSplitter(
             buffer_size=self.buffer_size,
             breakpoint_percentile_threshold=self.breakpoint_percentile,
             embed_model=self.embed_model,
@@ -154,10 +234,12 @@ class SemanticChunker:
         for i, node in enumerate(nodes):
             chunk = SemanticChunk(
                 content=node.get_content(),
+                # No node.relationships: its ids are minted per run for
+                # the throwaway Document above, nothing reads them, and
+                # their repr added hundreds of bytes to every Qdrant payload
                 metadata={
                     **metadata,
                     "node_id": node.node_id,
-                    "relationships": str(node.relationships) if node.relationships else None,
                 },
                 chunk_id=f"{source_name}_{i}",
                 source_document=source_name,
@@ -189,6 +271,13 @@ class SemanticChunker:
         
         if not file_path.exists():
             raise FileNotFoundError(f"Document not found: {file_path}")
+
+        cache_file = self._cache_file(file_path, additional_metadata)
+        if cache_file is not None:
+            cached = _read_cached_chunks(cache_file)
+            if cached is not None:
+                logger.info(f"Chunk cache hit for {file_path.name}: {len(cached)} chunks")
+                return cached
         
         # Use LlamaIndex's reader for document loading
         reader = SimpleDirectoryReader(
@@ -221,13 +310,42 @@ class SemanticChunker:
             all_chunks.extend(chunks)
         
         logger.info(f"Total chunks from {file_path.name}: {len(all_chunks)}")
+        if cache_file is not None:
+            _write_cached_chunks(cache_file, all_chunks)
         return all_chunks
+
+    def _cache_file(
+        self, file_path: Path, additional_metadata: Optional[Dict[str, Any]]
+    ) -> Optional[Path]:
+        """
+        Where chunk_document caches this file's chunks (settings.chunk_cache_dir),
+        or None without a cache dir.
+
+        The key covers everything the chunks are a function of: the file's
+        bytes and path (the path is in the chunk metadata), the extra
+        metadata, the embedding model and the splitter settings. Changing
+        any of them is a miss, never a stale hit.
+        """
+        settings = get_settings()
+        if not settings.chunk_cache_dir:
+            return None
+        key = hashlib.blake2b(file_path.read_bytes(), digest_size=16)
+        key.update(json.dumps([
+            str(file_path.resolve()),
+            additional_metadata or {},
+            self.embed_model.model_name,
+            self.breakpoint_percentile,
+            self.buffer_size,
+            settings.chunk_size,
+            settings.chunk_overlap,
+        ], sort_keys=True, default=str).encode())
+        return Path(settings.chunk_cache_dir) / f"{key.hexdigest()}.json"
     
     def chunk_directory(
         self,
         directory_path: Path,
         recursive: bool = True,
-        file_extensions: Optional[List[str]] = None
+        file_extensions: Optional[Iterable[str]] = None
     ) -> List[SemanticChunk]:
         """
         Chunk all documents in a directory.
@@ -235,39 +353,101 @@ class SemanticChunker:
         Args:
             directory_path: Path to the directory
             recursive: Whether to process subdirectories
-            file_extensions: List of extensions to process (e.g., ['.pdf', '.docx'])
+            file_extensions: Extensions to process (e.g., ['.pdf', '.docx']);
+                default .pdf, .docx, .txt, .md, .html
             
         Returns:
             List of SemanticChunk objects from all documents
         """
+        return list(self.iter_directory(directory_path, recursive, file_extensions))
+
+    def iter_directory(
+        self,
+        directory_path: Path,
+        recursive: bool = True,
+        file_extensions: Optional[Iterable[str]] = None
+    ) -> Iterator[SemanticChunk]:
+        """
+        Chunk all documents in a directory, yielding as documents finish.
+
+        Same chunks as chunk_directory, in the same order, yielded as each
+        document is chunked: fed to QdrantVectorStore.index_chunks, a
+        corpus is indexed holding a few documents' chunks (at most
+        settings.chunk_concurrency, plus one upsert batch) in memory, not
+        all of them.
+
+        Raises:
+            NotADirectoryError: directory_path is not a directory (raised
+                on the first next(), like any generator)
+        """
         directory_path = Path(directory_path)
         
         if not directory_path.is_dir():
             raise NotADirectoryError(f"Not a directory: {directory_path}")
         
-        # Default supported extensions
-        if file_extensions is None:
-            file_extensions = ['.pdf', '.docx', '.txt', '.md', '.html']
+        extensions = (
+            _DEFAULT_EXTENSIONS if file_extensions is None
+            else frozenset(e.lower() for e in file_extensions)
+        )
         
         # Find all matching files
-        pattern = "**/*" if recursive else "*"
-        files = [
-            f for f in directory_path.glob(pattern)
-            if f.is_file() and f.suffix.lower() in file_extensions
-        ]
+        files = list(_matching_files(directory_path, recursive, extensions))
         
         logger.info(f"Found {len(files)} documents to process in {directory_path}")
         
-        all_chunks = []
-        for file_path in files:
-            try:
-                chunks = self.chunk_document(file_path)
-                all_chunks.extend(chunks)
-            except Exception as e:
-                logger.error(f"Failed to process {file_path}: {e}")
-                continue
-        
-        return all_chunks
+        for chunks in self._chunk_files(files):
+            yield from chunks
+
+    def _chunk_files(self, files: List[Path]) -> Iterator[List[SemanticChunk]]:
+        """
+        Each file's chunks, in file order; a file that fails is logged and
+        yields no chunks.
+
+        Up to settings.chunk_concurrency files are chunked at once, so
+        their embedding round-trips overlap instead of adding up. At most
+        that many documents are chunked ahead of the consumer. Each worker
+        thread gets its own chunker (same embedding client): nothing
+        guarantees LlamaIndex's node parsers are thread-safe.
+        """
+        workers = min(get_settings().chunk_concurrency, len(files))
+        if workers <= 1:
+            for file_path in files:
+                yield _chunk_or_skip(self, file_path)
+            return
+
+        local = threading.local()
+
+        def chunk(file_path: Path) -> List[SemanticChunk]:
+            chunker = getattr(local, "chunker", None)
+            if chunker is None:
+                chunker = local.chunker = type(self)(
+                    embed_model=self.embed_model._client,
+                    breakpoint_percentile=self.breakpoint_percentile,
+                    buffer_size=self.buffer_size,
+                )
+            return _chunk_or_skip(chunker, file_path)
+
+        remaining = iter(files)
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="genui-chunk")
+        try:
+            pending = deque(executor.submit(chunk, f) for f in islice(remaining, workers))
+            while pending:
+                chunks = pending.popleft().result()
+                next_file = next(remaining, None)
+                if next_file is not None:
+                    pending.append(executor.submit(chunk, next_file))
+                yield chunks
+        finally:
+            # A consumer that stops early leaves queued files unchunked
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _chunk_or_skip(chunker: SemanticChunker, file_path: Path) -> List[SemanticChunk]:
+    try:
+        return chunker.chunk_document(file_path)
+    except Exception as e:
+        logger.error(f"Failed to process {file_path}: {e}")
+        return []
 
 
 # Factory function for easy instantiation
@@ -286,6 +466,6 @@ def create_chunker(
         Configured SemanticChunker instance
     """
     if use_semantic is None:
-        use_semantic = settings.use_semantic_chunking
+        use_semantic = get_settings().use_semantic_chunking
     
     return SemanticChunker(**kwargs)
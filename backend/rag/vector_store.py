@@ -3,30 +3,139 @@ Qdrant Vector Store Module
 Handles embedding storage, retrieval, and similarity search.
 """
 
+import json
 import logging
-from typing import List, Optional, Dict, Any
+from typing import Iterable, List, Optional, Dict, Any, Tuple
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from functools import lru_cache
+from itertools import islice
 import uuid
-import asyncio
 
+import numpy as np
 from qdrant_client import QdrantClient, AsyncQdrantClient
 from qdrant_client.http import models as qmodels
 
 from auth.keys import DEFAULT_TENANT
-from config import settings
-from llm.embeddings import EmbeddingClient, EmbeddingConfigError, create_embedding_client
+from config import get_settings
+from llm.embeddings import (
+    EmbeddingBatcher,
+    EmbeddingClient,
+    EmbeddingConfigError,
+    create_embedding_client,
+)
 from .chunker import SemanticChunk
-from utils.cache import cacheable, clear_cache
+from utils.cache import cacheable, caching_enabled, clear_cache
+from utils.semantic_cache import ProximityCache
 
 logger = logging.getLogger(__name__)
 
 # Hard cap when scanning the collection for document listings
 _LIST_SCROLL_PAGE = 256
 _LIST_MAX_POINTS = 50_000
+# A query embedding only changes with the model (part of the cache key);
+# the TTL just lets Redis forget queries nobody asks anymore
+_QUERY_EMBEDDING_TTL = 7 * 24 * 3600
 
 
-@dataclass
+def _vector_storage(settings) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Extra VectorParams and create_collection arguments for the configured
+    vector storage (QDRANT_VECTOR_DATATYPE, QDRANT_QUANTIZATION). Both
+    empty by default: float32 vectors, no quantization.
+
+    Raises:
+        ValueError: an unknown datatype or quantization
+    """
+    vector_options: Dict[str, Any] = {}
+    collection_options: Dict[str, Any] = {}
+
+    datatype = (settings.qdrant_vector_datatype or "float32").lower()
+    if datatype == "float16":
+        vector_options["datatype"] = qmodels.Datatype.FLOAT16
+    elif datatype != "float32":
+        raise ValueError(f"Unknown QDRANT_VECTOR_DATATYPE {datatype!r} (float32, float16)")
+
+    quantization = (settings.qdrant_quantization or "none").lower()
+    if quantization == "int8":
+        # Searches run on the int8 copy held in RAM; the originals move
+        # to disk and only rescore the top candidates
+        vector_options["on_disk"] = True
+        collection_options["quantization_config"] = qmodels.ScalarQuantization(
+            scalar=qmodels.ScalarQuantizationConfig(
+                type=qmodels.ScalarType.INT8, quantile=0.99, always_ram=True,
+            )
+        )
+    elif quantization != "none":
+        raise ValueError(f"Unknown QDRANT_QUANTIZATION {quantization!r} (int8)")
+
+    return vector_options, collection_options
+
+
+def _search_params(settings) -> Optional["qmodels.SearchParams"]:
+    """
+    Search parameters for the configured storage and QDRANT_HNSW_EF;
+    None = Qdrant's defaults.
+
+    An int8-quantized collection rescores with the original vectors and
+    oversamples 2x: the quantized scan picks twice top_k candidates and
+    the exact scores pick the top_k, which recovers the recall int8
+    rounding costs. On a collection without quantization Qdrant ignores
+    both.
+    """
+    params: Dict[str, Any] = {}
+    if settings.qdrant_hnsw_ef:
+        params["hnsw_ef"] = settings.qdrant_hnsw_ef
+    if (settings.qdrant_quantization or "").lower() == "int8":
+        params["quantization"] = qmodels.QuantizationSearchParams(
+            rescore=True, oversampling=2.0
+        )
+    return qmodels.SearchParams(**params) if params else None
+
+
+# Namespace of the chunk point ids (uuid5)
+_POINT_NAMESPACE = uuid.UUID("5f0c1a7e-3d7b-5b8e-9c4a-6e2f1d0b8a31")
+
+
+def _point_id(tenant: str, chunk: SemanticChunk) -> str:
+    """
+    Deterministic point id: re-indexing the same chunk overwrites its
+    point instead of adding a duplicate next to it. The content is part
+    of it, so two different texts indexed under the same source name
+    (untitled uploads are all "uploaded_document") never replace each
+    other; the tenant, so tenants never share a point.
+    """
+    name = "\0".join((tenant, chunk.source_document, chunk.chunk_id, chunk.content))
+    return str(uuid.uuid5(_POINT_NAMESPACE, name))
+
+
+# (host, port, collection) -> vector size, for collections a store in this
+# process has created or validated; later stores skip the round-trips
+_verified_collections: Dict[Tuple[str, int, str], Optional[int]] = {}
+
+
+@lru_cache(maxsize=8)
+def _qdrant_clients(
+    host: str, port: int, timeout: int, prefer_grpc: bool, grpc_port: int
+) -> Tuple[QdrantClient, AsyncQdrantClient]:
+    """
+    The sync and async client for one Qdrant server, opened once per process.
+
+    Every store on the same server shares them, so creating another store
+    (create_vector_store, a second collection) reuses the open connection
+    pools instead of adding two more. The timeout is what keeps a hung
+    Qdrant from turning into a hung caller. prefer_grpc sends points and
+    queries over gRPC (grpc_port) instead of JSON over REST: vectors go
+    as packed floats, not as JSON arrays to print and parse.
+    """
+    options = dict(
+        host=host, port=port, grpc_port=grpc_port, timeout=timeout, prefer_grpc=prefer_grpc
+    )
+    return QdrantClient(**options), AsyncQdrantClient(**options)
+
+
+@dataclass(slots=True)
 class RetrievalResult:
     """Result from a similarity search."""
     content: str
@@ -58,25 +167,49 @@ class QdrantVectorStore:
             embedder: EmbeddingClient (created from config if not provided;
                 raises EmbeddingConfigError when embedding is unconfigured)
         """
+        settings = get_settings()
         self.host = host or settings.qdrant_host
         self.port = port or settings.qdrant_port
         self.collection_name = collection_name or settings.qdrant_collection
 
-        # Initialize Qdrant client (both sync and async). The timeout is what keeps a hung Qdrant from turning into a hung caller
-        timeout = settings.qdrant_timeout_seconds
-        self.client = QdrantClient(host=self.host, port=self.port, timeout=timeout)
-        self.async_client = AsyncQdrantClient(
-            host=self.host, port=self.port, timeout=timeout
+        # Qdrant clients (sync and async), shared by every store on the same server
+        self.client, self.async_client = _qdrant_clients(
+            self.host,
+            self.port,
+            settings.qdrant_timeout_seconds,
+            settings.qdrant_prefer_grpc,
+            settings.qdrant_grpc_port,
         )
 
         # Embedding goes through the provider abstraction
         self.embed_model = embedder or create_embedding_client()
+        # Query embeddings of concurrent requests share provider calls
+        self._search_params = _search_params(settings)
+        self._query_embedder = EmbeddingBatcher(
+            self.embed_model,
+            window=settings.embedding_batch_window_ms / 1000,
+        )
+
+        # Reworded searches reuse earlier results (RETRIEVAL_CACHE_SIMILARITY)
+        self._retrieval_cache = ProximityCache(settings.retrieval_cache_size)
 
         # Vector size of the collection actually in Qdrant (set below).
         # Embeddings are checked against it so a model/collection mismatch
         # fails loudly instead of corrupting or silently skipping batches
         self._collection_dim: Optional[int] = None
-        self._ensure_collection()
+        key = (self.host, self.port, self.collection_name)
+        if key in _verified_collections:
+            # Another store in this process already created or checked it:
+            # only the model check, no round-trips
+            self._collection_dim = _verified_collections[key]
+            self._check_model_dimension()
+        else:
+            self._ensure_collection()
+            _verified_collections[key] = self._collection_dim
+
+    def __cache_key__(self):
+        """What @cacheable keys this store's searches and embeddings on."""
+        return (self.host, self.port, self.collection_name, self.embed_model.model)
 
     def _ensure_collection(self):
         """Create collection if it doesn't exist; validate its dimension."""
@@ -88,13 +221,16 @@ class QdrantVectorStore:
                 logger.info(f"Creating collection: {self.collection_name}")
                 # The vector size follows the configured embedding model
                 self._collection_dim = self.embed_model.dimension
+                vector_options, collection_options = _vector_storage(get_settings())
                 try:
                     self.client.create_collection(
                         collection_name=self.collection_name,
                         vectors_config=qmodels.VectorParams(
                             size=self._collection_dim,
                             distance=qmodels.Distance.COSINE,
+                            **vector_options,
                         ),
+                        **collection_options,
                     )
 
                     # Create payload indices for filtering
@@ -125,16 +261,7 @@ class QdrantVectorStore:
             if exists:
                 logger.info(f"Collection {self.collection_name} already exists")
                 self._collection_dim = self._existing_vector_size()
-                known = self.embed_model.dimension_if_known()
-                if self._collection_dim and known and known != self._collection_dim:
-                    raise EmbeddingConfigError(
-                        f"Embedding model '{self.embed_model.model}' produces "
-                        f"{known}-dimensional vectors but collection "
-                        f"'{self.collection_name}' was created with dimension "
-                        f"{self._collection_dim}. Re-index into a new collection "
-                        f"(change QDRANT_COLLECTION) or switch back to a "
-                        f"{self._collection_dim}-dimensional embedding model."
-                    )
+                self._check_model_dimension()
 
             # Tenant index: created unconditionally so existing collections gain it on upgrade
             try:
@@ -150,6 +277,19 @@ class QdrantVectorStore:
             logger.error(f"Error ensuring collection: {e}")
             raise
 
+    def _check_model_dimension(self) -> None:
+        """Fail when the model's known dimension differs from the collection's."""
+        known = self.embed_model.dimension_if_known()
+        if self._collection_dim and known and known != self._collection_dim:
+            raise EmbeddingConfigError(
+                f"Embedding model '{self.embed_model.model}' produces "
+                f"{known}-dimensional vectors but collection "
+                f"'{self.collection_name}' was created with dimension "
+                f"{self._collection_dim}. Re-index into a new collection "
+                f"(change QDRANT_COLLECTION) or switch back to a "
+                f"{self._collection_dim}-dimensional embedding model."
+            )
+
     def _existing_vector_size(self) -> Optional[int]:
         """Vector size of the existing collection; None if undeterminable."""
         try:
@@ -207,9 +347,27 @@ class QdrantVectorStore:
         return self.embed_model.embed([text])[0]
 
     async def _generate_embedding_async(self, text: str) -> List[float]:
-        """Generate embedding for a text string asynchronously."""
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, self._generate_embedding, text)
+        """Generate embedding for a text string asynchronously (batched, see EmbeddingBatcher)."""
+        return await self._query_embedder.embed(text)
+
+    async def embed_query_async(self, query: str) -> np.ndarray:
+        """
+        Embedding of a search query. Cached, so a caller that needs the
+        vector too (the response agent's semantic cache) and the search
+        that follows embed the query once between them. Shared across
+        workers through Redis when configured: it depends only on the
+        model and the text, so no re-index ever invalidates it.
+
+        float32, as Qdrant stores it: a cached 1536-dim query takes 6KB
+        instead of ~49KB of Python floats.
+        """
+        # A vector read back from Redis is a list; a local hit is
+        # already float32 and passes through without a copy
+        return np.asarray(await self._embed_query_cached(query), dtype=np.float32)
+
+    @cacheable(ttl=_QUERY_EMBEDDING_TTL, shared=True)
+    async def _embed_query_cached(self, query: str) -> np.ndarray:
+        return np.asarray(await self._generate_embedding_async(query), dtype=np.float32)
 
     def _generate_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
         """Generate embeddings for multiple texts."""
@@ -217,7 +375,7 @@ class QdrantVectorStore:
     
     def index_chunks(
         self,
-        chunks: List[SemanticChunk],
+        chunks: Iterable[SemanticChunk],
         tenant: str = DEFAULT_TENANT,
         batch_size: int = 100,
     ) -> int:
@@ -225,68 +383,84 @@ class QdrantVectorStore:
         Index semantic chunks into Qdrant, scoped to a tenant.
 
         Args:
-            chunks: List of SemanticChunk objects to index
+            chunks: SemanticChunk objects to index: a list, or an iterator
+                (SemanticChunker.iter_directory) consumed one batch at a
+                time, so only a few batches are held in memory
             tenant: Tenant owning these documents (isolation boundary)
             batch_size: Number of chunks to process at once
 
         Returns:
             Number of chunks successfully indexed
         """
-        if not chunks:
-            logger.warning("No chunks provided for indexing")
-            return 0
-        
         indexed_count = 0
+        total = 0
+        chunk_iter = iter(chunks)
+
+        # Up to settings.upsert_concurrency upserts run in the background
+        # while the next batch is embedded, so the Qdrant round-trips
+        # overlap each other and the embedding calls instead of adding up
+        workers = get_settings().upsert_concurrency
+        executor = (
+            ThreadPoolExecutor(max_workers=workers, thread_name_prefix="genui-upsert")
+            if workers > 1 else None
+        )
+        pending = deque()
+        try:
+            # Process in batches
+            while batch := list(islice(chunk_iter, batch_size)):
+                i = total
+                total += len(batch)
+
+                # Generate embeddings for batch
+                texts = [chunk.content for chunk in batch]
+                try:
+                    embeddings = self._generate_embeddings_batch(texts)
+                except EmbeddingConfigError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Embedding generation failed for batch {i}: {e}")
+                    continue
+                if embeddings:
+                    self._check_dimension(embeddings[0])
+
+                # Prepare points for Qdrant
+                points = []
+                for chunk, embedding in zip(batch, embeddings):
+                    point_id = _point_id(tenant or DEFAULT_TENANT, chunk)
+
+                    payload = {
+                        "content": chunk.content,
+                        "chunk_id": chunk.chunk_id,
+                        "source_document": chunk.source_document,
+                        "tenant": tenant or DEFAULT_TENANT,
+                        **chunk.metadata,
+                    }
+
+                    points.append(qmodels.PointStruct(
+                        id=point_id,
+                        vector=embedding,
+                        payload=payload,
+                    ))
+
+                # Upsert to Qdrant
+                if executor is None:
+                    indexed_count += self._upsert_batch(points, i, batch_size)
+                    continue
+                if len(pending) >= workers:
+                    indexed_count += pending.popleft().result()
+                pending.append(executor.submit(self._upsert_batch, points, i, batch_size))
+
+            while pending:
+                indexed_count += pending.popleft().result()
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
         
-        # Process in batches
-        for i in range(0, len(chunks), batch_size):
-            batch = chunks[i:i + batch_size]
-            
-            # Generate embeddings for batch
-            texts = [chunk.content for chunk in batch]
-            try:
-                embeddings = self._generate_embeddings_batch(texts)
-            except EmbeddingConfigError:
-                raise
-            except Exception as e:
-                logger.error(f"Embedding generation failed for batch {i}: {e}")
-                continue
-            if embeddings:
-                self._check_dimension(embeddings[0])
-            
-            # Prepare points for Qdrant
-            points = []
-            for chunk, embedding in zip(batch, embeddings):
-                point_id = str(uuid.uuid4())
-                
-                payload = {
-                    "content": chunk.content,
-                    "chunk_id": chunk.chunk_id,
-                    "source_document": chunk.source_document,
-                    "tenant": tenant or DEFAULT_TENANT,
-                    **chunk.metadata,
-                }
-                
-                points.append(qmodels.PointStruct(
-                    id=point_id,
-                    vector=embedding,
-                    payload=payload,
-                ))
-            
-            # Upsert to Qdrant
-            try:
-                self.client.upsert(
-                    collection_name=self.collection_name,
-                    points=points,
-                )
-                indexed_count += len(points)
-                logger.info(f"Indexed batch {i//batch_size + 1}: {len(points)} chunks")
-                
-            except Exception as e:
-                logger.error(f"Failed to upsert batch {i}: {e}")
-                continue
-        
-        logger.info(f"Total indexed: {indexed_count}/{len(chunks)} chunks")
+        if not total:
+            logger.warning("No chunks provided for indexing")
+            return 0
+
+        logger.info(f"Total indexed: {indexed_count}/{total} chunks")
 
         if indexed_count:
             # Cached search results may not include the new content
@@ -294,14 +468,28 @@ class QdrantVectorStore:
 
         return indexed_count
     
+    def _upsert_batch(self, points: List["qmodels.PointStruct"], i: int, batch_size: int) -> int:
+        """Upsert one batch; the number of points indexed (0 when it failed)."""
+        try:
+            self.client.upsert(
+                collection_name=self.collection_name,
+                points=points,
+            )
+        except Exception as e:
+            logger.error(f"Failed to upsert batch {i}: {e}")
+            return 0
+        logger.info(f"Indexed batch {i//batch_size + 1}: {len(points)} chunks")
+        return len(points)
+
     @cacheable()
     async def search_async(
         self,
-        query: str,
+        query: Optional[str] = None,
         top_k: int = None,
         score_threshold: float = None,
         filters: Optional[Dict[str, Any]] = None,
         tenant: Optional[str] = None,
+        query_vector: Optional[List[float]] = None,
     ) -> List[RetrievalResult]:
         """
         Perform semantic search asynchronously, scoped to a tenant.
@@ -313,17 +501,41 @@ class QdrantVectorStore:
             filters: Optional metadata filters
             tenant: Tenant scope (None = default tenant, which also
                 matches legacy documents indexed without a tenant)
+            query_vector: The query's embedding, when the caller already
+                has it (embed_query_async); `query` is then not embedded
 
         Returns:
             List of RetrievalResult objects
+
+        Exact repeats are served by @cacheable. With
+        RETRIEVAL_CACHE_SIMILARITY set, a query whose embedding is at
+        least that similar to an earlier search with the same tenant,
+        top_k, threshold and filters gets that search's results too.
         """
+        settings = get_settings()
         top_k = top_k or settings.top_k_retrieval
         if score_threshold is None:
             score_threshold = settings.similarity_threshold
 
-        query_embedding = await self._generate_embedding_async(query)
+        if query_vector is not None:
+            query_embedding = np.asarray(query_vector, dtype=np.float32)
+        elif query is not None:
+            query_embedding = np.asarray(await self.embed_query_async(query), dtype=np.float32)
+        else:
+            raise ValueError("search_async needs a query or a query_vector")
         self._check_dimension(query_embedding)
 
+        cache_scope = None
+        if settings.retrieval_cache_similarity > 0 and caching_enabled():
+            cache_scope = json.dumps(
+                [tenant, top_k, score_threshold, filters], sort_keys=True, default=str
+            )
+            cached = self._retrieval_cache.get(
+                cache_scope, query_embedding, settings.retrieval_cache_similarity
+            )
+            if cached is not None:
+                return cached
+
         # Build filter conditions: tenant isolation is always applied
         conditions = [self._tenant_condition(tenant)]
         if filters:
@@ -348,6 +560,7 @@ class QdrantVectorStore:
                 limit=top_k,
                 score_threshold=score_threshold,
                 query_filter=qdrant_filter,
+                search_params=self._search_params,
             )
             points = results.points
         except Exception as e:
@@ -357,14 +570,19 @@ class QdrantVectorStore:
         # Convert to RetrievalResult objects
         retrieval_results = []
         for hit in points:
+            # Each hit's payload is a fresh dict: taking the content out of
+            # it leaves the metadata without copying every other field
+            metadata = hit.payload
             result = RetrievalResult(
-                content=hit.payload.get("content", ""),
+                content=metadata.pop("content", ""),
                 score=hit.score,
-                metadata={k: v for k, v in hit.payload.items() if k != "content"},
-                chunk_id=hit.payload.get("chunk_id", ""),
+                metadata=metadata,
+                chunk_id=metadata.get("chunk_id", ""),
             )
             retrieval_results.append(result)
-        
+
+        if cache_scope is not None:
+            self._retrieval_cache.put(cache_scope, query_embedding, retrieval_results)
         return retrieval_results
     
     def delete_by_source(self, source_document: str, tenant: Optional[str] = None) -> bool:
@@ -484,6 +702,7 @@ class QdrantVectorStore:
             self.client.delete_collection(self.collection_name)
             logger.info(f"Deleted collection: {self.collection_name}")
             self._ensure_collection()
+            _verified_collections[(self.host, self.port, self.collection_name)] = self._collection_dim
             clear_cache()
             return True
         except Exception as e:
@@ -533,17 +752,22 @@ def build_context_from_results(
     current_length = 0
     max_chars = max_tokens * 4  # Rough token-to-char conversion
     
-    for i, result in enumerate(results):
+    for result in results:
+        # Measured before formatting, so the result that ends the context
+        # is never built. "[Source: " + "]\n" + "\n" = 12 chars around them
         if include_metadata:
-            source = result.metadata.get("source_document", "Unknown")
-            part = f"[Source: {source}]\n{result.content}\n"
+            source = str(result.metadata.get("source_document", "Unknown"))
+            size = len(source) + len(result.content) + 12
         else:
-            part = f"{result.content}\n"
-        
-        if current_length + len(part) > max_chars:
+            size = len(result.content) + 1
+
+        if current_length + size > max_chars:
             break
-            
-        context_parts.append(part)
-        current_length += len(part)
+
+        if include_metadata:
+            context_parts.append(f"[Source: {source}]\n{result.content}\n")
+        else:
+            context_parts.append(f"{result.content}\n")
+        current_length += size
     
     return "\n---\n".join(context_parts)
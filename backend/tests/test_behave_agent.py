@@ -0,0 +1,710 @@
+"""
+Tests for the BehaveAgent.
+
+The agent turns a compact behavior summary into insights and profile
+updates with one LLM call per session. These tests pin the contract
+around that call: what reaches the model, how many calls a workload
+costs, and that a bad answer degrades to the empty result instead of
+failing the caller.
+
+Runnable with `python3 -m unittest discover -s tests` from backend/.
+The agent tests need the app deps (backend venv); they skip in the
+pure-stdlib shell interpreter.
+"""
+
+import asyncio
+import json
+import os
+import unittest
+from unittest import mock
+
+from llm.base import LLMChatClient
+
+try:  # app-level deps: available in the backend venv, not in the shell python
+    from agents.behave_agent import BehaveAgent
+    from config import settings
+    HAVE_APP_DEPS = True
+except ImportError:
+    HAVE_APP_DEPS = False
+
+
+VALID_PAYLOAD = {
+    "insights": [],
+    "profile_updates": [],
+    "engagement_score": 0.7,
+    "user_type": "focused",
+    "session_summary": "s",
+    "recommended_ui_adjustments": [],
+}
+
+
+class ConcurrencyLLM(LLMChatClient):
+    """Records calls and the peak number of calls in flight."""
+
+    def __init__(self, payload=None, fail_on=None):
+        self.payload = json.dumps(payload or VALID_PAYLOAD)
+        self.fail_on = fail_on
+        self.calls = []
+        self.in_flight = 0
+        self.peak = 0
+
+    async def complete_json(self, system, user, json_schema=None):
+        self.calls.append({"system": system, "user": user})
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            if self.fail_on and self.fail_on in user:
+                raise RuntimeError("provider down")
+            return self.payload
+        finally:
+            self.in_flight -= 1
+
+    async def stream_json(self, system, user):
+        yield self.payload
+
+
+TOP_LEVEL_FIELDS = tuple(VALID_PAYLOAD)
+
+
+def _session(i):
+    # Enough signal to need the model (the heuristic short-circuit stays off)
+    return {"duration": 60_000 + 1000 * i, "clickCount": 10 + i, "maxScrollDepth": 60}
+
+
+@unittest.skipUnless(HAVE_APP_DEPS, "requires backend venv (rag/config deps)")
+class BatchAnalysisTest(unittest.TestCase):
+    """analyze_behavior_batch_async: overlapped, bounded, ordered."""
+
+    def setUp(self):
+        # Each test counts real calls: no hits from the process-wide cache.
+        self._saved = settings.max_concurrent_llm
+        self._env = os.environ.get("DISABLE_CACHE")
+        os.environ["DISABLE_CACHE"] = "true"
+
+    def tearDown(self):
+        settings.max_concurrent_llm = self._saved
+        if self._env is None:
+            os.environ.pop("DISABLE_CACHE", None)
+        else:
+            os.environ["DISABLE_CACHE"] = self._env
+
+    def test_calls_overlap_up_to_the_cap(self):
+        settings.max_concurrent_llm = 3
+        llm = ConcurrencyLLM()
+        agent = BehaveAgent(llm_client=llm)
+
+        results = asyncio.run(agent.analyze_behavior_batch_async(
+            [_session(i) for i in range(7)]
+        ))
+
+        self.assertEqual(len(results), 7)
+        self.assertEqual(len(llm.calls), 7)
+        self.assertEqual(llm.peak, 3)
+        self.assertTrue(all(r.user_type == "focused" for r in results))
+
+    def test_failed_item_does_not_fail_the_batch(self):
+        llm = ConcurrencyLLM(fail_on="Total Clicks: 11\n")
+        agent = BehaveAgent(llm_client=llm)
+
+        results = asyncio.run(agent.analyze_behavior_batch_async(
+            [_session(0), _session(1), _session(2)]
+        ))
+
+        self.assertEqual([r.user_type for r in results], ["focused", "casual", "focused"])
+
+    def test_empty_batch_makes_no_calls(self):
+        llm = ConcurrencyLLM()
+        agent = BehaveAgent(llm_client=llm)
+
+        self.assertEqual(asyncio.run(agent.analyze_behavior_batch_async([])), [])
+        self.assertEqual(llm.calls, [])
+
+    def test_profiles_must_align_with_items(self):
+        llm = ConcurrencyLLM()
+        agent = BehaveAgent(llm_client=llm)
+
+        for profiles in ([{"role": "dev"}], [None, None, None], []):
+            with self.subTest(profiles=profiles), self.assertRaises(ValueError):
+                asyncio.run(agent.analyze_behavior_batch_async(
+                    [_session(0), _session(1)], profiles
+                ))
+        self.assertEqual(llm.calls, [])
+
+    def test_sync_wrapper_refuses_inside_a_running_loop(self):
+        agent = BehaveAgent(llm_client=ConcurrencyLLM())
+
+        async def call_sync():
+            agent.analyze_behavior(_session(0))
+
+        with self.assertRaises(RuntimeError), self.assertWarns(DeprecationWarning):
+            asyncio.run(call_sync())
+
+    def test_sync_wrapper_still_works_without_a_loop(self):
+        agent = BehaveAgent(llm_client=ConcurrencyLLM())
+
+        with self.assertWarns(DeprecationWarning):
+            result = agent.analyze_behavior(_session(4))
+        self.assertEqual(result.user_type, "focused")
+
+
+
+class ScriptedLLM(LLMChatClient):
+    """Returns one scripted response per call, recording the prompts."""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    async def complete_json(self, system, user, json_schema=None):
+        self.calls.append({"system": system, "user": user, "json_schema": json_schema})
+        return self.responses.pop(0)
+
+    async def stream_json(self, system, user):
+        yield self.responses.pop(0)
+
+
+def _openai_client_over(http_client, sdk):
+    """An OpenAIChatClient built on a given pool, with its SDK replaced."""
+    from llm.openai_client import OpenAIChatClient
+
+    client = OpenAIChatClient(api_key="sk-test", model="m", http_client=http_client)
+    client._client = sdk
+    return client
+
+
+def _row(n, user_type):
+    return dict(VALID_PAYLOAD, row=n, user_type=user_type)
+
+
+@unittest.skipUnless(HAVE_APP_DEPS, "requires backend venv (rag/config deps)")
+class MarshalledAnalysisTest(unittest.TestCase):
+    """analyze_behavior_marshalled: N rows per call, fanned back out in order."""
+
+    def test_one_call_per_batch(self):
+        llm = ScriptedLLM([
+            json.dumps({"results": [_row(0, "explorer"), _row(1, "scanner")]}),
+            json.dumps({"results": [_row(0, "deep_reader")]}),
+        ])
+        agent = BehaveAgent(llm_client=llm)
+
+        results = asyncio.run(agent.analyze_behavior_marshalled(
+            [_session(0), _session(1), _session(2)], batch_size=2
+        ))
+
+        self.assertEqual(len(llm.calls), 2)
+        self.assertEqual([r.user_type for r in results], ["explorer", "scanner", "deep_reader"])
+        self.assertIn('<row id="1">', llm.calls[0]["user"])
+        self.assertIn("Batch mode", llm.calls[0]["system"])
+
+    def test_rows_placed_by_index_and_missing_rows_empty(self):
+        llm = ScriptedLLM([json.dumps({"results": [_row(2, "focused"), _row(0, "scanner")]})])
+        agent = BehaveAgent(llm_client=llm)
+
+        results = asyncio.run(agent.analyze_behavior_marshalled(
+            [_session(0), _session(1), _session(2)]
+        ))
+
+        self.assertEqual([r.user_type for r in results], ["scanner", "casual", "focused"])
+        self.assertIn("Insufficient", results[1].session_summary)
+
+    def test_unparseable_batch_degrades_to_empty_results(self):
+        llm = ScriptedLLM(["not json"])
+        agent = BehaveAgent(llm_client=llm)
+
+        results = asyncio.run(agent.analyze_behavior_marshalled([_session(0), _session(1)]))
+
+        self.assertEqual([r.user_type for r in results], ["casual", "casual"])
+
+    def test_garbled_row_empties_only_itself(self):
+        garbled = dict(_row(1, "explorer"), insights=["not an object"])
+        llm = ScriptedLLM([json.dumps({"results": [_row(0, "scanner"), garbled, _row(2, "focused")]})])
+        agent = BehaveAgent(llm_client=llm)
+
+        results = asyncio.run(agent.analyze_behavior_marshalled(
+            [_session(0), _session(1), _session(2)]
+        ))
+
+        self.assertEqual([r.user_type for r in results], ["scanner", "casual", "focused"])
+        self.assertEqual(results[1].insights, [])
+
+
+
+@unittest.skipUnless(HAVE_APP_DEPS, "requires backend venv (rag/config deps)")
+class SharedClientTest(unittest.TestCase):
+    """Agents built by the factory share one client (one warm HTTP pool)."""
+
+    def test_same_model_same_client(self):
+        from agents import behave_agent
+
+        # No real SDK client (and no API key needed): only the caching is under test
+        behave_agent._shared_llm_client.cache_clear()
+        self.addCleanup(behave_agent._shared_llm_client.cache_clear)
+        with mock.patch.object(
+            behave_agent, "create_llm_client", side_effect=lambda model: ScriptedLLM([])
+        ):
+            first = behave_agent.create_behave_agent(model="gpt-shared-test")
+            second = behave_agent.create_behave_agent(model="gpt-shared-test")
+            other = behave_agent.create_behave_agent(model="gpt-other-test")
+
+        self.assertIs(first.llm, second.llm)
+        self.assertIsNot(first.llm, other.llm)
+
+    def test_injected_client_wins(self):
+        llm = ScriptedLLM([])
+        self.assertIs(BehaveAgent(llm_client=llm).llm, llm)
+
+    def test_context_manager_closes_the_client(self):
+        class ClosingLLM(ScriptedLLM):
+            closed = 0
+
+            async def aclose(self):
+                self.closed += 1
+
+        llm = ClosingLLM([])
+
+        async def use():
+            async with BehaveAgent(llm_client=llm) as agent:
+                self.assertIs(agent.llm, llm)
+            self.assertEqual(llm.closed, 1)
+
+        asyncio.run(use())
+
+    def test_shared_pool_survives_an_agent_closing(self):
+        from llm.http import shared_http_client
+
+        class FakeSDK:
+            closed = False
+
+            async def close(self):
+                FakeSDK.closed = True
+
+        agent = BehaveAgent(llm_client=ScriptedLLM([]))
+        agent.llm = _openai_client_over(shared_http_client(), FakeSDK())
+        asyncio.run(agent.aclose())
+
+        self.assertFalse(FakeSDK.closed)
+        self.assertFalse(shared_http_client().is_closed)
+
+
+
+@unittest.skipUnless(HAVE_APP_DEPS, "requires backend venv (rag/config deps)")
+class QuickAnalyzeTest(unittest.TestCase):
+    """The heuristic fast path: no LLM, same answers as the rules say."""
+
+    def setUp(self):
+        self.agent = BehaveAgent(llm_client=ScriptedLLM([]))
+
+    def test_user_types(self):
+        cases = [
+            ({"pagesVisited": 6, "clickCount": 11}, "explorer"),
+            ({"maxScrollDepth": 90, "duration": 61000}, "deep_reader"),
+            ({"clickCount": 16, "duration": 30000}, "scanner"),
+            ({"pagesVisited": 1, "maxScrollDepth": 60, "duration": 10000}, "focused"),
+            ({"duration": 10000}, "casual"),
+        ]
+        for data, expected in cases:
+            with self.subTest(expected=expected):
+                self.assertEqual(self.agent.quick_analyze(data)["user_type"], expected)
+
+    def test_engagement_is_capped_sum_of_signals(self):
+        result = self.agent.quick_analyze({
+            "duration": 200000, "clickCount": 6, "maxScrollDepth": 60, "pagesVisited": 3,
+        })
+        self.assertAlmostEqual(result["engagement_score"], 1.0)
+        self.assertEqual(result["metrics"]["duration_seconds"], 200.0)
+
+    def test_attention_pattern_and_empty_input(self):
+        result = self.agent.quick_analyze({"heatmapZones": [{"zone": "middle-left"}]})
+        self.assertEqual(result["attention_pattern"], "center-focused")
+        self.assertEqual(
+            self.agent.quick_analyze({}),
+            {"engagement_score": 0.5, "user_type": "casual"},
+        )
+
+
+
+@unittest.skipUnless(HAVE_APP_DEPS, "requires backend venv (rag/config deps)")
+class FingerprintCacheTest(unittest.TestCase):
+    """Analyses are cached by what the prompt depends on, successes only."""
+
+    def setUp(self):
+        from utils.cache import clear_cache
+
+        self._env = os.environ.pop("DISABLE_CACHE", None)
+        clear_cache()
+        self.addCleanup(clear_cache)
+
+    def tearDown(self):
+        if self._env is not None:
+            os.environ["DISABLE_CACHE"] = self._env
+
+    def test_volatile_detail_hits_the_cache(self):
+        llm = ScriptedLLM([json.dumps(VALID_PAYLOAD)])
+        agent = BehaveAgent(llm_client=llm)
+
+        first = asyncio.run(agent.analyze_behavior_async(
+            {"duration": 61_200, "clickCount": 7, "maxScrollDepth": 71, "navigationPath": ["/a"]}
+        ))
+        second = asyncio.run(agent.analyze_behavior_async(
+            {"duration": 64_900, "clickCount": 8, "maxScrollDepth": 74, "navigationPath": ["/a"]}
+        ))
+
+        self.assertEqual(len(llm.calls), 1)
+        self.assertIs(first, second)
+
+    def test_what_the_prompt_shows_misses_the_cache(self):
+        llm = ScriptedLLM([json.dumps(VALID_PAYLOAD)] * 3)
+        agent = BehaveAgent(llm_client=llm)
+        base = {"duration": 61_000, "clickCount": 7, "navigationPath": ["/a"]}
+
+        asyncio.run(agent.analyze_behavior_async(base))
+        asyncio.run(agent.analyze_behavior_async(dict(base, navigationPath=["/b"])))
+        asyncio.run(agent.analyze_behavior_async(base, {"preferences": {"tone": "brief"}}))
+
+        self.assertEqual(len(llm.calls), 3)
+
+    def test_failures_are_not_cached(self):
+        llm = ScriptedLLM(["not json", json.dumps(VALID_PAYLOAD)])
+        agent = BehaveAgent(llm_client=llm)
+        data = {"duration": 61_000, "clickCount": 7}
+
+        failed = asyncio.run(agent.analyze_behavior_async(data))
+        retried = asyncio.run(agent.analyze_behavior_async(data))
+
+        self.assertEqual(failed.user_type, "casual")
+        self.assertEqual(retried.user_type, "focused")
+        self.assertEqual(len(llm.calls), 2)
+
+    def test_entries_follow_the_client_model_not_the_instance(self):
+        data = {"duration": 61_000, "clickCount": 7}
+        clients = [ScriptedLLM([json.dumps(VALID_PAYLOAD)]) for _ in range(3)]
+        for llm, model in zip(clients, ("m-1", "m-1", "m-2")):
+            llm.model = model
+            asyncio.run(BehaveAgent(llm_client=llm).analyze_behavior_async(data))
+
+        self.assertEqual([len(llm.calls) for llm in clients], [1, 0, 1])
+
+
+
+@unittest.skipUnless(HAVE_APP_DEPS, "requires backend venv (rag/config deps)")
+class PromptFormatTest(unittest.TestCase):
+    """The behavior block the model reads, line for line."""
+
+    def test_full_summary(self):
+        agent = BehaveAgent(llm_client=ScriptedLLM([]))
+        text = agent._format_behavior_data({
+            "duration": 61234,
+            "clickCount": 3,
+            "maxScrollDepth": 40,
+            "pagesVisited": 2,
+            "heatmapZones": [{"zone": "top-left", "count": 3}] * 6,
+            "navigationPath": ["/a", "/b"],
+            "recentClicks": [{"target": "button", "targetId": "buy"}, {"target": "a"}],
+            "recentInteractions": [{"interactionType": "hover", "elementType": "card"}],
+        })
+        self.assertEqual(text.split("\n"), [
+            "Session Duration: 61.2 seconds",
+            "Total Clicks: 3",
+            "Max Scroll Depth: 40%",
+            "Pages Visited: 2",
+            "",
+            "Click Heatmap Distribution:",
+            *["  - top-left: 3 clicks"] * 5,
+            "",
+            "Navigation Path: /a → /b",
+            "",
+            "Recent Click Targets:",
+            "  - button#buy",
+            "  - a",
+            "",
+            "Element Interactions:",
+            "  - hover on card (no-id)",
+        ])
+
+    def test_empty_summary_has_only_the_counters(self):
+        agent = BehaveAgent(llm_client=ScriptedLLM([]))
+        self.assertEqual(len(agent._format_behavior_data({}).split("\n")), 4)
+
+    def test_identical_projection_is_formatted_once(self):
+        from agents.behave_agent import _format_behavior_block
+
+        agent = BehaveAgent(llm_client=ScriptedLLM([]))
+        data = {"duration": 4321, "navigationPath": ["/memo-a", "/memo-b"]}
+        agent._format_behavior_data(data)
+        before = _format_behavior_block.cache_info()
+
+        # Fields the block does not show do not change the projection
+        again = agent._format_behavior_data(dict(data, sessionId="other"))
+
+        after = _format_behavior_block.cache_info()
+        self.assertEqual(after.hits, before.hits + 1)
+        self.assertEqual(after.misses, before.misses)
+        self.assertIn("/memo-a → /memo-b", again)
+
+    def test_unhashable_values_are_formatted_uncached(self):
+        agent = BehaveAgent(llm_client=ScriptedLLM([]))
+        text = agent._format_behavior_data({"heatmapZones": [{"zone": "top", "count": [2]}]})
+        self.assertIn("  - top: [2] clicks", text)
+
+
+
+class ChunkedLLM(LLMChatClient):
+    """Streams a payload in fixed-size chunks."""
+
+    def __init__(self, payload, size=7):
+        self.payload = payload
+        self.size = size
+
+    async def complete_json(self, system, user, json_schema=None):
+        return self.payload
+
+    async def stream_json(self, system, user):
+        for i in range(0, len(self.payload), self.size):
+            yield self.payload[i:i + self.size]
+
+
+@unittest.skipUnless(HAVE_APP_DEPS, "requires backend venv (rag/config deps)")
+class StreamingAnalysisTest(unittest.TestCase):
+    """analyze_behavior_stream_async: insights arrive before the envelope."""
+
+    def _events(self, llm, data):
+        agent = BehaveAgent(llm_client=llm)
+
+        async def collect():
+            return [e async for e in agent.analyze_behavior_stream_async(data)]
+
+        return asyncio.run(collect())
+
+    def test_insights_then_complete(self):
+        payload = json.dumps(dict(
+            VALID_PAYLOAD,
+            insights=[
+                {"category": "pace_preference", "key": "pace", "value": "slow",
+                 "confidence": 0.8, "evidence": "long dwell {on} pages"},
+                {"category": "content_interest", "key": "x", "value": 1,
+                 "confidence": 0.2, "evidence": "weak"},
+            ],
+        ))
+        events = self._events(ChunkedLLM(payload), _session(3))
+
+        self.assertEqual([e["type"] for e in events], ["insight", "complete"])
+        self.assertEqual(events[0]["insight"].value, "slow")
+        result = events[-1]["result"]
+        self.assertEqual(result.user_type, "focused")
+        self.assertEqual(result.insights, [events[0]["insight"]])
+
+    def test_failure_is_one_complete_event(self):
+        class Broken(ChunkedLLM):
+            async def stream_json(self, system, user):
+                yield "{"
+                raise RuntimeError("connection reset")
+
+        events = self._events(Broken(""), _session(3))
+
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0]["result"].user_type, "casual")
+
+    def test_unparseable_reply_completes_with_the_empty_result(self):
+        truncated = (
+            '{"insights": [{"category": "pace_preference", "key": "pace", '
+            '"value": "slow", "confidence": 0.8, "evidence": "e"}], "user_type": "foc'
+        )
+        for payload in ("not json", truncated):
+            with self.subTest(payload=payload):
+                events = self._events(ChunkedLLM(payload), _session(3))
+
+                result = events[-1]["result"]
+                self.assertEqual(events[-1]["type"], "complete")
+                self.assertEqual(
+                    result, BehaveAgent(llm_client=ChunkedLLM(""))._empty_result()
+                )
+
+
+
+@unittest.skipUnless(HAVE_APP_DEPS, "requires backend venv (rag/config deps)")
+class StructuredOutputTest(unittest.TestCase):
+    """The analysis asks the provider for schema-constrained output."""
+
+    def setUp(self):
+        self._env = os.environ.get("DISABLE_CACHE")
+        os.environ["DISABLE_CACHE"] = "true"
+
+    def tearDown(self):
+        if self._env is None:
+            os.environ.pop("DISABLE_CACHE", None)
+        else:
+            os.environ["DISABLE_CACHE"] = self._env
+
+    def test_schema_sent_and_matches_the_result_shape(self):
+        import jsonschema
+        from agents.behave_agent import BEHAVIOR_OUTPUT_SCHEMA, MARSHALLED_OUTPUT_SCHEMA
+
+        llm = ScriptedLLM([
+            json.dumps(VALID_PAYLOAD),
+            json.dumps({"results": [_row(0, "scanner")]}),
+        ])
+        agent = BehaveAgent(llm_client=llm)
+        asyncio.run(agent.analyze_behavior_async(_session(2)))
+        asyncio.run(agent.analyze_behavior_marshalled([_session(2)]))
+
+        self.assertIs(llm.calls[0]["json_schema"], BEHAVIOR_OUTPUT_SCHEMA)
+        self.assertIs(llm.calls[1]["json_schema"], MARSHALLED_OUTPUT_SCHEMA)
+        jsonschema.validate(VALID_PAYLOAD, BEHAVIOR_OUTPUT_SCHEMA)
+        jsonschema.validate({"results": [_row(0, "scanner")]}, MARSHALLED_OUTPUT_SCHEMA)
+        with self.assertRaises(jsonschema.ValidationError):
+            jsonschema.validate(dict(VALID_PAYLOAD, user_type="lurker"), BEHAVIOR_OUTPUT_SCHEMA)
+
+    def test_prompt_still_names_the_vocabulary(self):
+        """Providers that ignore the schema still learn every allowed value."""
+        from agents.behave_agent import INSIGHT_CATEGORIES, UI_ADJUSTMENT_TYPES, USER_TYPES
+
+        for term in (*USER_TYPES, *INSIGHT_CATEGORIES, *UI_ADJUSTMENT_TYPES):
+            with self.subTest(term=term):
+                self.assertIn(term, BehaveAgent.SYSTEM_PROMPT)
+        for field in TOP_LEVEL_FIELDS:
+            with self.subTest(field=field):
+                self.assertIn(field, BehaveAgent.SYSTEM_PROMPT)
+
+
+
+@unittest.skipUnless(HAVE_APP_DEPS, "requires backend venv (rag/config deps)")
+class HeuristicShortCircuitTest(unittest.TestCase):
+    """Thin sessions are answered by quick_analyze, without a model call."""
+
+    THIN = {"duration": 12_000, "clickCount": 1, "maxScrollDepth": 20}
+
+    def test_thin_session_skips_the_llm(self):
+        llm = ScriptedLLM([])
+        agent = BehaveAgent(llm_client=llm)
+
+        result = asyncio.run(agent.analyze_behavior_async(self.THIN))
+
+        self.assertEqual(llm.calls, [])
+        self.assertFalse(agent.needs_llm(self.THIN))
+        self.assertIn("Heuristic", result.session_summary)
+        self.assertEqual(result.user_type, agent.quick_analyze(self.THIN)["user_type"])
+
+    def test_force_llm_bypasses_the_heuristic(self):
+        llm = ScriptedLLM([json.dumps(VALID_PAYLOAD)])
+        agent = BehaveAgent(llm_client=llm)
+
+        result = asyncio.run(agent.analyze_behavior_async(self.THIN, force_llm=True))
+
+        self.assertEqual(len(llm.calls), 1)
+        self.assertEqual(result.user_type, "focused")
+
+    def test_rich_session_needs_the_llm(self):
+        agent = BehaveAgent(llm_client=ScriptedLLM([]))
+        self.assertTrue(agent.needs_llm(_session(0)))
+        self.assertFalse(agent.needs_llm({}))
+
+
+
+@unittest.skipUnless(HAVE_APP_DEPS, "requires backend venv (rag/config deps)")
+class ResultModelTest(unittest.TestCase):
+    """Insights and results are slotted: no per-instance __dict__."""
+
+    def test_from_dict_defaults_and_slots(self):
+        from agents.behave_agent import BehaviorInsight
+
+        insight = BehaviorInsight.from_dict({"key": "pace", "confidence": 0.9})
+
+        self.assertEqual(
+            (insight.category, insight.key, insight.value, insight.evidence),
+            ("unknown", "pace", None, ""),
+        )
+        self.assertFalse(hasattr(insight, "__dict__"))
+        agent = BehaveAgent(llm_client=ScriptedLLM([]))
+        self.assertFalse(hasattr(agent._empty_result(), "__dict__"))
+
+    def test_to_dict_round_trip(self):
+        agent = BehaveAgent(llm_client=ScriptedLLM([]))
+        payload = dict(VALID_PAYLOAD, insights=[
+            {"category": "pace_preference", "key": "k", "value": [1], "confidence": 0.7,
+             "evidence": "e"},
+        ])
+        self.assertEqual(agent._build_result(payload).to_dict(), payload)
+
+    def test_reply_shapes_parse_alike(self):
+        from types import SimpleNamespace
+
+        agent = BehaveAgent(llm_client=ScriptedLLM([]))
+        text = json.dumps(VALID_PAYLOAD)
+        shapes = [
+            text,
+            text.encode(),
+            [{"type": "text", "text": text[:10]}, SimpleNamespace(text=text[10:])],
+            SimpleNamespace(content=[SimpleNamespace(text=text)]),
+            VALID_PAYLOAD,
+        ]
+        for shape in shapes:
+            with self.subTest(shape=type(shape).__name__):
+                self.assertEqual(agent._parse_response(shape), VALID_PAYLOAD)
+        self.assertEqual(agent._parse_response([VALID_PAYLOAD]), {})
+
+    def test_unknown_values_are_normalized(self):
+        agent = BehaveAgent(llm_client=ScriptedLLM([]))
+        result = agent._build_result(dict(VALID_PAYLOAD, user_type="lurker", insights=[
+            {"category": "vibes", "key": "k", "confidence": 0.9},
+            {"category": "pace_preference", "key": "slow", "confidence": 0.9},
+            {"category": "pace_preference", "key": "weak", "confidence": 0.4},
+        ]))
+
+        self.assertEqual(result.user_type, "casual")
+        self.assertEqual([i.key for i in result.insights], ["slow"])
+
+    def test_weak_profile_updates_are_dropped_once_here(self):
+        agent = BehaveAgent(llm_client=ScriptedLLM([]))
+        result = agent._build_result(dict(VALID_PAYLOAD, profile_updates=[
+            {"field": "behavior.pace", "value": "fast", "confidence": 0.8},
+            {"field": "behavior.density", "value": "low", "confidence": 0.3},
+            {"field": "behavior.layout", "value": "grid"},
+            "behavior.noise",
+        ]))
+
+        self.assertEqual(
+            [u["field"] for u in result.profile_updates],
+            ["behavior.pace", "behavior.layout"],
+        )
+
+
+@unittest.skipUnless(HAVE_APP_DEPS, "requires backend venv (rag/config deps)")
+class QuickAnalyzeBatchTest(unittest.TestCase):
+    """The vectorized heuristic agrees with the scalar one, session by session."""
+
+    def test_matches_quick_analyze(self):
+        import itertools
+        from agents.behave_agent import quick_analyze_batch
+
+        agent = BehaveAgent(llm_client=ScriptedLLM([]))
+        grid = itertools.product(
+            (0, 31_000, 59_000, 61_000, 121_000),  # duration ms
+            (0, 6, 11, 16),                         # clicks
+            (0, 51, 81),                            # scroll depth
+            (0, 2, 3, 6),                           # pages
+        )
+        sessions = [
+            {"duration": d, "clickCount": c, "maxScrollDepth": s, "pagesVisited": p}
+            for d, c, s, p in grid
+        ]
+
+        batch = quick_analyze_batch(sessions)
+
+        self.assertEqual(len(batch), len(sessions))
+        for record, session in zip(batch, sessions):
+            expected = agent.quick_analyze(session)
+            self.assertEqual(record["user_type"], expected["user_type"])
+            self.assertEqual(float(record["engagement_score"]), expected["engagement_score"])
+            self.assertEqual(float(record["click_count"]), expected["metrics"]["click_count"])
+
+    def test_empty_input(self):
+        from agents.behave_agent import quick_analyze_batch
+
+        self.assertEqual(len(quick_analyze_batch([])), 0)
+        self.assertEqual(quick_analyze_batch([{}])["user_type"][0], "casual")
+
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,174 @@
+"""
+Tests for the in-memory LRU and the key derivation behind @cacheable.
+Runnable with pytest or `python3 -m unittest discover -s tests` from backend/.
+"""
+
+import asyncio
+import sys
+import unittest
+from dataclasses import dataclass
+from unittest import mock
+
+from tests.test_redis_reconnect import FakeRedisServer, fake_redis_modules, unique_url
+from utils import cache
+from utils.cache import SimpleMemoryCache, _generate_cache_key, cacheable
+
+
+class TestSimpleMemoryCache(unittest.TestCase):
+    def test_least_recently_used_is_evicted(self):
+        cache = SimpleMemoryCache(max_size=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        self.assertEqual(cache.get("a"), 1)  # "b" is now the oldest
+
+        cache.set("c", 3)
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual((cache.get("a"), cache.get("c")), (1, 3))
+
+    def test_overwrite_refreshes_without_evicting(self):
+        cache = SimpleMemoryCache(max_size=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.set("a", 10)  # "b" is now the oldest
+
+        cache.set("c", 3)
+
+        self.assertEqual(cache.size(), 2)
+        self.assertEqual(cache.get("a"), 10)
+        self.assertIsNone(cache.get("b"))
+
+    def test_ttl_expires_entries(self):
+        cache_ = SimpleMemoryCache()
+        with mock.patch("utils.cache.time.monotonic", return_value=100.0):
+            cache_.set("a", 1, ttl=10)
+            cache_.set("b", 2)
+        with mock.patch("utils.cache.time.monotonic", return_value=110.0):
+            self.assertIsNone(cache_.get("a"))
+            self.assertEqual(cache_.get("b"), 2)
+
+    def test_clear(self):
+        cache = SimpleMemoryCache()
+        cache.set("a", 1)
+        cache.clear()
+        self.assertEqual(cache.size(), 0)
+        self.assertIsNone(cache.get("a"))
+
+
+class TestGenerateCacheKey(unittest.TestCase):
+    def test_parts_cannot_run_together(self):
+        self.assertNotEqual(_generate_cache_key("a|b"), _generate_cache_key("a", "b"))
+        self.assertNotEqual(_generate_cache_key("1:a"), _generate_cache_key("1", "a"))
+        self.assertNotEqual(_generate_cache_key(1), _generate_cache_key(x=1))
+
+    def test_kwargs_order_does_not_matter(self):
+        self.assertEqual(
+            _generate_cache_key("q", top_k=5, tenant="t"),
+            _generate_cache_key("q", tenant="t", top_k=5),
+        )
+
+    def test_vectors_are_keyed_by_value(self):
+        vector = [0.1 * i for i in range(1536)]
+        changed = list(vector)
+        changed[700] += 1e-9
+
+        self.assertEqual(_generate_cache_key(vector), _generate_cache_key(list(vector)))
+        self.assertNotEqual(_generate_cache_key(vector), _generate_cache_key(changed))
+        self.assertNotEqual(
+            _generate_cache_key([0.5, 0.25]), _generate_cache_key("[0.5, 0.25]")
+        )
+
+    def test_canonical_across_dict_order_and_types(self):
+        self.assertEqual(
+            _generate_cache_key({"a": 1, "b": [1, 2]}),
+            _generate_cache_key({"b": [1, 2], "a": 1}),
+        )
+        self.assertEqual(_generate_cache_key({3, 1, 2}), _generate_cache_key({2, 3, 1}))
+        keys = {_generate_cache_key(v) for v in ("1", 1, 1.0, True, None, "None")}
+        self.assertEqual(len(keys), 6)
+
+    def test_objects_key_by_content_not_address(self):
+        @dataclass
+        class Query:
+            text: str
+
+        class Store:
+            def __init__(self, collection):
+                self.collection = collection
+
+            def __cache_key__(self):
+                return ("localhost", self.collection)
+
+        self.assertEqual(_generate_cache_key(Query("x")), _generate_cache_key(Query("x")))
+        self.assertEqual(_generate_cache_key(Store("docs")), _generate_cache_key(Store("docs")))
+        self.assertNotEqual(_generate_cache_key(Store("docs")), _generate_cache_key(Store("faq")))
+        with self.assertRaises(TypeError):
+            _generate_cache_key(object())
+
+
+class TestCacheable(unittest.TestCase):
+    def setUp(self):
+        cache.clear_cache()
+        self.addCleanup(cache.clear_cache)
+
+    def test_disabled_decorator_returns_the_function(self):
+        def double(x):
+            return 2 * x
+
+        self.assertIs(cacheable(enabled=False)(double), double)
+
+    def test_disable_cache_is_read_per_call(self):
+        calls = []
+
+        @cacheable()
+        def double(x):
+            calls.append(x)
+            return 2 * x
+
+        double(1)
+        with mock.patch.dict("os.environ", {"DISABLE_CACHE": "true"}):
+            double(1)
+        double(1)
+        self.assertEqual(calls, [1, 1])
+
+
+class TestSharedCache(unittest.TestCase):
+    """Results marked shared=True are reused by every worker through Redis."""
+
+    def setUp(self):
+        self.server = FakeRedisServer()
+        patcher = mock.patch.dict(sys.modules, fake_redis_modules(self.server))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        cache.use_shared_cache(unique_url())
+        self.addCleanup(cache.use_shared_cache, None)
+        cache.clear_cache()
+        self.addCleanup(cache.clear_cache)
+        self.calls = []
+
+        @cacheable(ttl=60, shared=True)
+        async def embed(text):
+            self.calls.append(text)
+            return [0.5, 0.25]
+
+        self.embed = embed
+
+    def test_another_worker_reuses_the_result(self):
+        self.assertEqual(asyncio.run(self.embed("hi")), [0.5, 0.25])
+        cache.clear_cache()  # what a second worker starts with
+
+        self.assertEqual(asyncio.run(self.embed("hi")), [0.5, 0.25])
+        self.assertEqual(self.calls, ["hi"])
+        self.assertEqual(len(self.server.data), 1)
+
+    def test_redis_outage_falls_back_to_the_process(self):
+        self.server.up = False
+
+        self.assertEqual(asyncio.run(self.embed("hi")), [0.5, 0.25])
+        self.assertEqual(asyncio.run(self.embed("hi")), [0.5, 0.25])
+        self.assertEqual(self.calls, ["hi"])
+        self.assertEqual(self.server.data, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,175 @@
+"""
+Tests for the CombinedAnalysisAgent.
+
+With settings.combined_analysis on, a chat turn that needs both the
+profile and the behavior analysis asks the model once for the two. These
+tests pin when that happens, that the answer is split back into the
+two agents' own result types, and that a bad answer degrades each half
+the way the separate calls do.
+
+Runnable with `python3 -m unittest discover -s tests` from backend/.
+The agent tests need the app deps (backend venv); they skip in the
+pure-stdlib shell interpreter.
+"""
+
+import asyncio
+import json
+import unittest
+
+from llm.base import LLMChatClient
+
+try:  # app-level deps: available in the backend venv, not in the shell python
+    from agents.behave_agent import BehaveAgent
+    from agents.combined_agent import COMBINED_OUTPUT_SCHEMA, CombinedAnalysisAgent
+    from agents.profile_agent import ProfileAgent
+    from config import settings
+    HAVE_APP_DEPS = True
+except ImportError:
+    HAVE_APP_DEPS = False
+
+
+RICH_SESSION = {"duration": 90_000, "clickCount": 12, "maxScrollDepth": 70, "pagesVisited": 3}
+
+COMBINED_PAYLOAD = {
+    "profile": {
+        "has_profile_info": True,
+        "updates": [{"field": "demographic.role", "value": "developer", "confidence": 0.9}],
+        "interaction_type": "statement",
+        "topics": ["work"],
+        "sentiment": "neutral",
+    },
+    "behavior": {
+        "insights": [],
+        "profile_updates": [{"field": "behavior.pace", "value": "fast", "confidence": 0.8}],
+        "engagement_score": 0.7,
+        "user_type": "focused",
+        "session_summary": "s",
+        "recommended_ui_adjustments": [],
+    },
+}
+
+
+class RecordingLLM(LLMChatClient):
+    def __init__(self, reply):
+        self.reply = reply
+        self.calls = []
+
+    async def complete_json(self, system, user, json_schema=None):
+        self.calls.append({"system": system, "user": user, "json_schema": json_schema})
+        if isinstance(self.reply, Exception):
+            raise self.reply
+        return self.reply
+
+    async def complete_json_with_tools(self, system, user, tools, tool_handler,
+                                       max_tool_rounds=3):
+        raise NotImplementedError
+
+    async def stream_json(self, system, user):
+        yield self.reply
+
+
+def _agent(reply, behave_model=None):
+    llm = RecordingLLM(reply)
+    profile = ProfileAgent(llm_client=llm)
+    behave = BehaveAgent(model=behave_model, llm_client=llm)
+    return CombinedAnalysisAgent(profile, behave), llm
+
+
+@unittest.skipUnless(HAVE_APP_DEPS, "requires backend venv (rag/config deps)")
+class AppliesTest(unittest.TestCase):
+    """One call only when the flag is on and both analyses need the same model."""
+
+    def setUp(self):
+        self._saved = settings.combined_analysis
+        settings.combined_analysis = True
+
+    def tearDown(self):
+        settings.combined_analysis = self._saved
+
+    def test_applies_when_both_need_the_model(self):
+        agent, _ = _agent("{}")
+        self.assertTrue(agent.applies("I work in retail", RICH_SESSION))
+
+    def test_off_by_flag(self):
+        settings.combined_analysis = False
+        agent, _ = _agent("{}")
+        self.assertFalse(agent.applies("I work in retail", RICH_SESSION))
+
+    def test_not_when_either_analysis_is_skipped(self):
+        agent, _ = _agent("{}")
+        self.assertFalse(agent.applies("what is this?", RICH_SESSION))
+        self.assertFalse(agent.applies("I work in retail", {"clickCount": 1}))
+        self.assertFalse(agent.applies("I work in retail", None))
+        self.assertFalse(agent.applies(None, RICH_SESSION))
+
+    def test_not_across_models(self):
+        agent, _ = _agent("{}", behave_model="another-model")
+        self.assertFalse(agent.applies("I work in retail", RICH_SESSION))
+
+
+@unittest.skipUnless(HAVE_APP_DEPS, "requires backend venv (rag/config deps)")
+class AnalyzeTest(unittest.TestCase):
+    """One call in, the two agents' result types out."""
+
+    def test_one_call_split_into_both_results(self):
+        agent, llm = _agent(json.dumps(COMBINED_PAYLOAD))
+
+        profile, behavior = asyncio.run(agent.analyze_async(
+            "I work as a developer", [{"role": "user", "content": "hi"}], RICH_SESSION,
+        ))
+
+        self.assertEqual(len(llm.calls), 1)
+        self.assertIs(llm.calls[0]["json_schema"], COMBINED_OUTPUT_SCHEMA)
+        self.assertIn("<profile_task>", llm.calls[0]["user"])
+        self.assertIn("<behavior_task>", llm.calls[0]["user"])
+        self.assertIn(ProfileAgent.SYSTEM_PROMPT, llm.calls[0]["system"])
+        self.assertIn(BehaveAgent.SYSTEM_PROMPT, llm.calls[0]["system"])
+        self.assertTrue(profile.has_profile_info)
+        self.assertEqual(profile.updates[0].value, "developer")
+        self.assertEqual(behavior.user_type, "focused")
+        self.assertEqual(behavior.profile_updates[0]["field"], "behavior.pace")
+
+    def test_provider_error_degrades_both_halves(self):
+        agent, _ = _agent(RuntimeError("provider down"))
+
+        profile, behavior = asyncio.run(agent.analyze_async("I am a developer", None, RICH_SESSION))
+
+        self.assertFalse(profile.has_profile_info)
+        self.assertEqual(behavior.user_type, "casual")
+        self.assertEqual(behavior.insights, [])
+
+    def test_missing_half_degrades_alone(self):
+        agent, _ = _agent(json.dumps({"profile": COMBINED_PAYLOAD["profile"]}))
+
+        profile, behavior = asyncio.run(agent.analyze_async("I am a developer", None, RICH_SESSION))
+
+        self.assertTrue(profile.has_profile_info)
+        self.assertEqual(behavior.profile_updates, [])
+
+    def test_garbled_half_degrades_alone(self):
+        garbled_behavior = dict(COMBINED_PAYLOAD["behavior"], insights=["not an object"])
+        agent, _ = _agent(json.dumps(dict(COMBINED_PAYLOAD, behavior=garbled_behavior)))
+
+        with self.assertLogs("agents.combined_agent", "WARNING"):
+            profile, behavior = asyncio.run(
+                agent.analyze_async("I am a developer", None, RICH_SESSION)
+            )
+
+        self.assertTrue(profile.has_profile_info)
+        self.assertEqual(behavior.insights, [])
+        self.assertEqual(behavior.profile_updates, [])
+
+        garbled_profile = dict(COMBINED_PAYLOAD["profile"], updates=[{"value": "developer", "confidence": 0.9}])
+        agent, _ = _agent(json.dumps(dict(COMBINED_PAYLOAD, profile=garbled_profile)))
+
+        with self.assertLogs("agents.combined_agent", "WARNING"):
+            profile, behavior = asyncio.run(
+                agent.analyze_async("I am a developer", None, RICH_SESSION)
+            )
+
+        self.assertFalse(profile.has_profile_info)
+        self.assertEqual(behavior.user_type, "focused")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -22,6 +22,7 @@ pure-stdlib shell interpreter.
 """
 
 import asyncio
+import json
 import sys
 import types
 import unittest
@@ -38,6 +39,7 @@ try:  # app-level deps: available in the backend venv, not in the shell python
     import auth.dependencies as auth_deps
     from agents.orchestrator import AgentOrchestrator
     from agents.behave_agent import BehaveAgent
+    from agents.combined_agent import CombinedAnalysisAgent
     from agents.profile_agent import ProfileAgent
     from agents.response_agent import ResponseAgent
     from auth.keys import AuthContext
@@ -49,6 +51,10 @@ except ImportError:
     HAVE_APP_DEPS = False
 
 
+# Behavior data with enough signal for a model call (not the heuristic)
+RICH_SESSION = {"duration": 90_000, "clickCount": 12, "maxScrollDepth": 70, "pagesVisited": 3}
+
+
 def _fake_payload(render_id="r1"):
     return {
         "render_id": render_id,
@@ -149,6 +155,46 @@ class TestProviderTimeout(unittest.TestCase):
             self.assertEqual(FakeOpenAI.last.get("timeout"), 7.0)
 
 
+class TestPromptCacheKey(unittest.TestCase):
+    """Same system prompt -> same prompt_cache_key, on OpenAI itself only."""
+
+    def _client(self, **kwargs):
+        class FakeCompletions:
+            def __init__(self):
+                self.calls = []
+
+            async def create(self, **request):
+                self.calls.append(request)
+                message = types.SimpleNamespace(content="{}", tool_calls=None)
+                return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)])
+
+        class FakeAsyncOpenAI:
+            def __init__(self, **_):
+                self.chat = types.SimpleNamespace(completions=FakeCompletions())
+
+        with _FakeModule("openai", AsyncOpenAI=FakeAsyncOpenAI):
+            from llm.openai_client import OpenAIChatClient
+            client = OpenAIChatClient(api_key="k", model="m", **kwargs)
+        return client, client._client.chat.completions.calls
+
+    def test_key_follows_the_system_prompt(self):
+        client, calls = self._client()
+        asyncio.run(client.complete_json("system A", "q1"))
+        asyncio.run(client.complete_json("system A", "q2"))
+        asyncio.run(client.complete_json_with_tools("system B", "q3", [], None))
+
+        keys = [call["prompt_cache_key"] for call in calls]
+        self.assertEqual(keys[0], keys[1])
+        self.assertNotEqual(keys[0], keys[2])
+
+    def test_not_sent_to_compatible_endpoints(self):
+        for kwargs in ({"base_url": "http://vllm:8000/v1"}, {"provider_name": "gemini"}):
+            with self.subTest(**kwargs):
+                client, calls = self._client(**kwargs)
+                asyncio.run(client.complete_json("system", "q"))
+                self.assertNotIn("prompt_cache_key", calls[0])
+
+
 @unittest.skipUnless(HAVE_APP_DEPS, "requires config (backend venv)")
 class TestFactoryTimeout(unittest.TestCase):
     def test_create_llm_client_passes_settings_timeout(self):
@@ -169,6 +215,35 @@ class TestFactoryTimeout(unittest.TestCase):
         finally:
             settings.llm_timeout_seconds = old
 
+    def test_factory_clients_share_one_http_pool(self):
+        class FakeAsyncOpenAI:
+            seen = []
+
+            def __init__(self, **kwargs):
+                FakeAsyncOpenAI.seen.append(kwargs.get("http_client"))
+
+        with _FakeModule("openai", AsyncOpenAI=FakeAsyncOpenAI):
+            from llm.factory import create_llm_client
+            from llm.http import shared_http_client
+
+            create_llm_client("gpt-a")
+            create_llm_client("gpt-b")
+
+        first, second = FakeAsyncOpenAI.seen
+        self.assertIsNotNone(first)
+        self.assertIs(first, second)
+        self.assertIs(first, shared_http_client())
+
+    def test_shutdown_closes_the_shared_pool(self):
+        from llm.http import close_shared_http_client, shared_http_client
+
+        pool = shared_http_client()
+        asyncio.run(close_shared_http_client())
+
+        self.assertTrue(pool.is_closed)
+        self.assertIsNot(shared_http_client(), pool)  # rebuilt on next use
+        asyncio.run(close_shared_http_client())
+
 
 @unittest.skipUnless(HAVE_APP_DEPS, "requires fastapi (backend venv)")
 class TestZoneCostControls(unittest.TestCase):
@@ -311,6 +386,48 @@ class TestZoneCostControls(unittest.TestCase):
         asyncio.run(zone_router.batch_render_zones(requests, self.ADMIN))
         self.assertNotIn("afp", auth_deps._rate_limiter._memory)
 
+    def test_batch_response_model_keeps_each_item_shape(self):
+        fake_render = zone_router._render_live
+
+        async def render(request, tenant, segment=None):
+            if request.zone_id == "broken":
+                raise RuntimeError("model down")
+            return await fake_render(request, tenant, segment)
+
+        zone_router._render_live = render
+        requests = [self._request("ok"), self._request("broken")]
+        result = asyncio.run(zone_router.batch_render_zones(requests, self.CLIENT))
+
+        encoded = zone_router.ZoneBatchResponse.model_validate(result).model_dump(
+            exclude_unset=True
+        )
+        self.assertEqual(encoded, result)
+        self.assertEqual(set(encoded["results"][1]), {"zone_id", "success", "error"})
+
+    def test_batch_stream_sends_each_zone_when_done(self):
+        async def scenario():
+            await zone_router._handle_render(self._request("cached"), self.CLIENT)
+            response = await zone_router.batch_render_zones_stream(
+                [self._request("cold"), self._request("cached")], self.CLIENT
+            )
+            return [chunk async for chunk in response.body_iterator]
+
+        events = asyncio.run(scenario())
+
+        self.assertEqual([e.split("\n")[0] for e in events],
+                         ["event: zone", "event: zone", "event: complete"])
+        zones = [json.loads(e.split("data: ", 1)[1]) for e in events[:2]]
+        self.assertEqual([z["zone_id"] for z in zones], ["cached", "cold"])
+        self.assertEqual(zones[0]["data"]["meta"]["cache"]["status"], "fresh")
+
+    def test_batch_stream_over_cap_rejected_before_streaming(self):
+        requests = [
+            self._request(f"z{i}") for i in range(settings.zone_batch_max + 1)
+        ]
+        with self.assertRaises(HTTPException) as ctx:
+            asyncio.run(zone_router.batch_render_zones_stream(requests, self.CLIENT))
+        self.assertEqual(ctx.exception.status_code, 413)
+
     # 4. Per-tenant LLM budget
     def test_budget_exhausted_denies_new_generations(self):
         settings.llm_budget_per_hour = 1
@@ -441,6 +558,11 @@ class _FakeOrchestrator:
 
     def __init__(self):
         self.calls = []
+        # planned_generations asks the profile and behave agents whether
+        # they will call the model; the stub never runs them
+        self.profile_agent = ProfileAgent(llm_client=_CountingLLM())
+        self.behave_agent = BehaveAgent(llm_client=_CountingLLM())
+        self.combined_agent = CombinedAnalysisAgent(self.profile_agent, self.behave_agent)
 
     async def process(self, query, user_profile=None, conversation_history=None,
                       behavior_data=None, tenant=None):
@@ -498,7 +620,7 @@ class TestQueryCostControls(unittest.TestCase):
             zone_router._render_live,
         ) = self._saved
 
-    def _query(self, auth, text="what is this?", **kwargs):
+    def _query(self, auth, text="I'm new here, what is this?", **kwargs):
         request = main.QueryRequest(query=text, **kwargs)
         return asyncio.run(main.process_query(request, auth, None))
 
@@ -506,13 +628,32 @@ class TestQueryCostControls(unittest.TestCase):
         return deps.get_llm_budget()._memory.get(tenant, (0, 0))[1]
 
     def test_query_charges_every_generation_not_one(self):
-        """Two agents run on a plain message, three with behavior data."""
+        """Two agents run on a message with a profile cue, three with behavior data."""
         self._query(self.CLIENT)
         self.assertEqual(self._charged(), 2)
 
-        self._query(self.CLIENT, behavior_data={"clicks": 3})
+        self._query(self.CLIENT, behavior_data=RICH_SESSION)
         self.assertEqual(self._charged(), 5)
 
+    def test_plain_question_is_not_charged_a_profile_generation(self):
+        """A short question with no profile cue skips the profile agent."""
+        self._query(self.CLIENT, text="what is this?")
+        self.assertEqual(self._charged(), 1)
+
+    def test_combined_analysis_is_charged_one_generation(self):
+        """Profile + behavior in one call: answer + 1, not answer + 2."""
+        settings.combined_analysis = True
+        try:
+            self._query(self.CLIENT, behavior_data=RICH_SESSION)
+        finally:
+            settings.combined_analysis = False
+        self.assertEqual(self._charged(), 2)
+
+    def test_thin_behavior_data_is_not_charged_a_generation(self):
+        """A session the heuristic answers costs no model call, so no charge."""
+        self._query(self.CLIENT, behavior_data={"clicks": 3})
+        self.assertEqual(self._charged(), 2)
+
     def test_query_over_budget_is_refused_before_spending(self):
         settings.llm_budget_per_hour = 3
 
@@ -598,16 +739,32 @@ class TestPlannedGenerationsMatchesFanout(unittest.TestCase):
             behave_agent=BehaveAgent(llm_client=llm),
         )
         asyncio.run(orchestrator.process(query=query, behavior_data=behavior_data))
-        return llm.calls, orchestrator.planned_generations(behavior_data)
+        return llm.calls, orchestrator.planned_generations(behavior_data, query)
 
     def test_plain_message(self):
         calls, planned = self._run(None, "counting question one")
-        self.assertEqual(calls, planned)
+        self.assertEqual((calls, planned), (1, 1))
+
+    def test_message_with_profile_cue(self):
+        calls, planned = self._run(None, "I work in retail, counting question two")
+        self.assertEqual((calls, planned), (2, 2))
 
     def test_message_with_behavior_data(self):
-        calls, planned = self._run({"clicks": 2}, "counting question two")
+        calls, planned = self._run({"clicks": 2}, "I work in retail, counting question three")
         self.assertEqual(calls, planned)
 
+    def test_message_with_rich_behavior_data(self):
+        calls, planned = self._run(RICH_SESSION, "I work in retail, counting question four")
+        self.assertEqual((calls, planned), (3, 3))
+
+    def test_combined_analysis(self):
+        settings.combined_analysis = True
+        try:
+            calls, planned = self._run(RICH_SESSION, "I work in retail, counting question five")
+        finally:
+            settings.combined_analysis = False
+        self.assertEqual((calls, planned), (2, 2))
+
 
 if __name__ == "__main__":
     unittest.main()
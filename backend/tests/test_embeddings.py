@@ -27,19 +27,25 @@ import asyncio
 import importlib
 import re
 import sys
+import tempfile
 import types
 import unittest
 from pathlib import Path
 from types import SimpleNamespace
 from unittest import mock
 
+import numpy as np
+
 from llm.embeddings import (
+    EmbeddingBatcher,
     EmbeddingClient,
     EmbeddingConfigError,
     create_embedding_client,
     resolve_embedding_config,
 )
 from llm.factory import GEMINI_OPENAI_BASE_URL
+from tests.test_redis_reconnect import FakeRedisServer, fake_redis_modules, unique_url
+from utils import cache
 
 BACKEND_ROOT = Path(__file__).resolve().parent.parent
 
@@ -96,9 +102,24 @@ class FakeOpenAI:
         FakeOpenAI.last_instance = self
 
 
+class FakeAsyncEmbeddingsAPI(FakeEmbeddingsAPI):
+    async def create(self, **kwargs):
+        return super().create(**kwargs)
+
+
+class FakeAsyncOpenAI:
+    last_instance = None
+
+    def __init__(self, api_key=None, base_url=None, http_client=None):
+        self.http_client = http_client
+        self.embeddings = FakeAsyncEmbeddingsAPI()
+        FakeAsyncOpenAI.last_instance = self
+
+
 def fake_openai_module():
     module = types.ModuleType("openai")
     module.OpenAI = FakeOpenAI
+    module.AsyncOpenAI = FakeAsyncOpenAI
     return module
 
 
@@ -110,6 +131,7 @@ def fake_settings(**overrides):
         embedding_api_key=None,
         embedding_base_url=None,
         embedding_dimensions=None,
+        embedding_batch_window_ms=5.0,
         openai_api_key=None,
         openai_base_url=None,
         google_api_key=None,
@@ -118,6 +140,14 @@ def fake_settings(**overrides):
         qdrant_port=6333,
         qdrant_collection="test_collection",
         qdrant_timeout_seconds=2,
+        qdrant_prefer_grpc=False,
+        qdrant_grpc_port=6334,
+        qdrant_vector_datatype=None,
+        qdrant_quantization=None,
+        qdrant_hnsw_ef=None,
+        retrieval_cache_similarity=0.0,
+        retrieval_cache_size=1024,
+        upsert_concurrency=4,
         top_k_retrieval=5,
         similarity_threshold=0.35,
         use_semantic_chunking=True,
@@ -300,6 +330,18 @@ class TestOpenAIEmbeddingClient(unittest.TestCase):
                 "dimensions", FakeOpenAI.last_instance.embeddings.calls[0]
             )
 
+    def test_aembed_is_a_native_call_on_the_shared_pool(self):
+        pool = object()
+        with mock.patch.dict(sys.modules, {"openai": fake_openai_module()}), \
+                mock.patch("llm.http.shared_http_client", return_value=pool), \
+                mock.patch("asyncio.BaseEventLoop.run_in_executor", side_effect=AssertionError):
+            client = self._client(model="text-embedding-3-small", api_key="sk-x")
+            vectors = asyncio.run(client.aembed(["a", "b"]))
+
+        self.assertEqual([v[0] for v in vectors], [0.0, 1.0])
+        self.assertIs(FakeAsyncOpenAI.last_instance.http_client, pool)
+        self.assertEqual(FakeOpenAI.last_instance.embeddings.calls, [])
+
     def test_empty_input_makes_no_api_call(self):
         with mock.patch.dict(sys.modules, {"openai": fake_openai_module()}):
             client = self._client(model="text-embedding-3-small", api_key="sk-x")
@@ -307,6 +349,71 @@ class TestOpenAIEmbeddingClient(unittest.TestCase):
             self.assertEqual(FakeOpenAI.last_instance.embeddings.calls, [])
 
 
+class TestEmbeddingBatcher(unittest.TestCase):
+    """Concurrent single-text embeddings share one provider call."""
+
+    def test_concurrent_texts_one_call_in_order(self):
+        embedder = MockEmbedder(dim=8)
+        batcher = EmbeddingBatcher(embedder, window=0.01)
+
+        async def burst():
+            return await asyncio.gather(*(batcher.embed(t) for t in ("a", "b", "a", "c")))
+
+        vectors = run(burst())
+
+        self.assertEqual(embedder.calls, [["a", "b", "c"]])  # "a" embedded once
+        self.assertEqual(vectors[0], vectors[2])
+        self.assertEqual([v.index(1.0) for v in vectors], [0, 1, 0, 2])
+
+    def test_full_batch_flushes_without_waiting(self):
+        embedder = MockEmbedder(dim=8)
+        batcher = EmbeddingBatcher(embedder, window=60, max_batch=2)
+
+        async def pair():
+            return await asyncio.wait_for(
+                asyncio.gather(batcher.embed("a"), batcher.embed("b")), timeout=1
+            )
+
+        run(pair())
+        self.assertEqual(embedder.calls, [["a", "b"]])
+
+    def test_sequential_calls_are_separate_batches(self):
+        embedder = MockEmbedder(dim=8)
+        batcher = EmbeddingBatcher(embedder, window=0.001)
+
+        async def one_by_one():
+            await batcher.embed("a")
+            await batcher.embed("b")
+
+        run(one_by_one())
+        self.assertEqual(embedder.calls, [["a"], ["b"]])
+
+    def test_zero_window_embeds_directly(self):
+        embedder = MockEmbedder(dim=8)
+        batcher = EmbeddingBatcher(embedder, window=0)
+
+        async def burst():
+            await asyncio.gather(batcher.embed("a"), batcher.embed("b"))
+
+        run(burst())
+        self.assertEqual(sorted(embedder.calls), [["a"], ["b"]])
+
+    def test_failure_reaches_every_waiter(self):
+        class FailingEmbedder(MockEmbedder):
+            def embed(self, texts):
+                raise RuntimeError("provider down")
+
+        batcher = EmbeddingBatcher(FailingEmbedder(), window=0.001)
+
+        async def burst():
+            return await asyncio.gather(
+                batcher.embed("a"), batcher.embed("b"), return_exceptions=True
+            )
+
+        results = run(burst())
+        self.assertTrue(all(isinstance(r, RuntimeError) for r in results))
+
+
 class TestCreateEmbeddingClientFactory(unittest.TestCase):
     def setUp(self):
         create_embedding_client.cache_clear()
@@ -369,6 +476,7 @@ class FakeQdrantServer:
 
     def __init__(self):
         self.collections = {}
+        self.created = {}  # name: (vectors_config, other create_collection args)
         self.upserts = []
         self.searches = []
 
@@ -392,9 +500,11 @@ def _collection_info(size):
 
 def fake_qdrant_modules(server):
     class FakeQdrantClient:
-        def __init__(self, host=None, port=None, timeout=None):
+        def __init__(self, host=None, port=None, timeout=None, prefer_grpc=False, grpc_port=6334):
             self._server = server
             self.timeout = timeout
+            self.prefer_grpc = prefer_grpc
+            self.grpc_port = grpc_port
 
         def get_collections(self):
             return _FakeCollectionsList(list(self._server.collections))
@@ -402,8 +512,9 @@ def fake_qdrant_modules(server):
         def get_collection(self, name):
             return _collection_info(self._server.collections[name])
 
-        def create_collection(self, collection_name, vectors_config):
+        def create_collection(self, collection_name, vectors_config, **kwargs):
             self._server.collections[collection_name] = vectors_config.size
+            self._server.created[collection_name] = (vectors_config, kwargs)
 
         def create_payload_index(self, **kwargs):
             return None
@@ -421,9 +532,11 @@ def fake_qdrant_modules(server):
             return SimpleNamespace(count=0)
 
     class FakeAsyncQdrantClient:
-        def __init__(self, host=None, port=None, timeout=None):
+        def __init__(self, host=None, port=None, timeout=None, prefer_grpc=False, grpc_port=6334):
             self._server = server
             self.timeout = timeout
+            self.prefer_grpc = prefer_grpc
+            self.grpc_port = grpc_port
 
         async def query_points(self, **kwargs):
             self._server.searches.append(kwargs)
@@ -443,10 +556,14 @@ def fake_qdrant_modules(server):
     for name in (
         "VectorParams", "Filter", "FieldCondition", "MatchValue", "MatchAny",
         "IsEmptyCondition", "PayloadField", "PointStruct", "FilterSelector",
+        "ScalarQuantization", "ScalarQuantizationConfig", "SearchParams",
+        "QuantizationSearchParams",
     ):
         setattr(models_mod, name, type(name, (_Model,), {}))
     models_mod.Distance = SimpleNamespace(COSINE="Cosine")
     models_mod.PayloadSchemaType = SimpleNamespace(KEYWORD="keyword")
+    models_mod.Datatype = SimpleNamespace(FLOAT16="float16")
+    models_mod.ScalarType = SimpleNamespace(INT8="int8")
     http_mod.models = models_mod
     qdrant_client.http = http_mod
 
@@ -534,6 +651,69 @@ class TestVectorStoreDimensions(VectorStoreTestCase):
         module.QdrantVectorStore(embedder=embedder)
         self.assertEqual(server.collections["test_collection"], 1024)
 
+    def test_default_collection_is_plain_float32(self):
+        server = FakeQdrantServer()
+        module = self.load(server, fake_settings())
+        module.QdrantVectorStore(embedder=MockEmbedder(dim=8))
+        vectors, options = server.created["test_collection"]
+        self.assertEqual(options, {})
+        self.assertFalse(hasattr(vectors, "datatype") or hasattr(vectors, "on_disk"))
+
+    def test_new_collection_gets_configured_storage(self):
+        server = FakeQdrantServer()
+        settings_ns = fake_settings(qdrant_vector_datatype="float16", qdrant_quantization="INT8")
+        module = self.load(server, settings_ns)
+        module.QdrantVectorStore(embedder=MockEmbedder(dim=8))
+        vectors, options = server.created["test_collection"]
+        self.assertEqual(vectors.datatype, "float16")
+        self.assertTrue(vectors.on_disk)
+        scalar = options["quantization_config"].scalar
+        self.assertEqual((scalar.type, scalar.quantile, scalar.always_ram), ("int8", 0.99, True))
+
+    def test_quantized_search_rescores_oversampled_candidates(self):
+        server = FakeQdrantServer()
+        module = self.load(server, fake_settings())
+        run(module.QdrantVectorStore(embedder=MockEmbedder(dim=8)).search_async(query="plain"))
+        self.assertIsNone(server.searches[0]["search_params"])
+
+        server = FakeQdrantServer()
+        module = self.load(server, fake_settings(qdrant_quantization="int8"))
+        run(module.QdrantVectorStore(embedder=MockEmbedder(dim=8)).search_async(query="int8"))
+        quantization = server.searches[0]["search_params"].quantization
+        self.assertEqual((quantization.rescore, quantization.oversampling), (True, 2.0))
+
+    def test_hits_become_results_without_the_content_in_metadata(self):
+        server = FakeQdrantServer()
+        module = self.load(server, fake_settings())
+        store = module.QdrantVectorStore(embedder=MockEmbedder(dim=8))
+        hit = SimpleNamespace(score=0.8, payload={
+            "content": "Login uses SSO.", "chunk_id": "c1", "source_document": "auth.md",
+        })
+
+        async def query_points(**kwargs):
+            return SimpleNamespace(points=[hit])
+
+        store.async_client.query_points = query_points
+        [result] = run(store.search_async(query="login"))
+
+        self.assertEqual((result.content, result.score, result.chunk_id), ("Login uses SSO.", 0.8, "c1"))
+        self.assertEqual(result.metadata, {"chunk_id": "c1", "source_document": "auth.md"})
+
+    def test_hnsw_ef_applies_per_search(self):
+        server = FakeQdrantServer()
+        module = self.load(server, fake_settings(qdrant_hnsw_ef=64))
+        run(module.QdrantVectorStore(embedder=MockEmbedder(dim=8)).search_async(query="q"))
+        params = server.searches[0]["search_params"]
+        self.assertEqual(params.hnsw_ef, 64)
+        self.assertFalse(hasattr(params, "quantization"))
+
+    def test_unknown_storage_setting_fails_at_init(self):
+        for overrides in ({"qdrant_vector_datatype": "int4"}, {"qdrant_quantization": "pq"}):
+            with self.subTest(**overrides):
+                module = self.load(FakeQdrantServer(), fake_settings(**overrides))
+                with self.assertRaises(ValueError):
+                    module.QdrantVectorStore(embedder=MockEmbedder(dim=8))
+
     def test_existing_collection_with_known_mismatch_fails_at_init(self):
         server = FakeQdrantServer()
         server.collections["test_collection"] = 1536  # created with OpenAI dims
@@ -546,6 +726,21 @@ class TestVectorStoreDimensions(VectorStoreTestCase):
         self.assertIn("768", message)
         self.assertIn("test_collection", message)
 
+    def test_collection_is_checked_once_per_process(self):
+        server = FakeQdrantServer()
+        server.collections["test_collection"] = 768
+        module = self.load(server, fake_settings())
+        module.QdrantVectorStore(embedder=MockEmbedder(dim=768, dimensions=768))
+
+        with mock.patch.object(
+            module.QdrantClient, "get_collections", side_effect=AssertionError("round-trip")
+        ):
+            store = module.QdrantVectorStore(embedder=MockEmbedder(dim=768, dimensions=768))
+            self.assertEqual(store._collection_dim, 768)
+            # A mismatched model still fails without asking Qdrant
+            with self.assertRaises(EmbeddingConfigError):
+                module.QdrantVectorStore(embedder=MockEmbedder(model="x", dim=1024, dimensions=1024))
+
     def test_existing_collection_with_matching_dimension_is_fine(self):
         server = FakeQdrantServer()
         server.collections["test_collection"] = 768
@@ -574,6 +769,76 @@ class TestVectorStoreDimensions(VectorStoreTestCase):
             store.index_chunks([chunk])
         self.assertEqual(server.upserts, [])
 
+    def test_index_chunks_takes_an_iterator_one_batch_at_a_time(self):
+        server = FakeQdrantServer()
+        module = self.load(server, fake_settings(upsert_concurrency=1))
+        store = module.QdrantVectorStore(embedder=MockEmbedder(model="bge-m3", dim=64))
+        produced = []
+
+        def chunks():
+            for i in range(5):
+                produced.append(i)
+                yield module.SemanticChunk(
+                    content=f"chunk {i}", metadata={}, chunk_id=f"c{i}", source_document="doc"
+                )
+
+        pulled_at_upsert = []
+        upsert = store.client.upsert
+
+        def recording_upsert(**kwargs):
+            pulled_at_upsert.append(len(produced))
+            upsert(**kwargs)
+
+        store.client.upsert = recording_upsert
+
+        self.assertEqual(store.index_chunks(chunks(), batch_size=2), 5)
+        self.assertEqual([len(points) for _, points in server.upserts], [2, 2, 1])
+        self.assertEqual(pulled_at_upsert, [2, 4, 5])
+        self.assertEqual(store.index_chunks(iter(())), 0)
+
+    def test_reindexing_a_chunk_reuses_its_point(self):
+        server = FakeQdrantServer()
+        module = self.load(server, fake_settings())
+        store = module.QdrantVectorStore(embedder=MockEmbedder(dim=8))
+
+        def ids(content="Login uses SSO.", tenant="acme"):
+            chunk = module.SemanticChunk(
+                content=content, metadata={}, chunk_id="auth.md_0", source_document="auth.md"
+            )
+            store.index_chunks([chunk], tenant=tenant)
+            return server.upserts[-1][1][0].id
+
+        first = ids()
+        self.assertEqual(ids(), first)
+        self.assertNotEqual(ids(tenant="other"), first)
+        self.assertNotEqual(ids(content="Login uses passwords."), first)
+
+    def test_index_chunks_overlaps_upserts(self):
+        import threading
+
+        server = FakeQdrantServer()
+        module = self.load(server, fake_settings(upsert_concurrency=3))
+        store = module.QdrantVectorStore(embedder=MockEmbedder(model="bge-m3", dim=8))
+        # Each upsert waits for the other two: one after another, the
+        # barrier times out and every batch fails
+        barrier = threading.Barrier(3, timeout=5)
+        upsert = store.client.upsert
+
+        def together(**kwargs):
+            barrier.wait()
+            upsert(**kwargs)
+
+        store.client.upsert = together
+        chunks = [
+            module.SemanticChunk(
+                content=f"chunk {i}", metadata={}, chunk_id=f"c{i}", source_document="doc"
+            )
+            for i in range(3)
+        ]
+
+        self.assertEqual(store.index_chunks(chunks, batch_size=1), 3)
+        self.assertEqual(len(server.upserts), 3)
+
     def test_search_uses_the_injected_embedder(self):
         server = FakeQdrantServer()
         module = self.load(server, fake_settings())
@@ -583,6 +848,108 @@ class TestVectorStoreDimensions(VectorStoreTestCase):
         self.assertGreater(len(embedder.calls), 0)
         self.assertEqual(len(server.searches), 1)
 
+    def test_search_with_a_precomputed_vector_does_not_embed(self):
+        server = FakeQdrantServer()
+        module = self.load(server, fake_settings())
+        embedder = MockEmbedder(model="bge-m3", dim=64)
+        store = module.QdrantVectorStore(embedder=embedder)
+        calls_after_init = len(embedder.calls)
+
+        run(store.search_async(query="ignored", query_vector=[0.5] * 64))
+
+        self.assertEqual(len(embedder.calls), calls_after_init)
+        query = server.searches[0]["query"]
+        self.assertEqual(query.dtype, np.float32)  # as Qdrant stores it
+        self.assertEqual(query.tolist(), [0.5] * 64)
+
+    def test_query_embedding_is_float32(self):
+        module = self.load(FakeQdrantServer(), fake_settings())
+        store = module.QdrantVectorStore(embedder=MockEmbedder(model="bge-m3", dim=64))
+
+        vector = run(store.embed_query_async("login"))
+
+        self.assertEqual((vector.dtype, vector.shape), (np.float32, (64,)))
+
+    def test_shared_query_embedding_is_float32_too(self):
+        server = FakeRedisServer()
+        patcher = mock.patch.dict(sys.modules, fake_redis_modules(server))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        module = self.load(FakeQdrantServer(), fake_settings())
+        cache.use_shared_cache(unique_url())
+        self.addCleanup(cache.use_shared_cache, None)
+        embedder = MockEmbedder(model="bge-m3", dim=64)
+        store = module.QdrantVectorStore(embedder=embedder)
+
+        first = run(store.embed_query_async("login"))
+        calls = len(embedder.calls)
+        module.clear_cache()  # what a second worker starts with
+        vector = run(store.embed_query_async("login"))
+
+        self.assertEqual(len(embedder.calls), calls)  # served by Redis
+        self.assertIsInstance(vector, np.ndarray)
+        self.assertEqual((vector.dtype, vector.shape), (np.float32, (64,)))
+        np.testing.assert_array_equal(vector, first)
+
+    def test_cached_searches_tell_long_array_vectors_apart(self):
+        server = FakeQdrantServer()
+        module = self.load(server, fake_settings())
+        store = module.QdrantVectorStore(embedder=MockEmbedder(model="bge-m3", dim=2048))
+        first = np.zeros(2048, dtype=np.float32)
+        second = first.copy()
+        second[1000] = 1.0  # hidden in the middle of numpy's "..." repr
+
+        run(store.search_async(query_vector=first))
+        run(store.search_async(query_vector=second))
+        run(store.search_async(query_vector=first.copy()))
+
+        self.assertEqual(len(server.searches), 2)
+
+    def test_reworded_search_reuses_the_earlier_results(self):
+        server = FakeQdrantServer()
+        module = self.load(server, fake_settings(retrieval_cache_similarity=0.95))
+        store = module.QdrantVectorStore(embedder=MockEmbedder(model="bge-m3", dim=4))
+        asked = [1.0, 0.0, 0.0, 0.0]
+        reworded = [0.99, 0.1, 0.0, 0.0]  # cosine ~0.995
+        unrelated = [0.0, 1.0, 0.0, 0.0]
+
+        first = run(store.search_async(query_vector=asked))
+        self.assertIs(run(store.search_async(query_vector=reworded)), first)
+        self.assertEqual(len(server.searches), 1)
+
+        run(store.search_async(query_vector=unrelated))
+        run(store.search_async(query_vector=reworded, tenant="other"))
+        run(store.search_async(query_vector=reworded, top_k=2))
+        run(store.search_async(query_vector=reworded, filters={"file_type": "pdf"}))
+        self.assertEqual(len(server.searches), 5)
+
+    def test_reworded_search_hits_qdrant_when_disabled(self):
+        server = FakeQdrantServer()
+        module = self.load(server, fake_settings())
+        store = module.QdrantVectorStore(embedder=MockEmbedder(model="bge-m3", dim=4))
+
+        run(store.search_async(query_vector=[1.0, 0.0, 0.0, 0.0]))
+        run(store.search_async(query_vector=[0.99, 0.1, 0.0, 0.0]))
+
+        self.assertEqual(len(server.searches), 2)
+
+    def test_context_stops_at_the_first_result_over_budget(self):
+        module = self.load(FakeQdrantServer(), fake_settings())
+        results = [
+            module.RetrievalResult(
+                content=c, score=0.9, metadata={"source_document": "kb.md"}, chunk_id=c
+            )
+            for c in ("a" * 10, "b" * 10, "c")
+        ]
+        # Each part is len("[Source: kb.md]\n") + 10 + 1 = 27 chars; the budget is 56
+        context = module.build_context_from_results(results, max_tokens=14)
+
+        self.assertEqual(context, "[Source: kb.md]\naaaaaaaaaa\n\n---\n[Source: kb.md]\nbbbbbbbbbb\n")
+        self.assertEqual(
+            module.build_context_from_results(results, max_tokens=1, include_metadata=False),
+            "",  # the first part alone is over budget: nothing after it is used
+        )
+
 
 class TestChunkerEmbeddingConfig(VectorStoreTestCase):
     def test_chunker_with_unconfigured_embedding_raises_readable(self):
@@ -629,6 +996,136 @@ class TestRealLlamaIndexAdapter(unittest.TestCase):
         )
         self.assertGreater(len(chunks), 0)
         self.assertGreater(len(embedder.calls), 0)
+        self.assertNotIn("relationships", chunks[0].metadata)
+
+    def test_semantic_splitter_embeds_in_large_batches(self):
+        from rag.chunker import SemanticChunker
+
+        embedder = MockEmbedder(model="bge-m3", dim=8)
+        chunker = SemanticChunker(embed_model=embedder)
+        calls_before = len(embedder.calls)
+        chunker.chunk_text(" ".join(f"Sentence number {i} is here." for i in range(40)))
+
+        # 40 sentence groups: one call, not four of LlamaIndex's default 10
+        self.assertEqual(len(embedder.calls) - calls_before, 1)
+
+    def test_vectorized_distances_match_llama_index(self):
+        from llama_index.core.node_parser import SemanticSplitterNodeParser
+        from rag.chunker import _SemanticSplitter, _ClientEmbedding
+
+        embed_model = _ClientEmbedding(MockEmbedder(model="bge-m3", dim=8))
+        rng = np.random.default_rng(7)
+        groups = [{"combined_sentence_embedding": list(rng.random(32))} for _ in range(20)]
+
+        stock = SemanticSplitterNodeParser(embed_model=embed_model)
+        fast = _SemanticSplitter(embed_model=embed_model)
+
+        np.testing.assert_allclose(
+            fast._calculate_distances_between_sentence_groups(groups),
+            stock._calculate_distances_between_sentence_groups(groups),
+            atol=1e-12,
+        )
+        self.assertEqual(fast._calculate_distances_between_sentence_groups(groups[:1]), [])
+
+    def test_unchanged_file_is_chunked_from_the_cache(self):
+        import rag.chunker as chunker_module
+
+        embedder = MockEmbedder(model="bge-m3", dim=8)
+        chunker = chunker_module.SemanticChunker(embed_model=embedder)
+        with tempfile.TemporaryDirectory() as tmp:
+            doc = Path(tmp, "doc.md")
+            doc.write_text("The sky is blue. Clouds drift. Databases store rows.")
+            with mock.patch.object(chunker_module.get_settings(), "chunk_cache_dir",
+                                   str(Path(tmp, "cache")), create=True):
+                first = chunker.chunk_document(doc)
+                calls = len(embedder.calls)
+                again = chunker.chunk_document(doc)
+                self.assertEqual(len(embedder.calls), calls)
+                self.assertEqual(again, first)
+
+                doc.write_text("Something else entirely. With two sentences.")
+                changed = chunker.chunk_document(doc)
+                self.assertGreater(len(embedder.calls), calls)
+                self.assertNotEqual([c.content for c in changed], [c.content for c in first])
+
+    def test_directory_walk_matches_extensions_and_depth(self):
+        from rag.chunker import _matching_files
+
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            (root / "sub" / "deeper").mkdir(parents=True)
+            for name in ("a.md", "B.PDF", "skip.png", "sub/c.txt", "sub/deeper/d.md"):
+                (root / name).write_text("x")
+            (root / "sub" / "loop").symlink_to(root, target_is_directory=True)
+            exts = frozenset({".md", ".pdf", ".txt"})
+
+            def names(recursive):
+                return sorted(p.relative_to(root).as_posix()
+                              for p in _matching_files(root, recursive, exts))
+
+            self.assertEqual(names(True), ["B.PDF", "a.md", "sub/c.txt", "sub/deeper/d.md"])
+            self.assertEqual(names(False), ["B.PDF", "a.md"])
+
+    def test_iter_directory_chunks_one_document_at_a_time(self):
+        from config import get_settings
+        from rag.chunker import SemanticChunker
+
+        chunker = SemanticChunker(embed_model=MockEmbedder(model="bge-m3", dim=8))
+        with tempfile.TemporaryDirectory() as tmp:
+            for name in ("a.md", "b.md", "c.md"):
+                Path(tmp, name).write_text(f"Notes in {name}. Nothing else.")
+
+            chunked = []
+            chunk_document = chunker.chunk_document
+
+            def recording(file_path, *args, **kwargs):
+                chunked.append(Path(file_path).name)
+                return chunk_document(file_path, *args, **kwargs)
+
+            with mock.patch.object(chunker, "chunk_document", recording), \
+                    mock.patch.object(get_settings(), "chunk_concurrency", 1):
+                stream = chunker.iter_directory(tmp)
+                first = next(stream)
+                self.assertEqual(len(chunked), 1)
+                rest = list(stream)
+
+            self.assertEqual(len(chunked), 3)
+            self.assertEqual(
+                [c.content for c in [first, *rest]],
+                [c.content for c in chunker.chunk_directory(tmp)],
+            )
+
+    def test_directory_files_are_chunked_concurrently_in_order(self):
+        import threading
+
+        from config import get_settings
+        from rag.chunker import SemanticChunker
+
+        chunker = SemanticChunker(embed_model=MockEmbedder(model="bge-m3", dim=8))
+        # Each file waits for the other two: chunked one after another,
+        # the barrier times out and every file fails
+        barrier = threading.Barrier(3, timeout=5)
+        chunk_document = SemanticChunker.chunk_document
+        threads = set()
+
+        def together(self, file_path, *args, **kwargs):
+            threads.add(threading.get_ident())
+            barrier.wait()
+            return chunk_document(self, file_path, *args, **kwargs)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            for name in ("a.md", "b.md", "c.md"):
+                Path(tmp, name).write_text(f"Notes in {name}. Nothing else.")
+
+            with mock.patch.object(SemanticChunker, "chunk_document", together), \
+                    mock.patch.object(get_settings(), "chunk_concurrency", 3):
+                chunks = chunker.chunk_directory(tmp)
+            with mock.patch.object(get_settings(), "chunk_concurrency", 1):
+                one_by_one = chunker.chunk_directory(tmp)
+
+        self.assertEqual(len(threads), 3)
+        self.assertEqual(len({c.source_document for c in chunks}), 3)
+        self.assertEqual([c.content for c in chunks], [c.content for c in one_by_one])
 
 
 def _config_available():
@@ -646,6 +1143,17 @@ class TestRealSettings(unittest.TestCase):
 
         self.assertFalse(hasattr(settings, "qdrant_vector_size"))
 
+    @unittest.skipUnless(_llama_index_available(), "llama_index not installed")
+    def test_importing_rag_does_not_build_settings(self):
+        import subprocess
+
+        probe = (
+            "import rag, config\n"
+            "assert config.get_settings.cache_info().currsize == 0\n"
+            "assert config.settings is config.get_settings()\n"
+        )
+        subprocess.run([sys.executable, "-c", probe], cwd=BACKEND_ROOT, check=True)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,94 @@
+"""
+Tests for JSON extraction from complete LLM replies.
+Runnable with pytest or `python3 -m unittest discover -s tests` from backend/.
+"""
+
+import json
+import unittest
+
+from utils.json_extract import loads_llm_json, reply_text
+
+
+class TestLoadsLlmJson(unittest.TestCase):
+    def test_bare_document(self):
+        self.assertEqual(loads_llm_json('{"a": 1}'), {"a": 1})
+        self.assertEqual(loads_llm_json(b'[1, 2]'), [1, 2])
+
+    def test_fenced_block(self):
+        text = 'Here you go:\n```json\n{"a": {"b": [1]}}\n```\nanything else?'
+        self.assertEqual(loads_llm_json(text), {"a": {"b": [1]}})
+        self.assertEqual(loads_llm_json('```\n{"a": 2}\n```'), {"a": 2})
+
+    def test_object_inside_prose(self):
+        text = 'Sure! {"text": "a } inside a string", "n": 3} Hope this helps {not json}'
+        self.assertEqual(loads_llm_json(text), {"text": "a } inside a string", "n": 3})
+
+    def test_fence_wins_over_braces_in_the_prose(self):
+        text = 'Mind the {braces}:\n```json\n{"a": 1}\n```'
+        self.assertEqual(loads_llm_json(text), {"a": 1})
+
+    def test_object_wins_over_arrays_and_empty_objects_in_prose(self):
+        self.assertEqual(loads_llm_json('Sure [1] here: {"a": 1}'), {"a": 1})
+        self.assertEqual(loads_llm_json('Note {} then {"a": 1}'), {"a": 1})
+        self.assertEqual(loads_llm_json('Rows: [1, {"a": 2}] done'), {"a": 2})
+
+    def test_array_in_prose_without_an_object(self):
+        self.assertEqual(loads_llm_json('Rows: [1, 2] done'), [1, 2])
+        self.assertEqual(loads_llm_json('Nothing here {} at all'), {})
+
+    def test_stray_brackets_in_prose_are_skipped(self):
+        text = '[Note] see {placeholder} below: {"a": [1, 2]}'
+        self.assertEqual(loads_llm_json(text), {"a": [1, 2]})
+
+    def test_stringified_text_block(self):
+        text = "TextBlock(content='{\"answer\": \"yes\"}', type='text')"
+        self.assertEqual(loads_llm_json(text), {"answer": "yes"})
+
+    def test_no_json_raises_decode_error(self):
+        with self.assertRaises(json.JSONDecodeError):
+            loads_llm_json("no structure here")
+        with self.assertRaises(json.JSONDecodeError):
+            loads_llm_json('{"unterminated": ')
+
+    def test_truncated_reply_does_not_yield_a_nested_object(self):
+        text = (
+            '{"insights": [{"key": "slow", "confidence": 0.9}], '
+            '"profile_updates": [{"field": "x"'
+        )
+        with self.assertRaises(json.JSONDecodeError):
+            loads_llm_json(text)
+        with self.assertRaises(json.JSONDecodeError):
+            loads_llm_json("Here it is: " + text)
+
+    def test_object_after_a_closed_failed_opening(self):
+        text = '{bad {"inner": 1}} then {"a": 1}'
+        self.assertEqual(loads_llm_json(text), {"a": 1})
+
+    def test_non_text_raises_type_error(self):
+        with self.assertRaises(TypeError):
+            loads_llm_json(None)
+
+
+class TestReplyText(unittest.TestCase):
+    def test_plain_shapes(self):
+        self.assertEqual(reply_text('{"a": 1}'), '{"a": 1}')
+        self.assertEqual(reply_text(b'{"a": 1}'), '{"a": 1}')
+
+    def test_content_blocks_are_joined(self):
+        blocks = [{"type": "text", "text": '{"a": '}, {"type": "text", "content": "1}"}]
+        self.assertEqual(reply_text(blocks), '{"a": 1}')
+
+    def test_sdk_objects(self):
+        class Block:
+            def __init__(self, text):
+                self.text = text
+
+        class Message:
+            content = [Block('{"a": '), Block("1}")]
+
+        self.assertEqual(reply_text(Message()), '{"a": 1}')
+        self.assertEqual(reply_text(42), "42")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -6,7 +6,7 @@ Runnable with pytest or `python3 -m unittest discover -s tests` from backend/.
 import json
 import unittest
 
-from utils.json_stream import ComponentStreamParser
+from utils.json_stream import ComponentStreamParser, JsonDocumentBuffer
 
 FULL_RESPONSE = json.dumps({
     "components": [
@@ -97,6 +97,48 @@ class TestComponentStreamParser(unittest.TestCase):
         parser = ComponentStreamParser()
         self.assertEqual(len(parser.feed(response)), 1)
 
+    def test_other_array_key(self):
+        response = '{"summary": "components: [", "insights": [{"key": "a"}, {"key": "b"}]}'
+        parser, collected = feed_in_chunks(response, 5)
+        self.assertEqual(collected, [])
+        parser = ComponentStreamParser(array_key="insights")
+        self.assertEqual([i["key"] for i in parser.feed(response)], ["a", "b"])
+
+
+class TestJsonDocumentBuffer(unittest.TestCase):
+    def test_complete_at_the_closing_brace_any_boundary(self):
+        text = "```json\n" + FULL_RESPONSE + "\n```\nanything after"
+        for size in (1, 2, 3, 7, 16, 64):
+            buffer = JsonDocumentBuffer()
+            done_at = None
+            for i in range(0, len(text), size):
+                if buffer.feed(text[i:i + size]):
+                    done_at = i
+                    break
+            self.assertEqual(buffer.document, FULL_RESPONSE, f"chunk size {size}")
+            self.assertLess(done_at, len(text) - len("\n```\nanything after") + size)
+
+    def test_braces_and_escapes_inside_strings(self):
+        response = '{"content": "say \\"hi\\" } { x", "n": {"k": 1}}'
+        buffer = JsonDocumentBuffer()
+        for ch in response[:-1]:
+            self.assertFalse(buffer.feed(ch))
+        self.assertTrue(buffer.feed(response[-1]))
+        self.assertEqual(json.loads(buffer.document)["content"], 'say "hi" } { x')
+
+    def test_unfinished_document_is_its_prefix(self):
+        buffer = JsonDocumentBuffer()
+        self.assertFalse(buffer.feed("Sure! "))
+        self.assertFalse(buffer.feed('{"a": [1,'))
+        self.assertIsNone(buffer.document)
+        self.assertEqual(buffer.text, '{"a": [1,')
+
+    def test_nothing_after_done(self):
+        buffer = JsonDocumentBuffer()
+        self.assertTrue(buffer.feed('{"a": 1} {"b": 2}'))
+        self.assertTrue(buffer.feed('{"c": 3}'))
+        self.assertEqual(buffer.document, '{"a": 1}')
+
 
 if __name__ == "__main__":
     unittest.main()
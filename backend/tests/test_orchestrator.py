@@ -0,0 +1,368 @@
+"""
+Tests for the AgentOrchestrator.
+
+One chat message fans out to the response, profile and behave agents.
+With parallel_execution (the default) the three model calls overlap on
+the event loop, so the turn costs the slowest agent, not the sum.
+These tests pin that fan-out and what the orchestrator builds from it.
+
+Runnable with `python3 -m unittest discover -s tests` from backend/.
+The orchestrator tests need the app deps (backend venv); they skip in
+the pure-stdlib shell interpreter.
+"""
+
+import asyncio
+import json
+import sys
+import unittest
+
+try:  # app-level deps: available in the backend venv, not in the shell python
+    from agents.orchestrator import AgentOrchestrator, OrchestratorResult
+    from agents.response_agent import AgentResponse
+    from agents.profile_agent import ProfileAgent, ProfileAnalysisResult, ProfileUpdate
+    from agents.behave_agent import BehaviorAnalysisResult
+    HAVE_APP_DEPS = True
+except ImportError:
+    HAVE_APP_DEPS = False
+
+
+class _Overlap:
+    """Counts agent calls in flight; each one waits for the others."""
+
+    def __init__(self, expected):
+        self.expected = expected
+        self.in_flight = 0
+        self.peak = 0
+
+    async def enter(self):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        # Sequential execution would never reach `expected`: time out
+        # instead of deadlocking the test.
+        for _ in range(100):
+            if self.peak >= self.expected:
+                break
+            await asyncio.sleep(0.001)
+        self.in_flight -= 1
+
+
+class _FakeResponseAgent:
+    def __init__(self, overlap):
+        self.overlap = overlap
+
+    async def process_query_async(self, query, user_profile=None,
+                                  conversation_history=None, tenant=None):
+        await self.overlap.enter()
+        return {"text": query}
+
+    async def process_query_stream_async(self, query, user_profile=None,
+                                         conversation_history=None, tenant=None):
+        yield {"type": "component", "component": {"type": "text", "data": {}}}
+        await self.overlap.enter()
+        yield {"type": "complete", "response": {"text": query}}
+
+
+class _FakeProfileAgent:
+    def __init__(self, overlap, result=None):
+        self.overlap = overlap
+        self.result = result or ProfileAnalysisResult(
+            has_profile_info=False, updates=[], interaction_type="question",
+            topics=[], sentiment="neutral",
+        )
+
+    async def analyze_message_async(self, message, conversation_context=None):
+        await self.overlap.enter()
+        return self.result
+
+
+class _FakeBehaveAgent:
+    def __init__(self, overlap):
+        self.overlap = overlap
+
+    def needs_llm(self, behavior_data):
+        return bool(behavior_data)
+
+    async def analyze_behavior_async(self, behavior_data, user_profile=None):
+        await self.overlap.enter()
+        return BehaviorAnalysisResult(
+            insights=[], profile_updates=[], engagement_score=0.5,
+            user_type="focused", session_summary="s",
+            recommended_ui_adjustments=[],
+        )
+
+
+class _FailingResponseAgent:
+    async def process_query_async(self, query, user_profile=None,
+                                  conversation_history=None, tenant=None):
+        await asyncio.sleep(0)
+        raise ValueError("response agent failed")
+
+
+class _SlowProfileAgent:
+    def __init__(self):
+        self.cancelled = False
+
+    async def analyze_message_async(self, message, conversation_context=None):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+
+
+def _orchestrator(overlap, parallel=True):
+    return AgentOrchestrator(
+        response_agent=_FakeResponseAgent(overlap),
+        profile_agent=_FakeProfileAgent(overlap),
+        behave_agent=_FakeBehaveAgent(overlap),
+        parallel_execution=parallel,
+    )
+
+
+@unittest.skipUnless(HAVE_APP_DEPS, "requires backend venv (rag/config deps)")
+class ParallelFanoutTest(unittest.TestCase):
+    """process() awaits the agents together, not one after the other."""
+
+    def test_three_agents_overlap(self):
+        overlap = _Overlap(expected=3)
+        result = asyncio.run(_orchestrator(overlap).process(
+            "q", behavior_data={"clickCount": 12},
+        ))
+
+        self.assertEqual(overlap.peak, 3)
+        self.assertEqual(result.response, {"text": "q"})
+        self.assertEqual(result.behavior_analysis.user_type, "focused")
+
+    def test_two_agents_without_behavior_data(self):
+        overlap = _Overlap(expected=2)
+        result = asyncio.run(_orchestrator(overlap).process("q"))
+
+        self.assertEqual(overlap.peak, 2)
+        self.assertIsNone(result.behavior_analysis)
+
+    def test_sequential_mode_runs_one_at_a_time(self):
+        overlap = _Overlap(expected=3)
+        asyncio.run(_orchestrator(overlap, parallel=False).process(
+            "q", behavior_data={"clickCount": 12},
+        ))
+
+        self.assertEqual(overlap.peak, 1)
+
+    def test_failure_is_raised_as_itself(self):
+        orchestrator = _orchestrator(_Overlap(expected=1))
+        slow = _SlowProfileAgent()
+        orchestrator.profile_agent = slow
+        orchestrator.response_agent = _FailingResponseAgent()
+
+        with self.assertRaises(ValueError):
+            asyncio.run(orchestrator.process("q"))
+        if sys.version_info >= (3, 11):
+            # TaskGroup: the sibling still waiting on its model is cancelled
+            self.assertTrue(slow.cancelled)
+
+
+async def _collect(stream):
+    return [event async for event in stream]
+
+
+@unittest.skipUnless(HAVE_APP_DEPS, "requires backend venv (rag/config deps)")
+class StreamFanoutTest(unittest.TestCase):
+    """process_stream() streams the answer while the analyses run."""
+
+    def test_components_then_the_same_result(self):
+        overlap = _Overlap(expected=3)
+        events = asyncio.run(_collect(_orchestrator(overlap).process_stream(
+            "q", behavior_data={"clickCount": 12},
+        )))
+
+        self.assertEqual(overlap.peak, 3)
+        self.assertEqual([e["type"] for e in events], ["component", "complete"])
+        result = events[-1]["result"]
+        self.assertEqual(result.response, {"text": "q"})
+        self.assertEqual(result.behavior_analysis.user_type, "focused")
+
+    def test_sequential_mode_analyses_after_the_answer(self):
+        overlap = _Overlap(expected=2)
+        events = asyncio.run(_collect(_orchestrator(overlap, parallel=False).process_stream("q")))
+
+        self.assertEqual(overlap.peak, 1)
+        self.assertIsNone(events[-1]["result"].behavior_analysis)
+
+    def test_closing_the_stream_cancels_the_analyses(self):
+        orchestrator = _orchestrator(_Overlap(expected=1))
+        slow = _SlowProfileAgent()
+        orchestrator.profile_agent = slow
+
+        async def scenario():
+            stream = orchestrator.process_stream("q")
+            await stream.__anext__()
+            await asyncio.sleep(0)  # the analysis task starts waiting
+            await stream.aclose()
+            await asyncio.sleep(0)
+
+        asyncio.run(scenario())
+        self.assertTrue(slow.cancelled)
+
+
+def _profile_result(*updates):
+    return ProfileAnalysisResult(
+        has_profile_info=bool(updates), updates=list(updates),
+        interaction_type="statement", topics=[], sentiment="neutral",
+    )
+
+
+def _behavior_result(profile_updates):
+    return BehaviorAnalysisResult(
+        insights=[], profile_updates=profile_updates, engagement_score=0.8,
+        user_type="focused", session_summary="s", recommended_ui_adjustments=[],
+    )
+
+
+@unittest.skipUnless(HAVE_APP_DEPS, "requires backend venv (rag/config deps)")
+class MergeUpdatesTest(unittest.TestCase):
+    """The merged profile is new; the caller's profile is never written to."""
+
+    def setUp(self):
+        overlap = _Overlap(expected=1)
+        self.orchestrator = AgentOrchestrator(
+            response_agent=_FakeResponseAgent(overlap),
+            profile_agent=ProfileAgent(llm_client=object()),
+            behave_agent=_FakeBehaveAgent(overlap),
+        )
+        self.profile = {
+            "demographic": {"role": {"value": "student", "confidence": 0.6}},
+            "behavior": {"scroll_depth": {"value": "deep", "confidence": 0.7}},
+            "interests": {"music": {"value": "jazz", "confidence": 0.9}},
+        }
+        self.snapshot = json.dumps(self.profile, sort_keys=True)
+
+    def test_input_profile_is_not_mutated(self):
+        merged = self.orchestrator._merge_all_updates(
+            self.profile,
+            _profile_result(ProfileUpdate("demographic.role", "engineer", 0.9, "s")),
+            _behavior_result([{"field": "behavior.pace", "value": "fast", "confidence": 0.8}]),
+        )
+
+        self.assertEqual(json.dumps(self.profile, sort_keys=True), self.snapshot)
+        self.assertEqual(merged["demographic"]["role"]["value"], "engineer")
+        self.assertEqual(merged["behavior"]["pace"]["value"], "fast")
+        self.assertEqual(merged["behavior"]["scroll_depth"]["value"], "deep")
+        self.assertEqual(merged["behavior"]["_user_type"], "focused")
+
+    def test_behavior_prefix_is_optional(self):
+        merged = self.orchestrator._merge_all_updates(
+            self.profile,
+            _profile_result(),
+            _behavior_result([
+                {"field": "behavior.pace", "value": "fast", "confidence": 0.8},
+                {"field": "density", "value": "low", "confidence": 0.8},
+                {"field": "behavior.", "value": "dropped", "confidence": 0.8},
+            ]),
+        )
+
+        self.assertEqual(merged["behavior"]["pace"]["value"], "fast")
+        self.assertEqual(merged["behavior"]["density"]["value"], "low")
+        self.assertNotIn("", merged["behavior"])
+
+    def test_untouched_categories_are_shared_not_copied(self):
+        merged = self.orchestrator._merge_all_updates(
+            self.profile,
+            _profile_result(ProfileUpdate("context.project", "thesis", 0.9, "s")),
+            None,
+        )
+
+        self.assertIs(merged["interests"], self.profile["interests"])
+        self.assertEqual(merged["context"]["project"]["value"], "thesis")
+        self.assertNotIn("context", self.profile)
+
+    def test_lower_confidence_does_not_overwrite(self):
+        merged = self.orchestrator.profile_agent.merge_profile_updates(
+            self.profile, [ProfileUpdate("interests.music", "rock", 0.5, "s")],
+        )
+
+        self.assertEqual(merged["interests"]["music"]["value"], "jazz")
+        self.assertIsNot(merged, self.profile)
+
+
+def _result(behavior_updates=None):
+    return OrchestratorResult(
+        response=AgentResponse(
+            text_response="ok", components=[], sources=[], confidence=0.9,
+            suggested_actions=[],
+        ),
+        profile_analysis=_profile_result(ProfileUpdate("demographic.role", "engineer", 0.9, "s")),
+        behavior_analysis=(
+            _behavior_result(behavior_updates) if behavior_updates is not None else None
+        ),
+        updated_profile=None,
+    )
+
+
+@unittest.skipUnless(HAVE_APP_DEPS, "requires backend venv (rag/config deps)")
+class FrontendResponseTest(unittest.TestCase):
+    """The frontend payload is built once per result."""
+
+    def test_built_once(self):
+        result = _result([{"field": "pace", "value": "fast", "confidence": 0.8}])
+
+        first = result.to_frontend_response()
+
+        self.assertIs(result.to_frontend_response(), first)
+        self.assertEqual(
+            [u["field"] for u in first["profile_updates"]["updates"]],
+            ["demographic.role", "behavior.pace"],
+        )
+        self.assertTrue(first["profile_updates"]["should_update"])
+        self.assertEqual(first["meta"]["behavior"]["user_type"], "focused")
+
+    def test_behavior_updates_are_not_renamed_in_place(self):
+        updates = [
+            {"field": "pace", "value": "fast", "confidence": 0.8},
+            {"field": "behavior.density", "value": "low", "confidence": 0.7},
+        ]
+        result = _result([dict(u) for u in updates])
+
+        payload = result.to_frontend_response()
+
+        self.assertEqual(result.behavior_analysis.profile_updates, updates)
+        self.assertEqual(
+            [u["field"] for u in payload["profile_updates"]["updates"][1:]],
+            ["behavior.pace", "behavior.density"],
+        )
+
+    def test_should_update_follows_either_agent(self):
+        quiet = _result([])
+        quiet.profile_analysis.has_profile_info = False
+        behavior_only = _result([{"field": "pace", "value": "fast", "confidence": 0.8}])
+        behavior_only.profile_analysis.has_profile_info = False
+
+        self.assertFalse(quiet.to_frontend_response()["profile_updates"]["should_update"])
+        self.assertTrue(behavior_only.to_frontend_response()["profile_updates"]["should_update"])
+
+    def test_cache_stays_out_of_to_dict_and_repr(self):
+        result = _result()
+        result.to_frontend_response()
+
+        self.assertNotIn("_frontend", result.to_dict())
+        self.assertNotIn("_frontend", repr(result))
+
+
+@unittest.skipUnless(HAVE_APP_DEPS, "requires backend venv (rag/config deps)")
+class SlotsTest(unittest.TestCase):
+    """Per-request results and the orchestrator are slotted: no __dict__."""
+
+    def test_no_instance_dict(self):
+        overlap = _Overlap(expected=1)
+        orchestrator = _orchestrator(overlap)
+        update = ProfileUpdate("demographic.role", "engineer", 0.9, "s")
+        result = asyncio.run(orchestrator.process("q"))
+
+        for obj in (orchestrator, update, _profile_result(update), result):
+            with self.subTest(type=type(obj).__name__):
+                self.assertFalse(hasattr(obj, "__dict__"))
+        with self.assertRaises(AttributeError):
+            orchestrator.typo_agent = None
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,459 @@
+"""
+Tests for the ProfileAgent.
+
+The agent reads one chat message (plus the last turns) and proposes
+profile updates for the frontend to persist. It runs on every message,
+in parallel with the response agent, so these tests pin what it costs:
+which messages reach the model, how often, and that a bad answer
+degrades to "no profile info" instead of failing the turn.
+
+Runnable with `python3 -m unittest discover -s tests` from backend/.
+The agent tests need the app deps (backend venv); they skip in the
+pure-stdlib shell interpreter.
+"""
+
+import asyncio
+import json
+import os
+import random
+import re
+import unittest
+from collections import deque
+
+from llm.base import LLMChatClient
+
+try:  # app-level deps: available in the backend venv, not in the shell python
+    from agents.profile_agent import ProfileAgent, ProfileUpdate, ProfileUpdateBatch
+    from config import settings
+    HAVE_APP_DEPS = True
+except ImportError:
+    HAVE_APP_DEPS = False
+
+
+ROLE_PAYLOAD = {
+    "has_profile_info": True,
+    "updates": [{"field": "demographic.role", "value": "developer", "confidence": 0.9}],
+    "interaction_type": "statement",
+    "topics": ["work"],
+    "sentiment": "neutral",
+}
+
+
+class ScriptedLLM(LLMChatClient):
+    """Returns the scripted replies in order; an Exception entry is raised."""
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.calls = []
+
+    async def complete_json(self, system, user, json_schema=None):
+        self.calls.append({"system": system, "user": user})
+        reply = self.replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+    async def complete_json_with_tools(self, system, user, tools, tool_handler,
+                                       max_tool_rounds=3):
+        raise NotImplementedError
+
+    async def stream_json(self, system, user):
+        yield self.replies.pop(0)
+
+
+def _turns(n):
+    return [{"role": "user", "content": f"turn {i}"} for i in range(n)]
+
+
+@unittest.skipUnless(HAVE_APP_DEPS, "requires backend venv (rag/config deps)")
+class RepeatQueryCacheTest(unittest.TestCase):
+    """Analyses are cached by the prompt the model sees, successes only."""
+
+    def setUp(self):
+        from utils.cache import clear_cache
+
+        self._env = os.environ.pop("DISABLE_CACHE", None)
+        clear_cache()
+        self.addCleanup(clear_cache)
+
+    def tearDown(self):
+        if self._env is not None:
+            os.environ["DISABLE_CACHE"] = self._env
+
+    def test_repeat_message_hits_the_cache(self):
+        llm = ScriptedLLM([json.dumps(ROLE_PAYLOAD)])
+        agent = ProfileAgent(llm_client=llm)
+
+        first = asyncio.run(agent.analyze_message_async("I am a developer"))
+        second = asyncio.run(agent.analyze_message_async("I am a developer"))
+
+        self.assertEqual(len(llm.calls), 1)
+        self.assertIs(first, second)
+        self.assertEqual(first.updates[0].value, "developer")
+
+    def test_turns_the_prompt_drops_do_not_split_entries(self):
+        llm = ScriptedLLM([json.dumps(ROLE_PAYLOAD)])
+        agent = ProfileAgent(llm_client=llm)
+        history = _turns(5)
+
+        asyncio.run(agent.analyze_message_async("I am a developer", history))
+        asyncio.run(agent.analyze_message_async(
+            "I am a developer", [{"role": "user", "content": "older"}] + history,
+        ))
+
+        self.assertEqual(len(llm.calls), 1)
+
+    def test_recent_context_misses_the_cache(self):
+        llm = ScriptedLLM([json.dumps(ROLE_PAYLOAD)] * 2)
+        agent = ProfileAgent(llm_client=llm)
+
+        asyncio.run(agent.analyze_message_async("I am a developer", _turns(2)))
+        asyncio.run(agent.analyze_message_async("I am a developer", _turns(3)))
+
+        self.assertEqual(len(llm.calls), 2)
+
+    def test_failures_are_not_cached(self):
+        llm = ScriptedLLM([RuntimeError("provider down"), json.dumps(ROLE_PAYLOAD)])
+        agent = ProfileAgent(llm_client=llm)
+
+        failed = asyncio.run(agent.analyze_message_async("I am a developer"))
+        retried = asyncio.run(agent.analyze_message_async("I am a developer"))
+
+        self.assertFalse(failed.has_profile_info)
+        self.assertTrue(retried.has_profile_info)
+        self.assertEqual(len(llm.calls), 2)
+
+    def test_entries_follow_the_client_model_not_the_instance(self):
+        clients = [ScriptedLLM([json.dumps(ROLE_PAYLOAD)]) for _ in range(3)]
+        for llm, model in zip(clients, ("m-1", "m-1", "m-2")):
+            llm.model = model
+            asyncio.run(ProfileAgent(llm_client=llm).analyze_message_async("I am a developer"))
+
+        self.assertEqual([len(llm.calls) for llm in clients], [1, 0, 1])
+
+
+@unittest.skipUnless(HAVE_APP_DEPS, "requires backend venv (rag/config deps)")
+class UpdateConstructionTest(unittest.TestCase):
+    """Updates of one analysis share one source and one timestamp."""
+
+    def setUp(self):
+        os.environ["DISABLE_CACHE"] = "true"
+
+    def test_one_timestamp_per_analysis(self):
+        payload = dict(ROLE_PAYLOAD, updates=[
+            {"field": "demographic.role", "value": "developer", "confidence": 0.9},
+            {"field": "context.current_project", "value": "ml", "confidence": 0.8},
+            {"field": "interest.music", "value": "jazz", "confidence": 0.3},
+        ])
+        agent = ProfileAgent(llm_client=ScriptedLLM([json.dumps(payload)]))
+
+        result = asyncio.run(agent.analyze_message_async("I am a developer " + "x" * 200))
+
+        self.assertEqual(len(result.updates), 2)
+        self.assertEqual(len({u.timestamp for u in result.updates}), 1)
+        self.assertEqual(result.updates[0].source, ("I am a developer " + "x" * 200)[:100])
+        self.assertTrue(result.updates[0].timestamp.endswith("+00:00"))
+
+
+@unittest.skipUnless(HAVE_APP_DEPS, "requires backend venv (rag/config deps)")
+class PromptTest(unittest.TestCase):
+    """The system prompt is a constant prefix; the user prompt is built once."""
+
+    def setUp(self):
+        os.environ["DISABLE_CACHE"] = "true"
+
+    def test_system_prompt_is_identical_across_calls(self):
+        llm = ScriptedLLM([json.dumps(ROLE_PAYLOAD)] * 2)
+        agent = ProfileAgent(llm_client=llm)
+
+        asyncio.run(agent.analyze_message_async("I am a developer"))
+        asyncio.run(agent.analyze_message_async("I work in retail", _turns(1)))
+
+        self.assertIs(llm.calls[0]["system"], ProfileAgent.SYSTEM_PROMPT)
+        self.assertIs(llm.calls[1]["system"], ProfileAgent.SYSTEM_PROMPT)
+
+    def test_prompt_shows_the_last_three_turns_truncated(self):
+        history = _turns(4) + [{"role": "assistant", "content": "x" * 500}]
+
+        prompt = ProfileAgent._build_prompt("I am a developer", history)
+
+        self.assertNotIn("turn 1", prompt)
+        self.assertIn("user: turn 2", prompt)
+        self.assertIn("assistant: " + "x" * 200 + "\n", prompt)
+        self.assertNotIn("x" * 201, prompt)
+        self.assertTrue(prompt.endswith("Analyze this message and respond with valid JSON."))
+
+    def test_prompt_from_any_iterable(self):
+        history = _turns(6)
+        expected = ProfileAgent._build_prompt("I am a developer", history)
+
+        self.assertEqual(ProfileAgent._build_prompt("I am a developer", deque(history, maxlen=3)), expected)
+        self.assertEqual(ProfileAgent._build_prompt("I am a developer", iter(history)), expected)
+        self.assertEqual(
+            ProfileAgent._build_prompt("I am a developer", iter([])),
+            ProfileAgent._build_prompt("I am a developer", None),
+        )
+
+    def test_prompt_without_context(self):
+        prompt = ProfileAgent._build_prompt("I am a developer", None)
+
+        self.assertNotIn("<conversation_context>", prompt)
+        self.assertIn("<message_to_analyze>\nI am a developer\n</message_to_analyze>", prompt)
+
+
+@unittest.skipUnless(HAVE_APP_DEPS, "requires backend venv (rag/config deps)")
+class PrefilterTest(unittest.TestCase):
+    """Short messages with no first-person cue never reach the model."""
+
+    def setUp(self):
+        os.environ["DISABLE_CACHE"] = "true"
+
+    def test_plain_question_skips_the_model(self):
+        llm = ScriptedLLM([])
+        agent = ProfileAgent(llm_client=llm)
+
+        result = asyncio.run(agent.analyze_message_async("What's the weather like today?"))
+
+        self.assertEqual(llm.calls, [])
+        self.assertFalse(result.has_profile_info)
+        self.assertEqual(result.updates, [])
+
+    def test_profile_cues_reach_the_model(self):
+        agent = ProfileAgent(llm_client=ScriptedLLM([]))
+        for message in (
+            "I'm a software engineer",
+            "i am new here",
+            "I work in retail",
+            "I prefer short answers",
+            "What fits my project?",
+            "As a teacher, what should I read?",
+            "Please avoid jargon",
+            "call me Sam",
+            "Keep answers short please",
+            "I live in Berlin",
+            "I have two kids",
+        ):
+            with self.subTest(message=message):
+                self.assertTrue(agent.needs_llm(message))
+
+    def test_prompt_examples_pass_the_prefilter(self):
+        agent = ProfileAgent(llm_client=ScriptedLLM([]))
+        examples = re.findall(
+            r'User: "(.*)"\n→ has_profile_info: (true|false)', ProfileAgent.SYSTEM_PROMPT
+        )
+
+        self.assertEqual(len(examples), 3)
+        for message, has_info in examples:
+            with self.subTest(message=message):
+                self.assertEqual(agent.needs_llm(message), has_info == "true")
+
+    def test_long_messages_always_reach_the_model(self):
+        agent = ProfileAgent(llm_client=ScriptedLLM([]))
+        message = "Could you compare the options? " * 4
+
+        self.assertGreaterEqual(len(message), ProfileAgent.PREFILTER_MAX_CHARS)
+        self.assertTrue(agent.needs_llm(message))
+        self.assertFalse(agent.needs_llm(message[:60]))
+
+
+@unittest.skipUnless(HAVE_APP_DEPS, "requires backend venv (rag/config deps)")
+class ParseResponseTest(unittest.TestCase):
+    """Replies parse whatever wrapping the provider put around the JSON."""
+
+    def setUp(self):
+        self.agent = ProfileAgent(llm_client=ScriptedLLM([]))
+
+    def test_bare_document_with_a_fence_inside_a_string(self):
+        payload = dict(ROLE_PAYLOAD, topics=["```json snippets"])
+
+        self.assertEqual(self.agent._parse_response(json.dumps(payload)), payload)
+
+    def test_fenced_reply(self):
+        text = "```json\n" + json.dumps(ROLE_PAYLOAD) + "\n```"
+
+        self.assertEqual(self.agent._parse_response(text), ROLE_PAYLOAD)
+
+    def test_object_inside_prose(self):
+        text = "Here is the analysis: " + json.dumps(ROLE_PAYLOAD) + " Let me know!"
+
+        self.assertEqual(self.agent._parse_response(text), ROLE_PAYLOAD)
+
+    def test_content_block_list(self):
+        blocks = [{"type": "text", "text": json.dumps(ROLE_PAYLOAD)}]
+
+        self.assertEqual(self.agent._parse_response(blocks), ROLE_PAYLOAD)
+
+    def test_unparseable_reply_degrades(self):
+        self.assertEqual(
+            self.agent._parse_response("no json here"),
+            {"has_profile_info": False, "updates": []},
+        )
+
+
+@unittest.skipUnless(HAVE_APP_DEPS, "requires backend venv (rag/config deps)")
+class BulkMergeTest(unittest.TestCase):
+    """Large merges take the vectorized path and land on the loop's result."""
+
+    def _updates(self, n, seed):
+        rng = random.Random(seed)
+        fields = [f"{c}.{k}" for c in ("preference", "interest", "context") for k in "abcd"]
+        fields.append("malformed")
+        return [
+            ProfileUpdate(rng.choice(fields), f"v{i}", rng.choice([0.5, 0.6, 0.7, 0.9]), "s", f"t{i}")
+            for i in range(n)
+        ]
+
+    def _profile(self):
+        return {
+            "preference": {"a": {"value": "old", "confidence": 0.7}, "b": "legacy"},
+            "interest": {"c": {"value": "old"}},
+            "other": {"x": 1},
+        }
+
+    def test_bulk_matches_the_loop(self):
+        bulk_agent = ProfileAgent(llm_client=ScriptedLLM([]))
+        loop_agent = ProfileAgent(llm_client=ScriptedLLM([]))
+        loop_agent.BULK_MERGE_MIN = 10**9
+        for seed in range(20):
+            updates = self._updates(200, seed)
+            with self.subTest(seed=seed), self.assertLogs("agents.profile_agent", "WARNING"):
+                self.assertEqual(
+                    bulk_agent.merge_profile_updates(self._profile(), updates),
+                    loop_agent.merge_profile_updates(self._profile(), updates),
+                )
+
+    def test_bulk_does_not_mutate_the_input(self):
+        agent = ProfileAgent(llm_client=ScriptedLLM([]))
+        agent.BULK_MERGE_MIN = 1
+        profile = self._profile()
+        snapshot = json.dumps(profile, sort_keys=True)
+
+        merged = agent.merge_profile_updates(
+            profile, [ProfileUpdate("preference.a", "new", 0.9, "s")],
+        )
+
+        self.assertEqual(json.dumps(profile, sort_keys=True), snapshot)
+        self.assertEqual(merged["preference"]["a"]["value"], "new")
+        self.assertIs(merged["other"], profile["other"])
+
+    def test_batch_round_trip_interns_field_parts(self):
+        updates = [u for u in self._updates(50, 1) if u.field != "malformed"]
+
+        with self.assertNoLogs("agents.profile_agent", "WARNING"):
+            batch = ProfileUpdateBatch.from_updates(updates)
+
+        self.assertEqual(len(batch), len(updates))
+        self.assertLessEqual(len(batch.category_names), 3)
+        self.assertLessEqual(len(batch.key_names), 4)
+        self.assertEqual(batch.to_updates(), updates)
+
+    def test_field_paths_need_exactly_one_dot(self):
+        agent = ProfileAgent(llm_client=ScriptedLLM([]))
+        updates = [
+            ProfileUpdate("nodot", "x", 0.9, "s"),
+            ProfileUpdate("a.b.c", "x", 0.9, "s"),
+            ProfileUpdate("context.d", "kept", 0.9, "s"),
+        ]
+
+        with self.assertLogs("agents.profile_agent", "WARNING") as logs:
+            merged = agent.merge_profile_updates({}, updates)
+
+        self.assertEqual(merged, {"context": {"d": {
+            "value": "kept", "confidence": 0.9, "updated_at": updates[2].timestamp,
+        }}})
+        self.assertEqual(len(logs.records), 2)
+
+    def test_merge_accepts_a_batch(self):
+        agent = ProfileAgent(llm_client=ScriptedLLM([]))
+        updates = [
+            ProfileUpdate("preference.a", "low", 0.6, "s"),
+            ProfileUpdate("context.d", "first", 0.9, "s"),
+            ProfileUpdate("context.d", "tie", 0.9, "s"),
+        ]
+
+        merged = agent.merge_profile_updates(self._profile(), ProfileUpdateBatch.from_updates(updates))
+
+        self.assertEqual(merged["preference"]["a"]["value"], "old")
+        self.assertEqual(merged["context"]["d"]["value"], "first")
+
+
+class ChunkedLLM(LLMChatClient):
+    """Streams a reply in fixed-size chunks and records how far it was read."""
+
+    def __init__(self, text, size=7):
+        self.chunks = [text[i:i + size] for i in range(0, len(text), size)]
+        self.yielded = 0
+        self.closed = False
+
+    async def complete_json(self, system, user, json_schema=None):
+        raise AssertionError("the streaming path must not call complete_json")
+
+    async def complete_json_with_tools(self, system, user, tools, tool_handler,
+                                       max_tool_rounds=3):
+        raise NotImplementedError
+
+    async def stream_json(self, system, user):
+        try:
+            for chunk in self.chunks:
+                self.yielded += 1
+                yield chunk
+        finally:
+            self.closed = True
+
+
+@unittest.skipUnless(HAVE_APP_DEPS, "requires backend venv (rag/config deps)")
+class StreamingAnalysisTest(unittest.TestCase):
+    """With stream_profile_agent the reply is read up to its closing brace."""
+
+    def setUp(self):
+        self._saved = settings.stream_profile_agent
+        settings.stream_profile_agent = True
+        self._env = os.environ.get("DISABLE_CACHE")
+        os.environ["DISABLE_CACHE"] = "true"
+
+    def tearDown(self):
+        settings.stream_profile_agent = self._saved
+        if self._env is None:
+            os.environ.pop("DISABLE_CACHE", None)
+        else:
+            os.environ["DISABLE_CACHE"] = self._env
+
+    def test_same_result_as_the_blocking_call(self):
+        text = json.dumps(ROLE_PAYLOAD)
+        streamed = asyncio.run(
+            ProfileAgent(llm_client=ChunkedLLM(text)).analyze_message_async("I am a developer")
+        )
+        settings.stream_profile_agent = False
+        blocking = asyncio.run(
+            ProfileAgent(llm_client=ScriptedLLM([text])).analyze_message_async("I am a developer")
+        )
+
+        self.assertEqual(
+            [(u.field, u.value, u.confidence) for u in streamed.updates],
+            [(u.field, u.value, u.confidence) for u in blocking.updates],
+        )
+        self.assertEqual(streamed.topics, blocking.topics)
+
+    def test_stops_reading_at_the_closing_brace(self):
+        text = "```json\n" + json.dumps(ROLE_PAYLOAD) + "\n```\n" + "trailing prose " * 20
+        llm = ChunkedLLM(text)
+
+        result = asyncio.run(ProfileAgent(llm_client=llm).analyze_message_async("I am a developer"))
+
+        self.assertEqual(result.updates[0].value, "developer")
+        self.assertLess(llm.yielded, len(llm.chunks))
+        self.assertTrue(llm.closed)
+
+    def test_truncated_stream_degrades_to_no_info(self):
+        text = json.dumps(ROLE_PAYLOAD)[:40]
+
+        result = asyncio.run(
+            ProfileAgent(llm_client=ChunkedLLM(text)).analyze_message_async("I am a developer")
+        )
+
+        self.assertFalse(result.has_profile_info)
+        self.assertEqual(result.updates, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
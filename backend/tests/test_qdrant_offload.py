@@ -90,6 +90,21 @@ class SharedVectorStoreTest(VectorStoreTestCase):
         self.assertEqual(store.client.timeout, 2)
         self.assertEqual(store.async_client.timeout, 2)
 
+    def test_stores_on_one_server_share_clients(self):
+        """Another store reuses the open connections instead of adding pools."""
+        module = self.load(
+            self._server(), fake_settings(qdrant_prefer_grpc=True, qdrant_grpc_port=16334)
+        )
+        first = module.QdrantVectorStore(embedder=MockEmbedder(dim=768))
+        second = module.QdrantVectorStore(collection_name="other", embedder=MockEmbedder(dim=768))
+        elsewhere = module.QdrantVectorStore(host="qdrant-2", embedder=MockEmbedder(dim=768))
+
+        self.assertIs(first.client, second.client)
+        self.assertIs(first.async_client, second.async_client)
+        self.assertIsNot(first.client, elsewhere.client)
+        self.assertTrue(first.client.prefer_grpc and first.async_client.prefer_grpc)
+        self.assertEqual((first.client.grpc_port, first.async_client.grpc_port), (16334, 16334))
+
     def _server(self):
         return FakeQdrantServer()
 
@@ -192,5 +207,21 @@ class DocumentRoutesOffEventLoopTest(unittest.TestCase):
                 )
 
 
+@unittest.skipUnless(HAVE_APP, "fastapi not installed (runs in the venv)")
+class IngestReusesTheStoreEmbedderTest(unittest.TestCase):
+    def test_chunker_embeds_with_the_store_client(self):
+        store = mock.Mock(embed_model=MockEmbedder())
+        store.index_chunks.return_value = 2
+        chunker = mock.Mock()
+        chunker.chunk_text.return_value = ["a", "b"]
+
+        with mock.patch.object(main, "get_vector_store", return_value=store), \
+                mock.patch.object(main, "create_chunker", return_value=chunker) as create:
+            result = main._chunk_and_index("text", {}, "doc", "acme")
+
+        create.assert_called_once_with(embed_model=store.embed_model)
+        self.assertEqual(result, (2, 2))
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -204,7 +204,7 @@ class SupportAgentsMigrationTest(unittest.TestCase):
         agent = ProfileAgent(llm_client=llm)
 
         first = asyncio.run(agent.analyze_message_async("I am a developer FIRST-MARKER"))
-        asyncio.run(agent.analyze_message_async("what is the weather"))
+        asyncio.run(agent.analyze_message_async("I work in retail"))
 
         self.assertTrue(first.has_profile_info)
         self.assertEqual(first.updates[0].value, "dev")
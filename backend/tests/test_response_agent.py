@@ -0,0 +1,249 @@
+"""
+Tests for the ResponseAgent and the data it builds prompts from.
+
+Runnable with `python3 -m unittest discover -s tests` from backend/.
+The agent tests need the app deps (backend venv); they skip in the
+pure-stdlib shell interpreter.
+"""
+
+import asyncio
+import json
+import os
+import unittest
+from types import SimpleNamespace
+
+from llm.base import LLMChatClient
+
+try:  # app-level deps: available in the backend venv, not in the shell python
+    from agents.response_agent import ResponseAgent, UserProfile
+    from config import settings
+    HAVE_APP_DEPS = True
+except ImportError:
+    HAVE_APP_DEPS = False
+
+
+@unittest.skipUnless(HAVE_APP_DEPS, "requires backend venv (rag/config deps)")
+class ProfileContextTest(unittest.TestCase):
+    """The profile reaches the prompt as one titled list per category."""
+
+    def test_sections_in_order(self):
+        profile = UserProfile.from_dict({
+            "userId": "u1",
+            "demographic": {
+                "name": {"value": "Marco", "confidence": 0.9},
+                "age": {"value": 40, "confidence": 0.7},  # not above 0.7: left out
+                "role": "developer",
+            },
+            "interests": {"music": {"value": "jazz", "confidence": 0.2}},
+            "behavior": {"pace": "fast"},
+            "history_summary": "asked about pricing",
+        })
+
+        self.assertEqual(profile.to_context(), (
+            "User Demographics:\n- name: Marco\n- role: developer\n\n"
+            "User Interests:\n- music: jazz\n\n"
+            "Observed Behavior:\n- pace: fast\n\n"
+            "Interaction History: asked about pricing"
+        ))
+
+    def test_empty_sections_are_skipped(self):
+        profile = UserProfile.from_dict({
+            "demographic": {"age": {"value": 40, "confidence": 0.5}},
+        })
+        self.assertEqual(profile.to_context(), "No user profile available.")
+
+    def test_built_once_per_instance(self):
+        profile = UserProfile.from_dict({"interests": {"music": "jazz"}})
+
+        self.assertIs(profile.to_context(), profile.context_str)
+        self.assertIs(profile.context_str, profile.context_str)
+
+    def test_slotted_and_cache_outside_equality(self):
+        first = UserProfile.from_dict({"interests": {"music": "jazz"}})
+        second = UserProfile.from_dict({"interests": {"music": "jazz"}})
+        first.to_context()
+
+        self.assertFalse(hasattr(first, "__dict__"))
+        self.assertEqual(first, second)
+
+
+ANSWER = {"text_response": "hi", "components": [{"type": "text", "data": {}}], "confidence": 0.8}
+
+
+@unittest.skipUnless(HAVE_APP_DEPS, "requires backend venv (rag/config deps)")
+class ParseResponseTest(unittest.TestCase):
+    """Every reply shape becomes an answer object; nothing raises."""
+
+    def setUp(self):
+        self.agent = ResponseAgent(vector_store=object(), llm_client=object())
+
+    def test_bare_fenced_and_prose_wrapped(self):
+        text = json.dumps(ANSWER)
+        for reply in (text, f"```json\n{text}\n```", f"```\n{text}\n```",
+                      f"Here you go: {text} Hope it helps.", text.encode(), ANSWER):
+            with self.subTest(reply=reply):
+                self.assertEqual(self.agent._parse_response(reply), ANSWER)
+
+    def test_bare_array_is_the_components(self):
+        parsed = self.agent._parse_response('[{"type": "text", "data": {}}]')
+        self.assertEqual(parsed["components"], [{"type": "text", "data": {}}])
+        self.assertEqual(parsed["text_response"], "")
+
+    def test_plain_text_becomes_the_answer(self):
+        for reply in ("Sorry, I can't answer that.", '"just a string"',
+                      "Paris is the capital of France [1]."):
+            with self.subTest(reply=reply):
+                parsed = self.agent._parse_response(reply)
+                self.assertEqual(parsed["text_response"], reply)
+                self.assertEqual(parsed["components"], [])
+
+
+class _OneDocStore:
+    async def search_async(self, query=None, top_k=None, tenant=None, **kwargs):
+        return [SimpleNamespace(
+            content="Login uses SSO.", score=0.9, chunk_id="c1",
+            metadata={"source_document": "auth.md", "url": ""},
+        )]
+
+
+@unittest.skipUnless(HAVE_APP_DEPS, "requires backend venv (rag/config deps)")
+class DefaultSourcesTest(unittest.TestCase):
+    """The retrieved documents are the sources only when the model names none."""
+
+    def setUp(self):
+        self._env = os.environ.get("DISABLE_CACHE")
+        os.environ["DISABLE_CACHE"] = "true"
+
+    def tearDown(self):
+        if self._env is None:
+            os.environ.pop("DISABLE_CACHE", None)
+        else:
+            os.environ["DISABLE_CACHE"] = self._env
+
+    def answer(self, **reply):
+        llm = ChunkedLLM({"text_response": "SSO.", "components": [], "confidence": 0.8, **reply})
+        agent = ResponseAgent(model="test", vector_store=_OneDocStore(), llm_client=llm)
+        return asyncio.run(agent.process_query_async("how do I log in?"))
+
+    def test_missing_or_null_sources_default_to_the_retrieval(self):
+        for reply in ({}, {"sources": None}):
+            with self.subTest(reply=reply):
+                self.assertEqual(self.answer(**reply).sources, [{"title": "auth.md", "url": ""}])
+
+    def test_model_sources_are_kept(self):
+        self.assertEqual(self.answer(sources=[]).sources, [])
+        self.assertEqual(
+            self.answer(sources=[{"title": "Guide", "url": ""}]).sources,
+            [{"title": "Guide", "url": ""}],
+        )
+
+
+STREAMED_ANSWER = {
+    "text_response": "See [the docs](https://ok.example/docs) and [this](https://evil.example/x).",
+    "components": [
+        {"type": "text", "data": {"content": "First {braces} inside"}},
+        {"type": "no_such_type", "data": {}},
+        {"type": "stats_banner", "data": {"stats": [
+            {"value": "99.9", "label": "Uptime"},
+            {"value": "5M", "label": "Users"},
+        ]}},
+        {"type": "buttons", "data": {"buttons": [
+            {"label": "Docs", "url": "https://ok.example/docs"},
+            {"label": "Evil", "url": "https://evil.example/x"},
+        ]}},
+    ],
+    "sources": [],
+    "confidence": 0.8,
+    "suggested_actions": ["Read more"],
+}
+
+
+class ChunkedLLM(LLMChatClient):
+    """The same reply whole (tool loop) or in small chunks (stream)."""
+
+    def __init__(self, reply, size=9):
+        self.text = json.dumps(reply)
+        self.size = size
+        self.fail = False
+
+    async def complete_json(self, system, user, json_schema=None):
+        return self.text
+
+    async def complete_json_with_tools(self, system, user, tools, tool_handler,
+                                       max_tool_rounds=3):
+        return self.text
+
+    async def stream_json(self, system, user):
+        if self.fail:
+            raise RuntimeError("provider down")
+        for i in range(0, len(self.text), self.size):
+            yield self.text[i:i + self.size]
+
+
+class _EmptyStore:
+    async def search_async(self, query=None, top_k=None, tenant=None, **kwargs):
+        return []
+
+
+async def _collect(stream):
+    return [event async for event in stream]
+
+
+@unittest.skipUnless(HAVE_APP_DEPS, "requires backend venv (rag/config deps)")
+class StreamingQueryTest(unittest.TestCase):
+    """Components leave one by one, checked exactly like the buffered answer."""
+
+    QUERY = "Is https://ok.example/docs right about the 99.9 uptime?"
+
+    def setUp(self):
+        for name, value in [("numeric_grounding_enabled", True), ("url_whitelist_enabled", True)]:
+            self.addCleanup(setattr, settings, name, getattr(settings, name))
+            setattr(settings, name, value)
+        self._env = os.environ.get("DISABLE_CACHE")
+        os.environ["DISABLE_CACHE"] = "true"
+        self.llm = ChunkedLLM(STREAMED_ANSWER)
+        self.agent = ResponseAgent(model="test", vector_store=_EmptyStore(), llm_client=self.llm)
+
+    def tearDown(self):
+        if self._env is None:
+            os.environ.pop("DISABLE_CACHE", None)
+        else:
+            os.environ["DISABLE_CACHE"] = self._env
+
+    def test_components_then_complete(self):
+        events = asyncio.run(_collect(self.agent.process_query_stream_async(self.QUERY)))
+
+        self.assertEqual(
+            [e["type"] for e in events], ["component", "component", "component", "complete"]
+        )
+        response = events[-1]["response"]
+        self.assertEqual(
+            [e["component"] for e in events[:-1]],
+            [c.to_dict() for c in response.components],
+        )
+
+    def test_same_answer_as_the_buffered_path(self):
+        streamed = asyncio.run(_collect(self.agent.process_query_stream_async(self.QUERY)))[-1]["response"]
+        buffered = asyncio.run(self.agent.process_query_async(self.QUERY))
+
+        streamed.disclosure.pop("generated_at")
+        buffered.disclosure.pop("generated_at")
+        # Validated one at a time, so the message names index 0 of each batch
+        self.assertEqual(len(streamed.sanitization.pop("dropped_components")), 1)
+        self.assertEqual(len(buffered.sanitization.pop("dropped_components")), 1)
+        self.assertEqual(streamed.to_dict(), buffered.to_dict())
+        self.assertNotIn("evil.example", streamed.text_response)
+        self.assertEqual(streamed.sanitization["removed_numbers"], ["5M"])
+        self.assertIn("https://evil.example/x", streamed.sanitization["removed_urls"])
+
+    def test_failure_is_one_complete_event(self):
+        self.llm.fail = True
+
+        events = asyncio.run(_collect(self.agent.process_query_stream_async(self.QUERY)))
+
+        self.assertEqual([e["type"] for e in events], ["complete"])
+        self.assertEqual(events[0]["response"].confidence, 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,256 @@
+"""
+Tests for the semantic answer cache.
+
+A reworded question gets the earlier answer without a search or a model
+call, but only inside one (tenant, profile, history) scope: these tests
+pin both the hit and everything that must stay a miss.
+
+Runnable with `python3 -m unittest discover -s tests` from backend/.
+The agent tests need the app deps (backend venv); they skip in the
+pure-stdlib shell interpreter.
+"""
+
+import asyncio
+import json
+import os
+import unittest
+
+import numpy as np
+
+from llm.base import LLMChatClient
+from utils.cache import clear_cache
+from utils.semantic_cache import ProximityCache
+
+try:  # app-level deps: available in the backend venv, not in the shell python
+    from agents.response_agent import ResponseAgent
+    from config import settings
+    HAVE_APP_DEPS = True
+except ImportError:
+    HAVE_APP_DEPS = False
+
+
+class ProximityCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.cache = ProximityCache(capacity=3)
+
+    def test_hit_above_threshold_only(self):
+        self.cache.put("s", [1.0, 0.0], "login answer")
+
+        self.assertEqual(self.cache.get("s", [0.99, 0.05], 0.95), "login answer")
+        self.assertIsNone(self.cache.get("s", [0.5, 0.5], 0.95))
+
+    def test_scale_does_not_matter(self):
+        self.cache.put("s", [2.0, 0.0], "a")
+        self.assertEqual(self.cache.get("s", [10.0, 0.0], 0.99), "a")
+
+    def test_scopes_never_mix(self):
+        self.cache.put("tenant-a", [1.0, 0.0], "a")
+        self.cache.put("tenant-b", [0.0, 1.0], "b")
+
+        self.assertIsNone(self.cache.get("tenant-b", [1.0, 0.0], 0.5))
+        self.assertIsNone(self.cache.get("tenant-c", [1.0, 0.0], 0.5))
+        self.assertEqual(self.cache.get("tenant-a", [1.0, 0.0], 0.5), "a")
+
+    def test_least_recently_used_is_evicted(self):
+        for i, vector in enumerate(np.eye(3)):
+            self.cache.put("s", vector, i)
+        self.cache.get("s", [1.0, 0.0, 0.0], 0.9)  # 0 is now the most recent
+
+        self.cache.put("s", [1.0, 1.0, 0.0], "new")
+
+        self.assertEqual(len(self.cache), 3)
+        self.assertEqual(self.cache.get("s", [1.0, 0.0, 0.0], 0.99), 0)
+        self.assertIsNone(self.cache.get("s", [0.0, 1.0, 0.0], 0.99))
+
+    def test_evicted_scopes_are_forgotten(self):
+        for i in range(10):
+            self.cache.put(f"conversation-{i}", [1.0, float(i)], i)
+        self.assertLessEqual(len(self.cache._scope_ids), 3)
+
+    def test_cleared_with_the_global_cache(self):
+        self.cache.put("s", [1.0, 0.0], "a")
+        clear_cache()
+        self.assertEqual(len(self.cache), 0)
+        self.assertIsNone(self.cache.get("s", [1.0, 0.0], 0.5))
+
+    def test_degenerate_or_mismatched_vectors_miss(self):
+        self.cache.put("s", [0.0, 0.0], "zero")
+        self.assertEqual(len(self.cache), 0)
+        self.cache.put("s", [1.0, 0.0], "a")
+        self.assertIsNone(self.cache.get("s", [1.0, 0.0, 0.0], 0.5))
+
+
+class QuantizedProximityCacheTest(ProximityCacheTest):
+    """The same behavior with int8 rows."""
+
+    def setUp(self):
+        self.cache = ProximityCache(capacity=3, quantize=True)
+
+    def test_scores_stay_close_to_float32(self):
+        rng = np.random.default_rng(3)
+        vectors = rng.standard_normal((64, 1536)).astype(np.float32)
+        exact = ProximityCache(capacity=64)
+        quantized = ProximityCache(capacity=64, quantize=True)
+        for i, vector in enumerate(vectors):
+            exact.put("s", vector, i)
+            quantized.put("s", vector, i)
+        self.assertEqual(quantized._vectors.dtype, np.int8)
+
+        query = vectors[0] + 0.2 * rng.standard_normal(1536)
+        query /= np.linalg.norm(query)
+        difference = quantized._scores(slice(0, 64), query) - exact._scores(slice(0, 64), query)
+        self.assertLess(np.abs(difference).max(), 2e-3)
+
+
+class LshIndexTest(unittest.TestCase):
+    """Past scan_max_rows, lookups probe the LSH buckets instead of scanning."""
+
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.vectors = rng.standard_normal((200, 64)).astype(np.float32)
+        self.cache = ProximityCache(capacity=200, scan_max_rows=0)
+        for i, vector in enumerate(self.vectors):
+            self.cache.put("s", vector, i)
+
+    def test_exact_and_near_duplicates_are_found(self):
+        rng = np.random.default_rng(8)
+        found = 0
+        for i in range(50):
+            query = self.vectors[i] + 0.02 * np.linalg.norm(self.vectors[i]) * rng.standard_normal(64)
+            found += self.cache.get("s", query, 0.9) == i
+            self.assertEqual(self.cache.get("s", self.vectors[i], 0.99), i)
+        self.assertGreaterEqual(found, 45)
+
+    def test_buckets_are_per_scope(self):
+        self.assertIsNone(self.cache.get("other", self.vectors[0], 0.5))
+        self.cache.put("other", self.vectors[0], "other")
+        self.assertEqual(self.cache.get("other", self.vectors[0], 0.99), "other")
+        self.assertIsNone(self.cache.get("other", self.vectors[1], 0.99))
+
+    def test_evicted_rows_leave_the_index(self):
+        cache = ProximityCache(capacity=2, scan_max_rows=0)
+        cache.put("s", [1.0, 0.0, 0.0], "a")
+        cache.put("s", [0.0, 1.0, 0.0], "b")
+        cache.put("s", [0.0, 0.0, 1.0], "c")  # evicts "a"
+
+        self.assertIsNone(cache.get("s", [1.0, 0.0, 0.0], 0.5))
+        indexed = set().union(*(rows for bucket in cache._buckets for rows in bucket.values()))
+        self.assertEqual(indexed, {0, 1})
+
+
+class CountingLLM(LLMChatClient):
+    def __init__(self):
+        self.calls = 0
+
+    async def complete_json(self, system, user, json_schema=None):
+        raise NotImplementedError
+
+    async def complete_json_with_tools(self, system, user, tools, tool_handler,
+                                       max_tool_rounds=3):
+        self.calls += 1
+        return json.dumps({
+            "text_response": f"answer {self.calls}", "components": [], "sources": [],
+            "confidence": 0.9, "suggested_actions": [],
+        })
+
+    async def stream_json(self, system, user):
+        yield ""
+
+
+class EmbeddingStore:
+    """Vector store stand-in: queries embed to the vectors given here."""
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+        self.searches = 0
+        self.embeds = 0
+        self.search_vectors = []
+
+    async def embed_query_async(self, query):
+        self.embeds += 1
+        return self.vectors[query]
+
+    async def search_async(self, query=None, top_k=None, score_threshold=None,
+                           filters=None, tenant=None, query_vector=None):
+        self.searches += 1
+        self.search_vectors.append(query_vector)
+        return []
+
+
+@unittest.skipUnless(HAVE_APP_DEPS, "requires backend venv (rag/config deps)")
+class ResponseAgentCacheTest(unittest.TestCase):
+    VECTORS = {
+        "how does login work?": [1.0, 0.0, 0.0],
+        "how do I log in?": [0.98, 0.1, 0.0],
+        "what does it cost?": [0.0, 1.0, 0.0],
+    }
+
+    def setUp(self):
+        self._saved = settings.response_cache_similarity
+        settings.response_cache_similarity = 0.95
+        self._env = os.environ.pop("DISABLE_CACHE", None)
+        self.llm = CountingLLM()
+        self.store = EmbeddingStore(self.VECTORS)
+        self.agent = ResponseAgent(vector_store=self.store, llm_client=self.llm)
+
+    def tearDown(self):
+        settings.response_cache_similarity = self._saved
+        if self._env is not None:
+            os.environ["DISABLE_CACHE"] = self._env
+
+    def ask(self, query, **kwargs):
+        return asyncio.run(self.agent.process_query_async(query, **kwargs))
+
+    def test_paraphrase_is_answered_from_the_cache(self):
+        first = self.ask("how does login work?")
+        second = self.ask("how do I log in?")
+
+        self.assertIs(second, first)
+        self.assertEqual((self.llm.calls, self.store.searches), (1, 1))
+
+    def test_a_miss_embeds_the_query_once(self):
+        self.ask("how does login work?")
+
+        self.assertEqual(self.store.embeds, 1)
+        self.assertEqual(self.store.search_vectors, [self.VECTORS["how does login work?"]])
+
+    def test_different_question_misses(self):
+        self.ask("how does login work?")
+        self.assertEqual(self.ask("what does it cost?").text_response, "answer 2")
+
+    def test_scope_is_tenant_profile_and_history(self):
+        self.ask("how does login work?", tenant="acme")
+        self.ask("how do I log in?", tenant="globex")
+        self.ask("how do I log in?", tenant="acme",
+                 user_profile={"demographic": {"role": "developer"}})
+        self.ask("how do I log in?", tenant="acme",
+                 conversation_history=[{"role": "user", "content": "hi"}])
+
+        self.assertEqual(self.llm.calls, 4)
+
+    def test_off_by_default_and_by_disable_cache(self):
+        settings.response_cache_similarity = 0.0
+        self.ask("how does login work?")
+        self.ask("how does login work?")
+        settings.response_cache_similarity = 0.95
+        os.environ["DISABLE_CACHE"] = "true"
+        self.ask("how does login work?")
+        self.ask("how does login work?")
+
+        self.assertEqual(self.llm.calls, 4)
+
+    def test_fallback_answers_are_not_cached(self):
+        class FailingLLM(CountingLLM):
+            async def complete_json_with_tools(self, *args, **kwargs):
+                self.calls += 1
+                raise RuntimeError("provider down")
+
+        self.agent.llm = FailingLLM()
+        self.ask("how does login work?")
+        self.ask("how does login work?")
+
+        self.assertEqual(self.agent.llm.calls, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
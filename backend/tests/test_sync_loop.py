@@ -0,0 +1,74 @@
+"""
+Tests for the persistent event loop behind the agents' sync wrappers.
+Runnable with pytest or `python3 -m unittest discover -s tests` from backend/.
+"""
+
+import asyncio
+import threading
+import unittest
+
+from utils.sync_loop import run_sync
+
+
+async def _current_loop():
+    return asyncio.get_running_loop()
+
+
+class TestRunSync(unittest.TestCase):
+    def test_returns_the_result(self):
+        async def add(a, b):
+            await asyncio.sleep(0)
+            return a + b
+
+        self.assertEqual(run_sync(add(2, 3)), 5)
+
+    def test_loop_is_reused_across_calls(self):
+        first = run_sync(_current_loop())
+        second = run_sync(_current_loop())
+
+        self.assertIs(first, second)
+        self.assertFalse(first.is_closed())
+
+    def test_one_loop_for_all_threads(self):
+        main_loop = run_sync(_current_loop())
+        seen = []
+        workers = [
+            threading.Thread(target=lambda: seen.append(run_sync(_current_loop())))
+            for _ in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(len(seen), 4)
+        for loop in seen:
+            self.assertIs(loop, main_loop)
+
+    def test_runs_off_the_calling_thread(self):
+        async def thread_name():
+            return threading.current_thread().name
+
+        self.assertNotEqual(run_sync(thread_name()), threading.current_thread().name)
+
+    def test_refuses_inside_a_running_loop(self):
+        async def call_sync():
+            coro = _current_loop()
+            with self.assertRaises(RuntimeError):
+                run_sync(coro)
+            # Closed, so no "coroutine was never awaited" warning later
+            self.assertIsNone(coro.cr_frame)
+
+        asyncio.run(call_sync())
+
+    def test_exceptions_propagate(self):
+        async def boom():
+            raise ValueError("boom")
+
+        with self.assertRaises(ValueError):
+            run_sync(boom())
+        self.assertFalse(run_sync(_current_loop()).is_closed())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,195 @@
+"""
+Tests for the ZoneAgent: its prompt, the inputs it is built from, and
+how replies are read.
+
+Provider prompt caches reuse the longest identical prefix, so the
+prompt opens with what a zone shares across renders and ends with what
+changes per user: the retrieved content before the profile, the
+behavior last. The inputs that need I/O (retrieval, content policy)
+are fetched concurrently.
+
+Runnable with `python3 -m unittest discover -s tests` from backend/.
+The agent tests need the app deps (backend venv); they skip in the
+pure-stdlib shell interpreter.
+"""
+
+import asyncio
+import json
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+try:  # app-level deps: available in the backend venv, not in the shell python
+    from agents.zone_agent import ZoneAgent, ZoneRenderRequest, ZoneRenderResult
+    HAVE_APP_DEPS = True
+except ImportError:
+    HAVE_APP_DEPS = False
+
+
+def _request(**overrides):
+    fields = dict(
+        zone_id="hero",
+        base_prompt="Introduce the product",
+        context_prompt=None,
+        pinned_content=[],
+        preferred_component_type=None,
+        max_items=6,
+        current_page="/",
+        page_metadata={"b": 2, "a": 1},
+        user_profile={"interests": {"ai": {"value": True, "confidence": 0.9}}},
+        behavior_data={"maxScrollDepth": 40},
+    )
+    fields.update(overrides)
+    return ZoneRenderRequest(**fields)
+
+
+RETRIEVED = [SimpleNamespace(content="GenUI renders zones.", metadata={"source_document": "intro.md"})]
+
+
+@unittest.skipUnless(HAVE_APP_DEPS, "requires backend venv (rag/config deps)")
+class ZonePromptLayoutTest(unittest.TestCase):
+    def setUp(self):
+        self.agent = ZoneAgent.__new__(ZoneAgent)
+
+    def test_stable_sections_first_behavior_last(self):
+        prompt = self.agent._build_zone_prompt(_request(), RETRIEVED)
+
+        positions = [prompt.index(tag) for tag in (
+            "<zone_purpose>", "<available_content>", "<user_profile>", "<user_behavior>",
+        )]
+        self.assertEqual(positions, sorted(positions))
+
+    def test_a_behavior_change_keeps_the_prefix(self):
+        first = self.agent._build_zone_prompt(_request(), RETRIEVED)
+        second = self.agent._build_zone_prompt(_request(behavior_data={"maxScrollDepth": 90}), RETRIEVED)
+
+        prefix = first[:first.index("<user_behavior>")]
+        self.assertTrue(second.startswith(prefix))
+
+    def test_profile_summary_takes_the_first_entries_only(self):
+        interests = {f"topic-{i}": {"value": f"t{i}", "confidence": 0.9} for i in range(1000)}
+
+        summary = self.agent._summarize_profile({"interests": interests})
+
+        self.assertEqual(summary, "Interests: t0, t1, t2, t3, t4")
+
+    def test_page_metadata_order_does_not_matter(self):
+        self.assertEqual(
+            self.agent._build_zone_prompt(_request(page_metadata={"b": 2, "a": 1}), []),
+            self.agent._build_zone_prompt(_request(page_metadata={"a": 1, "b": 2}), []),
+        )
+
+    def test_long_page_metadata_values_are_left_out(self):
+        metadata = {
+            "pageType": "product",
+            "breadcrumbs": [f"/section-{i}" for i in range(100)],
+        }
+
+        prompt = self.agent._build_zone_prompt(_request(page_metadata=metadata), [])
+
+        self.assertIn('Page Context: {"pageType":"product"}', prompt)
+
+
+class _SlowStore:
+    def __init__(self, events):
+        self.events = events
+
+    async def search_async(self, query=None, top_k=None, tenant=None, **kwargs):
+        self.events.append("search started")
+        await asyncio.sleep(0.01)
+        self.events.append("search done")
+        return RETRIEVED
+
+
+class _RecordingStore:
+    def __init__(self):
+        self.top_k = []
+
+    async def search_async(self, query=None, top_k=None, tenant=None, **kwargs):
+        self.top_k.append(top_k)
+        return RETRIEVED
+
+
+@unittest.skipUnless(HAVE_APP_DEPS, "requires backend venv (rag/config deps)")
+class ZoneInputsTest(unittest.TestCase):
+    def test_retrieval_and_policy_overlap(self):
+        events = []
+
+        async def policy(tenant, env_raw):
+            events.append("policy started")
+            await asyncio.sleep(0.01)
+            events.append("policy done")
+            return "policy"
+
+        agent = ZoneAgent.__new__(ZoneAgent)
+        agent.vector_store = _SlowStore(events)
+        with mock.patch("agents.zone_agent.effective_policy", policy):
+            retrieved, loaded = asyncio.run(agent._gather_inputs(_request()))
+
+        self.assertEqual((retrieved, loaded), (RETRIEVED, "policy"))
+        self.assertEqual(events[:2], ["search started", "policy started"])
+
+    def test_retrieval_scales_with_max_items(self):
+        agent = ZoneAgent.__new__(ZoneAgent)
+        agent.vector_store = _RecordingStore()
+        for max_items in (1, 3, 6, 20):
+            asyncio.run(agent._retrieve_results(_request(max_items=max_items)))
+
+        self.assertEqual(agent.vector_store.top_k, [4, 6, 10, 10])
+
+    def test_context_budget_scales_with_max_items(self):
+        agent = ZoneAgent.__new__(ZoneAgent)
+        # Four chunks of ~150 tokens: a 3-item zone keeps what fits 600
+        retrieved = [
+            SimpleNamespace(content=f"chunk {i} " + "x" * 600, metadata={"source_document": f"{i}.md"})
+            for i in range(4)
+        ]
+        with mock.patch("agents.zone_agent.settings.chunk_size", 512):
+            small = agent._build_zone_prompt(_request(max_items=3), retrieved)
+            large = agent._build_zone_prompt(_request(max_items=8), retrieved)
+
+        self.assertIn("chunk 2", small)
+        self.assertNotIn("chunk 3", small)
+        self.assertIn("chunk 3", large)
+
+
+@unittest.skipUnless(HAVE_APP_DEPS, "requires backend venv (rag/config deps)")
+class ZoneParseResponseTest(unittest.TestCase):
+    def setUp(self):
+        self.agent = ZoneAgent.__new__(ZoneAgent)
+
+    def test_bare_fenced_and_prose_wrapped(self):
+        reply = {"components": [{"type": "text", "data": {}}], "confidence": 0.7}
+        text = json.dumps(reply)
+        for wrapped in (text, f"```json\n{text}\n```", f"Here is the zone: {text}"):
+            with self.subTest(wrapped=wrapped):
+                self.assertEqual(self.agent._parse_response(wrapped), reply)
+
+    def test_bare_array_is_the_components(self):
+        self.assertEqual(
+            self.agent._parse_response('[{"type": "text", "data": {}}]'),
+            {"components": [{"type": "text", "data": {}}]},
+        )
+
+    def test_unusable_replies_are_empty(self):
+        for reply in ("no json at all", '"a string"', "42", None):
+            with self.subTest(reply=reply):
+                self.assertEqual(self.agent._parse_response(reply), {})
+
+
+@unittest.skipUnless(HAVE_APP_DEPS, "requires backend venv (rag/config deps)")
+class ZoneDataSlotsTest(unittest.TestCase):
+    """Built per render: slotted, no __dict__."""
+
+    def test_no_instance_dict(self):
+        result = ZoneRenderResult(
+            components=[], pinned_content_included=[], personalization_applied=False,
+            confidence=0.5, reasoning="",
+        )
+        for obj in (_request(), result):
+            with self.subTest(type=type(obj).__name__):
+                self.assertFalse(hasattr(obj, "__dict__"))
+
+
+if __name__ == "__main__":
+    unittest.main()
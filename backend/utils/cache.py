@@ -3,49 +3,68 @@ Caching utilities for LLM responses and RAG results.
 """
 
 import hashlib
+import inspect
 import json
 import logging
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from dataclasses import fields, is_dataclass
+from enum import Enum
 from typing import Any, Callable, Optional
 from functools import wraps
 import os
 
+from .redis_conn import shared_redis
+
 logger = logging.getLogger(__name__)
 
 
 class SimpleMemoryCache:
-    """Simple in-memory cache with LRU-like behavior."""
+    """
+    Simple in-memory LRU cache.
+
+    An OrderedDict keeps the recency order, so a hit or an eviction is
+    O(1); the old access-order list was rescanned on every hit. Locked:
+    the sync wrapper of @cacheable can run on threadpool threads next to
+    the event loop.
+    """
     
     def __init__(self, max_size: int = 1000):
-        self._cache: dict[str, Any] = {}
+        self._cache: OrderedDict[str, Any] = OrderedDict()
         self._max_size = max_size
-        self._access_order: list[str] = []
+        self._lock = threading.Lock()
     
     def get(self, key: str) -> Optional[Any]:
-        """Get value from cache."""
-        if key in self._cache:
+        """Get value from cache (None when missing or expired)."""
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and time.monotonic() >= expires_at:
+                del self._cache[key]
+                return None
             # Move to end (most recently used)
-            if key in self._access_order:
-                self._access_order.remove(key)
-            self._access_order.append(key)
-            return self._cache[key]
-        return None
+            self._cache.move_to_end(key)
+            return value
     
-    def set(self, key: str, value: Any) -> None:
-        """Set value in cache with LRU eviction."""
-        if key not in self._cache and len(self._cache) >= self._max_size:
-            # Evict least recently used
-            oldest = self._access_order.pop(0)
-            del self._cache[oldest]
-        
-        self._cache[key] = value
-        if key in self._access_order:
-            self._access_order.remove(key)
-        self._access_order.append(key)
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Set value in cache with LRU eviction; ttl in seconds, None = no expiry."""
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+            elif len(self._cache) >= self._max_size:
+                # Evict least recently used
+                self._cache.popitem(last=False)
+            self._cache[key] = (expires_at, value)
     
     def clear(self) -> None:
         """Clear all cache."""
-        self._cache.clear()
-        self._access_order.clear()
+        with self._lock:
+            self._cache.clear()
     
     def size(self) -> int:
         """Get current cache size."""
@@ -55,22 +74,148 @@ class SimpleMemoryCache:
 # Global cache instance
 _global_cache = SimpleMemoryCache(max_size=1000)
 
+# Redis behind @cacheable(shared=True); None = per-process only
+_shared_url: Optional[str] = None
+_SHARED_PREFIX = "genui:cache:"
+
+
+def use_shared_cache(redis_url: Optional[str]) -> None:
+    """
+    Back @cacheable(shared=True) results with Redis, so every worker
+    reuses a result any of them computed. The in-process LRU stays in
+    front of it: a hot key costs no round-trip. Fail-open like the other
+    Redis stores: while Redis is unavailable the decorator is per-process.
+    """
+    global _shared_url
+    _shared_url = redis_url or None
+
+
+async def _shared_get(key: str) -> Optional[Any]:
+    conn = shared_redis(_shared_url)
+    redis = await conn.get()
+    if redis is None:
+        return None
+    try:
+        raw = await redis.get(_SHARED_PREFIX + key)
+    except Exception as e:
+        await conn.mark_failure(e)
+        return None
+    if raw is None:
+        return None
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return None
+
+
+def _plain(value: Any) -> Any:
+    # numpy arrays (embeddings) are stored as lists and read back as lists
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    raise TypeError(type(value).__name__)
+
+
+async def _shared_set(key: str, value: Any, ttl: Optional[int]) -> None:
+    try:
+        raw = json.dumps(value, default=_plain)
+    except (TypeError, ValueError):
+        logger.debug("Not sharing a %s result: not JSON", type(value).__name__)
+        return
+    conn = shared_redis(_shared_url)
+    redis = await conn.get()
+    if redis is None:
+        return
+    try:
+        await redis.set(_SHARED_PREFIX + key, raw, ex=ttl)
+    except Exception as e:
+        await conn.mark_failure(e)
+
+
+def _seq(tag: str, parts) -> str:
+    # Length-prefixed, so nested parts cannot run together either
+    return tag + "[" + "".join(f"{len(part)}:{part}" for part in parts) + "]"
+
+
+def _key_part(value: Any) -> str:
+    """
+    Canonical, type-tagged text of one argument, the same in every process.
+
+    str() was not: an object's default repr carries its memory address
+    (a miss in every other worker, and a wrong hit once the address is
+    reused), a dict's depends on insertion order, and "1", 1 and True
+    shared a key. Objects the cache cannot read raise TypeError: give them
+    a __cache_key__() method or pass key_func.
+    """
+    if value is None or isinstance(value, (bool, int, float)):
+        return f"{type(value).__name__}:{value!r}"
+    if isinstance(value, Enum):
+        return f"{type(value).__qualname__}.{value.name}"
+    if isinstance(value, str):
+        return "str:" + value
+    if isinstance(value, (bytes, bytearray)):
+        return "bytes:" + value.hex()
+
+    # A vector (a precomputed query embedding) is keyed by its float64
+    # bytes. Its text form abbreviates long numpy arrays with "..." (two
+    # different vectors would share a key) and, for a 1536-float list,
+    # took ~2ms to format on every cached search; the bytes take ~60us.
+    # A list and an array of the same values share a key, as before
+    dtype = getattr(value, "dtype", None)
+    if dtype is not None and getattr(dtype, "kind", None) in ("f", "i", "u"):
+        packed = value.astype("float64").tobytes()
+        return f"f64{value.shape}:" + hashlib.blake2b(packed, digest_size=16).hexdigest()
+    if isinstance(value, (list, tuple)) and value and isinstance(value[0], float):
+        try:
+            packed = array("d", value).tobytes()
+        except TypeError:
+            pass  # not all numbers
+        else:
+            return f"f64({len(value)},):" + hashlib.blake2b(packed, digest_size=16).hexdigest()
+
+    if isinstance(value, (list, tuple)):
+        return _seq("seq", map(_key_part, value))
+    if isinstance(value, dict):
+        items = sorted((_key_part(k), _key_part(v)) for k, v in value.items())
+        return _seq("map", (f"{len(k)}:{k}{v}" for k, v in items))
+    if isinstance(value, (set, frozenset)):
+        return _seq("set", sorted(map(_key_part, value)))
+
+    kind = type(value)
+    name = f"{kind.__module__}.{kind.__qualname__}"
+    if hasattr(value, "__cache_key__"):
+        return name + _key_part(value.__cache_key__())
+    if is_dataclass(value):
+        return name + _key_part({f.name: getattr(value, f.name) for f in fields(value)})
+    if hasattr(value, "model_dump"):  # pydantic model
+        return name + _key_part(value.model_dump())
+    raise TypeError(
+        f"@cacheable cannot key a {name} argument: "
+        "give it a __cache_key__() method or pass key_func"
+    )
+
 
 def _generate_cache_key(*args, **kwargs) -> str:
     """Generate a stable cache key from function arguments."""
-    # Create a stable representation of args and kwargs
-    key_data = {
-        "args": [str(arg) for arg in args],
-        "kwargs": {k: str(v) for k, v in sorted(kwargs.items())}
-    }
-    key_str = json.dumps(key_data, sort_keys=True)
-    return hashlib.sha256(key_str.encode()).hexdigest()[:32]
+    # Length-prefixed parts keep the key unambiguous without a JSON pass:
+    # ("a|b",) and ("a", "b") cannot collide
+    key = hashlib.blake2b(f"{len(args)}|".encode(), digest_size=16)
+    parts = [_key_part(arg) for arg in args]
+    parts += [f"{k}={_key_part(v)}" for k, v in sorted(kwargs.items())]
+    for part in parts:
+        key.update(f"{len(part)}:{part}".encode())
+    return key.hexdigest()
+
+
+def caching_enabled() -> bool:
+    """False when DISABLE_CACHE=true (read per call, so tests can flip it)."""
+    return os.getenv("DISABLE_CACHE", "false").lower() != "true"
 
 
 def cacheable(
     key_func: Optional[Callable] = None,
     ttl: Optional[int] = None,
-    enabled: bool = True
+    enabled: bool = True,
+    shared: bool = False,
 ):
     """
     Decorator for caching function results.
@@ -79,8 +224,12 @@ def cacheable(
     
     Args:
         key_func: Optional function to generate cache key from args
-        ttl: Time-to-live in seconds (not implemented in memory cache)
+        ttl: Time-to-live in seconds (None = until evicted or cleared)
         enabled: Whether caching is enabled (can be controlled by env var)
+        shared: Async functions only: also keep the result in Redis (see
+            use_shared_cache) so other workers reuse it. Only for results
+            that are plain JSON and that clear_cache never needs to drop
+            everywhere: clearing is per process
     
     Example:
         @cacheable()
@@ -88,76 +237,90 @@ def cacheable(
             return await client.a_invoke(prompt)
     """
     def decorator(func: Callable) -> Callable:
+        if not enabled:
+            return func
+
+        # Everything that does not depend on the call is settled here, once
+        if key_func is not None:
+            make_key = key_func
+        else:
+            prefix = f"{func.__module__}.{func.__name__}:"
+
+            def make_key(*args, **kwargs):
+                return prefix + _generate_cache_key(*args, **kwargs)
+
+        name = func.__name__
+
         @wraps(func)
         async def async_wrapper(*args, **kwargs):
-            # Check if caching is disabled via environment
-            cache_enabled = enabled and os.getenv("DISABLE_CACHE", "false").lower() != "true"
-            
-            if not cache_enabled:
+            # DISABLE_CACHE is read per call (caching_enabled)
+            if not caching_enabled():
                 return await func(*args, **kwargs)
-            
-            # Generate cache key
-            if key_func:
-                cache_key = key_func(*args, **kwargs)
-            else:
-                cache_key = f"{func.__module__}.{func.__name__}:{_generate_cache_key(*args, **kwargs)}"
-            
-            # Check cache
+
+            cache_key = make_key(*args, **kwargs)
             cached_value = _global_cache.get(cache_key)
             if cached_value is not None:
-                logger.debug(f"Cache hit for {func.__name__}")
+                logger.debug("Cache hit for %s", name)
                 return cached_value
-            
+
+            share = shared and _shared_url is not None
+            if share:
+                cached_value = await _shared_get(cache_key)
+                if cached_value is not None:
+                    logger.debug("Shared cache hit for %s", name)
+                    _global_cache.set(cache_key, cached_value, ttl)
+                    return cached_value
+
             # Call function and cache result
-            logger.debug(f"Cache miss for {func.__name__}")
+            logger.debug("Cache miss for %s", name)
             result = await func(*args, **kwargs)
-            _global_cache.set(cache_key, result)
-            
+            _global_cache.set(cache_key, result, ttl)
+            if share:
+                await _shared_set(cache_key, result, ttl)
+
             return result
-        
+
         @wraps(func)
         def sync_wrapper(*args, **kwargs):
-            # Check if caching is disabled via environment
-            cache_enabled = enabled and os.getenv("DISABLE_CACHE", "false").lower() != "true"
-            
-            if not cache_enabled:
+            if not caching_enabled():
                 return func(*args, **kwargs)
-            
-            # Generate cache key
-            if key_func:
-                cache_key = key_func(*args, **kwargs)
-            else:
-                cache_key = f"{func.__module__}.{func.__name__}:{_generate_cache_key(*args, **kwargs)}"
-            
-            # Check cache
+
+            cache_key = make_key(*args, **kwargs)
             cached_value = _global_cache.get(cache_key)
             if cached_value is not None:
-                logger.debug(f"Cache hit for {func.__name__}")
+                logger.debug("Cache hit for %s", name)
                 return cached_value
-            
+
             # Call function and cache result
-            logger.debug(f"Cache miss for {func.__name__}")
+            logger.debug("Cache miss for %s", name)
             result = func(*args, **kwargs)
-            _global_cache.set(cache_key, result)
-            
+            _global_cache.set(cache_key, result, ttl)
+
             return result
-        
-        # Return appropriate wrapper based on function type
-        import asyncio
-        if asyncio.iscoroutinefunction(func):
-            return async_wrapper
-        else:
-            return sync_wrapper
+
+        return async_wrapper if inspect.iscoroutinefunction(func) else sync_wrapper
     
     return decorator
 
 
+# Bumped by clear_cache: caches kept outside _global_cache (the semantic
+# response cache) compare it to drop their entries along with it
+_generation = 0
+
+
 def clear_cache():
     """Clear the global cache."""
+    global _generation
     _global_cache.clear()
+    _generation += 1
     logger.info("Cache cleared")
 
 
+def cache_generation() -> int:
+    """How many times clear_cache has run in this process."""
+    return _generation
+
+
 def get_cache_stats() -> dict:
     """Get cache statistics."""
     return {
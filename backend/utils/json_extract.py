@@ -0,0 +1,153 @@
+"""
+LLM Reply JSON Extraction
+Parses the JSON document out of a complete model reply.
+
+Providers in JSON mode return a bare document and the first json.loads
+succeeds; that is the common path and costs nothing extra. The fallbacks
+exist for endpoints that ignore the response format (some
+OpenAI-compatible servers, prompt-only providers): a ```json fence, or
+prose around the object. Both are handled in one pass each, with a
+regex compiled once and raw_decode consuming the object from its first
+brace, instead of chains of find/rfind and substring copies.
+
+Streaming replies go through utils.json_stream instead.
+"""
+
+import json
+import re
+from functools import singledispatch
+from typing import Any, Union
+
+_CODE_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)```", re.S)
+_JSON_START_RE = re.compile(r"[{\[]")
+_DECODER = json.JSONDecoder()
+# Openings tried before giving up: prose may contain a stray "[" or "{"
+# ("[Note]", "{placeholder}") ahead of the real document, but a reply
+# that fails this many times has no document worth finding
+_MAX_START_ATTEMPTS = 16
+_MISSING = object()
+
+
+def loads_llm_json(text: Union[str, bytes]) -> Any:
+    """
+    Parse the JSON value in an LLM reply.
+
+    Tries, in order: the whole text, the first fenced code block, and
+    the first non-empty object starting anywhere in the text (trailing
+    prose ignored); the first array or empty object only when the prose
+    holds no such object. Openings inside a document that fails to
+    decode are never tried, so a truncated reply raises instead of
+    yielding one of its nested objects. A stringified SDK wrapper such as
+    `TextBlock(content='{...}')` is just prose around the object.
+
+    Raises:
+        json.JSONDecodeError: no JSON value could be found
+        TypeError: text is not str/bytes
+    """
+    if isinstance(text, bytes):
+        text = text.decode("utf-8", errors="replace")
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError as e:
+        error = e
+
+    match = _CODE_FENCE_RE.search(text)
+    if match is not None:
+        try:
+            return json.loads(match.group(1))
+        except json.JSONDecodeError:
+            pass
+
+    # Prose decodes citations ("[1]") and placeholders ("{}") too: the
+    # first non-empty object wins, any other value only when none follows.
+    # An opening that fails to decode owns everything up to its matching
+    # close: a truncated reply must not hand back one of its inner objects
+    fallback = _MISSING
+    skip_until = 0
+    attempt = 0
+    for start in _JSON_START_RE.finditer(text):
+        if start.start() < skip_until:
+            continue
+        if attempt == _MAX_START_ATTEMPTS:
+            break
+        attempt += 1
+        try:
+            value, _ = _DECODER.raw_decode(text, start.start())
+        except json.JSONDecodeError as e:
+            error = e
+            skip_until = _span_end(text, start.start())
+            continue
+        if isinstance(value, dict) and value:
+            return value
+        if fallback is _MISSING:
+            fallback = value
+    if fallback is not _MISSING:
+        return fallback
+    raise error
+
+
+def _span_end(text: str, start: int) -> int:
+    """
+    Index just past the bracket that closes the one at `start`, or
+    len(text) when it never closes. Brackets inside strings don't count.
+    """
+    depth = 0
+    in_string = escaped = False
+    for index in range(start, len(text)):
+        char = text[index]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            depth += 1
+        elif char in "}]":
+            depth -= 1
+            if depth == 0:
+                return index + 1
+    return len(text)
+
+
+@singledispatch
+def reply_text(reply: Any) -> str:
+    """
+    The text of an LLM reply, whatever shape the client handed back.
+
+    The llm/ clients return str; SDK objects and content-block lists
+    still reach the agents from direct SDK use and tests. One dispatch on
+    the type (cached per class by singledispatch) instead of a ladder of
+    hasattr/isinstance probes per call; lists are joined once at the end.
+    """
+    text = getattr(reply, "text", None)
+    if text is None:
+        text = getattr(reply, "content", None)
+    if text is None:
+        return str(reply)
+    return reply_text(text)
+
+
+@reply_text.register
+def _(reply: str) -> str:
+    return reply
+
+
+@reply_text.register
+def _(reply: bytes) -> str:
+    return reply.decode("utf-8", errors="replace")
+
+
+@reply_text.register
+def _(reply: list) -> str:
+    return "".join(map(reply_text, reply))
+
+
+@reply_text.register
+def _(reply: dict) -> str:
+    # A content block ({"type": "text", "text": ...}); callers return
+    # already-parsed replies as they are before getting here
+    return reply_text(reply.get("text") or reply.get("content") or "")
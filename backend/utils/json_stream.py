@@ -12,11 +12,15 @@ The parser is a small character-level state machine that survives
 arbitrary chunk boundaries (a chunk may split a string, an escape
 sequence, or a brace). It never throws on malformed input: an object
 that fails json.loads is simply skipped.
+
+JsonDocumentBuffer is the same state machine one level up: it tells a
+caller that only wants the whole document when that document is
+complete, so the stream can be closed there instead of at end-of-stream.
 """
 
 import json
 import re
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 _COMPONENTS_ARRAY_RE = re.compile(r'"components"\s*:\s*\[')
 
@@ -29,9 +33,17 @@ class ComponentStreamParser:
     After the stream ends, `text` holds the full accumulated response,
     so the envelope fields (confidence, reasoning, ...) can be parsed
     normally.
+
+    `array_key` selects which top-level array of objects is extracted
+    ("components" for zone renders; the behavior analysis streams its
+    "insights" the same way).
     """
 
-    def __init__(self):
+    def __init__(self, array_key: str = "components"):
+        self._array_re = (
+            _COMPONENTS_ARRAY_RE if array_key == "components"
+            else re.compile(rf'"{re.escape(array_key)}"\s*:\s*\[')
+        )
         self.text = ""
         self._scan_pos = 0
         self._array_found = False
@@ -52,7 +64,7 @@ class ComponentStreamParser:
         self.text += chunk
 
         if not self._array_found:
-            match = _COMPONENTS_ARRAY_RE.search(self.text)
+            match = self._array_re.search(self.text)
             if match is None:
                 return []
             self._array_found = True
@@ -102,3 +114,64 @@ class ComponentStreamParser:
 
         self._scan_pos = i
         return completed
+
+
+class JsonDocumentBuffer:
+    """
+    Feed text chunks as they arrive; `feed` returns True once the first
+    top-level JSON object is complete, and `document` then holds exactly
+    that object's text.
+
+    Anything before the opening brace (a markdown fence, a preamble) is
+    never buffered, and anything after the closing brace (the closing
+    fence, trailing prose) is never read: the caller can stop consuming
+    the stream at that point. Braces inside strings are not counted.
+    """
+
+    def __init__(self):
+        self.document: Optional[str] = None
+        self._parts: List[str] = []
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    @property
+    def text(self) -> str:
+        """What was buffered so far: the document, or its unfinished prefix."""
+        return self.document if self.document is not None else "".join(self._parts)
+
+    def feed(self, chunk: str) -> bool:
+        """Consume a chunk; return whether the document is complete."""
+        if self.document is not None:
+            return True
+        start = 0
+        if not self._started:
+            start = chunk.find("{")
+            if start < 0:
+                return False
+            self._started = True
+
+        for i in range(start, len(chunk)):
+            ch = chunk[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._parts.append(chunk[start:i + 1])
+                    self.document = "".join(self._parts)
+                    self._parts = []
+                    return True
+
+        self._parts.append(chunk[start:])
+        return False
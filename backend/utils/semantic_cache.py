@@ -0,0 +1,211 @@
+"""
+Semantic Response Cache
+Approximate cache for chat answers, keyed by the query's embedding.
+
+A paraphrase of a question already answered ("how do I sign in" after
+"how does login work") returns the earlier answer instead of paying the
+vector search and the model call again. A hit needs cosine similarity
+>= the threshold AND the same scope: the scope is everything else the
+model saw (tenant, profile context, conversation history), so an answer
+is only ever replayed to a request that would have produced it from the
+same inputs.
+
+Entries are dropped when the global cache is cleared (utils.cache),
+which is what re-indexing the knowledge base does.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from .cache import cache_generation
+
+BucketKey = Tuple[int, int]  # (scope id, signature)
+
+
+class ProximityCache:
+    """
+    Bounded, LRU-evicted map from (scope, embedding) to a value.
+
+    Embeddings are stored L2-normalized as rows of one float32 matrix.
+    Up to `scan_max_rows` live rows a lookup scans them all (one
+    matrix-vector product, exact). Past that it probes a random-projection
+    LSH index instead: `tables` hash tables, each keyed by the sign
+    pattern of `bits` Gaussian projections, and only the rows sharing a
+    bucket with the query are compared. A near-duplicate at cosine 0.95
+    lands in the query's bucket in at least one of the 8 default tables
+    about 9 times out of 10; a lookup the index misses is a cache miss,
+    never a wrong answer.
+
+    With `quantize`, rows are stored as int8 with one float32 scale each
+    (row / max|row| * 127): a quarter of the memory, and scores within
+    about 1e-3 of the float32 ones for embedding-sized vectors, well
+    inside any useful threshold margin. Lookups dequantize the rows they
+    compare, so they cost somewhat more than with float32 storage.
+
+    Not thread-safe; one instance serves one event loop.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 512,
+        bits: int = 12,
+        tables: int = 8,
+        scan_max_rows: int = 2048,
+        seed: int = 0,
+        quantize: bool = False,
+    ):
+        self.capacity = max(1, capacity)
+        self.bits = bits
+        self.tables = tables
+        self.scan_max_rows = scan_max_rows
+        self._seed = seed
+        self.quantize = quantize
+        self._vectors: Optional[np.ndarray] = None  # (capacity, dim), allocated on first put
+        self._scales = np.ones(self.capacity, dtype=np.float32)  # int8 rows only
+        self._projections: Optional[np.ndarray] = None  # (tables * bits, dim)
+        self._bit_weights = np.left_shift(1, np.arange(bits, dtype=np.int64))
+        self._scopes = np.zeros(self.capacity, dtype=np.int64)
+        self._last_used = np.zeros(self.capacity, dtype=np.int64)
+        self._values: list = [None] * self.capacity
+        self._row_keys: List[Optional[List[BucketKey]]] = [None] * self.capacity
+        self._buckets: List[Dict[BucketKey, Set[int]]] = [{} for _ in range(tables)]
+        self._scope_ids: Dict[str, int] = {}
+        self._next_scope_id = 0
+        self._size = 0
+        self._clock = 0
+        self._generation = cache_generation()
+
+    def __len__(self) -> int:
+        self._check_generation()
+        return self._size
+
+    def clear(self) -> None:
+        self._vectors = None
+        self._projections = None
+        self._values = [None] * self.capacity
+        self._row_keys = [None] * self.capacity
+        self._buckets = [{} for _ in range(self.tables)]
+        self._scope_ids.clear()
+        self._size = 0
+
+    def get(self, scope: str, embedding: Sequence[float], threshold: float) -> Optional[Any]:
+        """The value stored under the most similar embedding in scope, if >= threshold."""
+        self._check_generation()
+        scope_id = self._scope_ids.get(scope)
+        if scope_id is None or self._size == 0:
+            return None
+        query = _normalized(embedding)
+        if query is None or query.shape[0] != self._vectors.shape[1]:
+            return None
+
+        if self._size <= self.scan_max_rows:
+            scores = self._scores(slice(0, self._size), query)
+            scores[self._scopes[:self._size] != scope_id] = -np.inf
+            row = int(np.argmax(scores))
+            score = scores[row]
+        else:
+            candidates: Set[int] = set()
+            for bucket, key in zip(self._buckets, self._bucket_keys(scope_id, query)):
+                candidates.update(bucket.get(key, ()))
+            if not candidates:
+                return None
+            rows = np.fromiter(candidates, dtype=np.intp, count=len(candidates))
+            scores = self._scores(rows, query)
+            best = int(np.argmax(scores))
+            row, score = int(rows[best]), scores[best]
+
+        if score < threshold:
+            return None
+        self._touch(row)
+        return self._values[row]
+
+    def put(self, scope: str, embedding: Sequence[float], value: Any) -> None:
+        """Store value; evicts the least recently used entry when full."""
+        self._check_generation()
+        vector = _normalized(embedding)
+        if vector is None:
+            return
+        if self._vectors is None or self._vectors.shape[1] != vector.shape[0]:
+            # First entry, or the embedding model changed: start over
+            self.clear()
+            dim = vector.shape[0]
+            self._vectors = np.zeros(
+                (self.capacity, dim), dtype=np.int8 if self.quantize else np.float32
+            )
+            rng = np.random.default_rng(self._seed)
+            self._projections = rng.standard_normal(
+                (self.tables * self.bits, dim), dtype=np.float32
+            )
+
+        scope_id = self._scope_ids.get(scope)
+        if scope_id is None:
+            scope_id = self._scope_ids[scope] = self._next_scope_id
+            self._next_scope_id += 1
+
+        if self._size < self.capacity:
+            row = self._size
+            self._size += 1
+            evicted_scope = None
+        else:
+            row = int(np.argmin(self._last_used))
+            evicted_scope = int(self._scopes[row])
+            self._unindex(row)
+
+        if self.quantize:
+            scale = float(np.abs(vector).max()) / 127.0
+            self._vectors[row] = np.rint(vector / scale)
+            self._scales[row] = scale
+        else:
+            self._vectors[row] = vector
+        self._scopes[row] = scope_id
+        self._values[row] = value
+        self._index(row, scope_id, vector)
+        self._touch(row)
+        if evicted_scope is not None and not (self._scopes == evicted_scope).any():
+            # Last entry of that scope: forget the scope too, or one-off
+            # scopes (every new conversation) would grow the map forever
+            self._scope_ids = {k: v for k, v in self._scope_ids.items() if v != evicted_scope}
+
+    def _scores(self, rows: Any, query: np.ndarray) -> np.ndarray:
+        """Cosine similarity of the query to the given stored rows."""
+        if not self.quantize:
+            return self._vectors[rows] @ query
+        return (self._vectors[rows].astype(np.float32) @ query) * self._scales[rows]
+
+    def _bucket_keys(self, scope_id: int, vector: np.ndarray) -> List[BucketKey]:
+        """One key per table: the scope and the packed sign bits."""
+        signs = (self._projections @ vector > 0).reshape(self.tables, self.bits)
+        return [(scope_id, int(sig)) for sig in signs @ self._bit_weights]
+
+    def _index(self, row: int, scope_id: int, vector: np.ndarray) -> None:
+        keys = self._row_keys[row] = self._bucket_keys(scope_id, vector)
+        for bucket, key in zip(self._buckets, keys):
+            bucket.setdefault(key, set()).add(row)
+
+    def _unindex(self, row: int) -> None:
+        for bucket, key in zip(self._buckets, self._row_keys[row] or ()):
+            rows = bucket.get(key)
+            if rows is not None:
+                rows.discard(row)
+                if not rows:
+                    del bucket[key]
+        self._row_keys[row] = None
+
+    def _touch(self, row: int) -> None:
+        self._clock += 1
+        self._last_used[row] = self._clock
+
+    def _check_generation(self) -> None:
+        generation = cache_generation()
+        if generation != self._generation:
+            self._generation = generation
+            self.clear()
+
+
+def _normalized(embedding: Sequence[float]) -> Optional[np.ndarray]:
+    vector = np.asarray(embedding, dtype=np.float32).ravel()
+    norm = float(np.linalg.norm(vector))
+    if not vector.size or not np.isfinite(norm) or norm == 0.0:
+        return None
+    return vector / norm
@@ -0,0 +1,66 @@
+"""
+Sync Wrapper Event Loop
+Runs an agent coroutine to completion from synchronous code.
+
+The agents' sync wrappers (scripts, CLI, notebooks without a running
+loop) used asyncio.run, which builds and closes an event loop per call.
+Besides the setup cost, that strands the shared LLM HTTP pool
+(llm.http): its keep-alive connections belong to the loop that opened
+them, so every call after the first reconnected from scratch.
+
+Every sync call now runs on ONE long-lived loop in a daemon thread,
+whichever thread it comes from: a thread pool of sync callers shares
+one loop and one set of warm connections instead of a loop per worker.
+"""
+
+import asyncio
+import threading
+from typing import Awaitable, Optional, TypeVar
+
+T = TypeVar("T")
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_loop.run_forever, name="genui-sync-loop", daemon=True
+            ).start()
+        return _loop
+
+
+def run_sync(coro: Awaitable[T]) -> T:
+    """
+    Run a coroutine on the shared background loop and return its result.
+
+    The calling thread blocks until the coroutine finishes; an exception
+    raised by the coroutine is raised here. If the wait itself is
+    interrupted (KeyboardInterrupt), the coroutine is cancelled.
+
+    Raises:
+        RuntimeError: called from inside a running event loop (await the
+            coroutine there instead: blocking that loop's thread on
+            another loop would stall every task it runs); the coroutine
+            is closed, not leaked
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        pass
+    else:
+        coro.close()
+        raise RuntimeError(
+            "sync wrapper called inside a running event loop; await the async method instead"
+        )
+
+    future = asyncio.run_coroutine_threadsafe(coro, _background_loop())
+    try:
+        return future.result()
+    except BaseException:
+        future.cancel()
+        raise